@@ -11,6 +11,8 @@ class AuthService {
         data: {
           'username': email, // OAuth2 standard uses 'username'
           'password': password,
+          // Long-lived access token until the app refreshes tokens itself
+          'client_id': 'vextra-mobile',
         },
         options: Options(contentType: Headers.formUrlEncodedContentType),
       );
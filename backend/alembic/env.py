@@ -31,6 +31,14 @@ from app.models.conversation import Conversation, ConversationParticipant
 from app.models.message import Message
 from app.models.post import Post
 from app.models.notification import Notification
+from app.models.hashtag import Hashtag, PostHashtag
+from app.models.post_media import PostMedia
+from app.models.refresh_token import RefreshToken
+from app.models.oauth_state import OAuthState
+from app.models.publish_job import PublishJob
+from app.models.media_asset import MediaAsset
+from app.models.agent_response import AgentResponse
+from app.models.agent_usage import AgentUsage
 
 target_metadata = Base.metadata
 
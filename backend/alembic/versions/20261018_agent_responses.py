@@ -0,0 +1,39 @@
+"""Add agent_responses table
+
+Revision ID: 20261018_agent_responses
+Revises: 20261018_media_dedup
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_agent_responses'
+down_revision = '20261018_media_dedup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'agent_responses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_agent_responses_id'), 'agent_responses', ['id'], unique=False)
+    op.create_index('uq_agent_response_key', 'agent_responses', ['key'], unique=True)
+    op.create_index('idx_agent_response_expires', 'agent_responses', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('idx_agent_response_expires', table_name='agent_responses')
+    op.drop_index('uq_agent_response_key', table_name='agent_responses')
+    op.drop_index(op.f('ix_agent_responses_id'), table_name='agent_responses')
+    op.drop_table('agent_responses')
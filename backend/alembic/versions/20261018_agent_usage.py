@@ -0,0 +1,37 @@
+"""Add agent_usage table
+
+Revision ID: 20261018_agent_usage
+Revises: 20261018_agent_responses
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_agent_usage'
+down_revision = '20261018_agent_responses'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'agent_usage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'day', name='uq_agent_usage_user_day'),
+    )
+    op.create_index(op.f('ix_agent_usage_id'), 'agent_usage', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_agent_usage_id'), table_name='agent_usage')
+    op.drop_table('agent_usage')
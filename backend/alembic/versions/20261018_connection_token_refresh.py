@@ -0,0 +1,34 @@
+"""Add token refresh tracking and token_expires_at index to social_connections
+
+Revision ID: 20261018_connection_token_refresh
+Revises: 20261018_post_scheduled_at
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_connection_token_refresh'
+down_revision = '20261018_post_scheduled_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'social_connections',
+        sa.Column('token_refresh_attempted_at', sa.DateTime(), nullable=True),
+    )
+    op.add_column(
+        'social_connections',
+        sa.Column('token_refresh_error', sa.Text(), nullable=True),
+    )
+    op.create_index('idx_social_connection_expires', 'social_connections', ['token_expires_at'])
+
+
+def downgrade():
+    op.drop_index('idx_social_connection_expires', table_name='social_connections')
+    op.drop_column('social_connections', 'token_refresh_error')
+    op.drop_column('social_connections', 'token_refresh_attempted_at')
@@ -0,0 +1,36 @@
+"""Add LinkedIn post verification claims to social_connections
+
+Revision ID: 20261018_connection_verify_claims
+Revises: 20261018_message_media_url
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_connection_verify_claims'
+down_revision = '20261018_message_media_url'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'social_connections',
+        sa.Column('verify_requested_at', sa.DateTime(), nullable=True),
+    )
+    op.add_column(
+        'social_connections',
+        sa.Column('verify_claimed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        'idx_social_connection_verify', 'social_connections', ['platform', 'verify_claimed_at']
+    )
+
+
+def downgrade():
+    op.drop_index('idx_social_connection_verify', table_name='social_connections')
+    op.drop_column('social_connections', 'verify_claimed_at')
+    op.drop_column('social_connections', 'verify_requested_at')
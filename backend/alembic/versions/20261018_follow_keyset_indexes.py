@@ -0,0 +1,25 @@
+"""Add (user, created_at, id) indexes to follows for keyset pagination
+
+Revision ID: 20261018_follow_keyset_indexes
+Revises: 20261018_post_search_hashtags
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_follow_keyset_indexes'
+down_revision = '20261018_post_search_hashtags'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_follow_following_created', 'follows', ['following_id', 'created_at', 'id'])
+    op.create_index('idx_follow_follower_created', 'follows', ['follower_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_follow_follower_created', 'follows')
+    op.drop_index('idx_follow_following_created', 'follows')
@@ -0,0 +1,34 @@
+"""Add content hash and reference counting to media_assets
+
+Revision ID: 20261018_media_dedup
+Revises: 20261018_media_derivatives
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_media_dedup'
+down_revision = '20261018_media_derivatives'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('media_assets', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('media_assets', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.add_column('media_assets', sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('media_assets', sa.Column('orphaned_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('idx_media_asset_content_hash', 'media_assets', ['content_hash'])
+    op.create_index('idx_media_asset_orphaned', 'media_assets', ['orphaned_at'])
+
+
+def downgrade():
+    op.drop_index('idx_media_asset_orphaned', table_name='media_assets')
+    op.drop_index('idx_media_asset_content_hash', table_name='media_assets')
+    op.drop_column('media_assets', 'orphaned_at')
+    op.drop_column('media_assets', 'ref_count')
+    op.drop_column('media_assets', 'size')
+    op.drop_column('media_assets', 'content_hash')
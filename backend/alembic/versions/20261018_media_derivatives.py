@@ -0,0 +1,48 @@
+"""Add media_assets table and media variant columns
+
+Revision ID: 20261018_media_derivatives
+Revises: 20261018_connection_token_refresh
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_media_derivatives'
+down_revision = '20261018_connection_token_refresh'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'media_assets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=1024), nullable=False),
+        sa.Column('path', sa.String(length=1024), nullable=True),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('variants', sa.JSON(), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_media_assets_id'), 'media_assets', ['id'], unique=False)
+    op.create_index('uq_media_asset_url', 'media_assets', ['url'], unique=True)
+    op.create_index('idx_media_asset_status', 'media_assets', ['status'])
+    op.add_column('posts', sa.Column('media_variants', sa.JSON(), nullable=True))
+    op.add_column('users', sa.Column('profile_picture_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('users', 'profile_picture_variants')
+    op.drop_column('posts', 'media_variants')
+    op.drop_index('idx_media_asset_status', table_name='media_assets')
+    op.drop_index('uq_media_asset_url', table_name='media_assets')
+    op.drop_index(op.f('ix_media_assets_id'), table_name='media_assets')
+    op.drop_table('media_assets')
@@ -0,0 +1,23 @@
+"""Index messages.media_url for media reference counting
+
+Revision ID: 20261018_message_media_url
+Revises: 20261018_post_media
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_message_media_url'
+down_revision = '20261018_post_media'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_message_media_url', 'messages', ['media_url'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_message_media_url', table_name='messages')
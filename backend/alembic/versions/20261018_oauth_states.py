@@ -0,0 +1,33 @@
+"""Add oauth_states table for expiring single-use OAuth state
+
+Revision ID: 20261018_oauth_states
+Revises: 20261018_refresh_tokens
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_oauth_states'
+down_revision = '20261018_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'oauth_states',
+        sa.Column('key', sa.String(length=128), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('idx_oauth_state_expires', 'oauth_states', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('idx_oauth_state_expires', table_name='oauth_states')
+    op.drop_table('oauth_states')
@@ -0,0 +1,52 @@
+"""Add post_media (media URL -> post links) and backfill it from posts.media_urls
+
+Revision ID: 20261018_post_media
+Revises: 20261018_post_schedule_retries
+Create Date: 2026-10-18
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_post_media'
+down_revision = '20261018_post_schedule_retries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    post_media = op.create_table(
+        'post_media',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=1024), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_post_media_id'), 'post_media', ['id'], unique=False)
+    op.create_index('idx_post_media_url', 'post_media', ['url'])
+    op.create_index('idx_post_media_post', 'post_media', ['post_id'])
+
+    # Backfill from existing posts and drafts
+    bind = op.get_bind()
+    rows = []
+    for post_id, media_urls in bind.execute(
+        sa.text("SELECT id, media_urls FROM posts WHERE media_urls IS NOT NULL")
+    ):
+        if isinstance(media_urls, str):
+            media_urls = json.loads(media_urls)
+        if isinstance(media_urls, list):
+            rows.extend({"post_id": post_id, "url": url} for url in media_urls if url)
+    if rows:
+        op.bulk_insert(post_media, rows)
+
+
+def downgrade():
+    op.drop_index('idx_post_media_post', table_name='post_media')
+    op.drop_index('idx_post_media_url', table_name='post_media')
+    op.drop_index(op.f('ix_post_media_id'), table_name='post_media')
+    op.drop_table('post_media')
@@ -0,0 +1,32 @@
+"""Add posts.schedule_attempts / schedule_retry_at for scheduled publish failures
+
+Revision ID: 20261018_post_schedule_retries
+Revises: 20261018_agent_usage
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_post_schedule_retries'
+down_revision = '20261018_agent_usage'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'posts',
+        sa.Column('schedule_attempts', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.add_column(
+        'posts',
+        sa.Column('schedule_retry_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column('posts', 'schedule_retry_at')
+    op.drop_column('posts', 'schedule_attempts')
@@ -0,0 +1,30 @@
+"""Add posts.scheduled_at for scheduled draft publishing
+
+Revision ID: 20261018_post_scheduled_at
+Revises: 20261018_publish_jobs
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_post_scheduled_at'
+down_revision = '20261018_publish_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'posts',
+        sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    # Due-drafts query: is_draft = true AND scheduled_at <= now ORDER BY scheduled_at
+    op.create_index('idx_post_scheduled', 'posts', ['is_draft', 'scheduled_at'])
+
+
+def downgrade():
+    op.drop_index('idx_post_scheduled', table_name='posts')
+    op.drop_column('posts', 'scheduled_at')
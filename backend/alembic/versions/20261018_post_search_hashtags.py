@@ -0,0 +1,64 @@
+"""Add hashtag tables and full-text index on post content
+
+Revision ID: 20261018_post_search_hashtags
+Revises: 20261018_user_search_trgm
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_post_search_hashtags'
+down_revision = '20261018_user_search_trgm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'hashtags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tag', sa.String(100), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_hashtags_id', 'hashtags', ['id'])
+    op.create_index('ix_hashtags_tag', 'hashtags', ['tag'], unique=True)
+
+    op.create_table(
+        'post_hashtags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('hashtag_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['hashtag_id'], ['hashtags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('post_id', 'hashtag_id', name='uq_post_hashtag')
+    )
+    op.create_index('ix_post_hashtags_id', 'post_hashtags', ['id'])
+    op.create_index('idx_post_hashtag_tag_created', 'post_hashtags', ['hashtag_id', 'created_at', 'id'])
+    op.create_index('idx_post_hashtag_created', 'post_hashtags', ['created_at'])
+
+    # Full-text index used by crud.post.search (PostgreSQL only)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_posts_content_fts ON posts "
+            "USING gin (to_tsvector('simple', coalesce(content, '')))"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS idx_posts_content_fts')
+
+    op.drop_index('idx_post_hashtag_created', 'post_hashtags')
+    op.drop_index('idx_post_hashtag_tag_created', 'post_hashtags')
+    op.drop_index('ix_post_hashtags_id', 'post_hashtags')
+    op.drop_table('post_hashtags')
+
+    op.drop_index('ix_hashtags_tag', 'hashtags')
+    op.drop_index('ix_hashtags_id', 'hashtags')
+    op.drop_table('hashtags')
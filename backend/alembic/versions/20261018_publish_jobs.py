@@ -0,0 +1,51 @@
+"""Add publish_jobs table for background publishing
+
+Revision ID: 20261018_publish_jobs
+Revises: 20261018_oauth_states
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_publish_jobs'
+down_revision = '20261018_oauth_states'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'publish_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=True),
+        sa.Column('idempotency_key', sa.String(length=128), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('media_urls', sa.JSON(), nullable=True),
+        sa.Column('platforms', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('locked_by', sa.String(length=64), nullable=True),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_publish_job_idempotency'),
+    )
+    op.create_index(op.f('ix_publish_jobs_id'), 'publish_jobs', ['id'], unique=False)
+    op.create_index('idx_publish_job_due', 'publish_jobs', ['status', 'next_attempt_at'])
+    op.create_index('idx_publish_job_user', 'publish_jobs', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('idx_publish_job_user', table_name='publish_jobs')
+    op.drop_index('idx_publish_job_due', table_name='publish_jobs')
+    op.drop_index(op.f('ix_publish_jobs_id'), table_name='publish_jobs')
+    op.drop_table('publish_jobs')
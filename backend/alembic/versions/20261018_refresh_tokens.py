@@ -0,0 +1,47 @@
+"""Add refresh_tokens table for rotating refresh tokens
+
+Revision ID: 20261018_refresh_tokens
+Revises: 20261018_user_token_version
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_refresh_tokens'
+down_revision = '20261018_user_token_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('family_id', sa.String(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('rotated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token_hash'),
+    )
+    op.create_index(op.f('ix_refresh_tokens_id'), 'refresh_tokens', ['id'], unique=False)
+    op.create_index('idx_refresh_token_family', 'refresh_tokens', ['family_id'])
+    op.create_index('idx_refresh_token_user', 'refresh_tokens', ['user_id'])
+    op.create_index('idx_refresh_token_revoked', 'refresh_tokens', ['revoked_at'])
+    op.create_index('idx_refresh_token_expires', 'refresh_tokens', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('idx_refresh_token_expires', table_name='refresh_tokens')
+    op.drop_index('idx_refresh_token_revoked', table_name='refresh_tokens')
+    op.drop_index('idx_refresh_token_user', table_name='refresh_tokens')
+    op.drop_index('idx_refresh_token_family', table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_id'), table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
@@ -0,0 +1,40 @@
+"""Add pg_trgm indexes for user search
+
+Revision ID: 20261018_user_search_trgm
+Revises: f3126931b10f
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_user_search_trgm'
+down_revision = 'f3126931b10f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trigram GIN indexes only exist on PostgreSQL; other backends keep the
+    # plain LIKE scan used by crud.user.search
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS idx_users_username_trgm '
+        'ON users USING gin (lower(username) gin_trgm_ops)'
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm '
+        'ON users USING gin (lower(full_name) gin_trgm_ops)'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS idx_users_full_name_trgm')
+    op.execute('DROP INDEX IF EXISTS idx_users_username_trgm')
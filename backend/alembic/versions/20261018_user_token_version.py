@@ -0,0 +1,27 @@
+"""Add users.token_version for access token revocation
+
+Revision ID: 20261018_user_token_version
+Revises: 20261018_follow_keyset_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_user_token_version'
+down_revision = '20261018_follow_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_column('users', 'token_version')
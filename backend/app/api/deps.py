@@ -1,5 +1,6 @@
+import secrets
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -9,6 +10,8 @@ from app import crud
 from app.models.user import User
 from app.schemas.user import TokenData
 from app.core import config, security
+from app.services.principals import Principal, get_principal, remember
+from app.services.sessions import is_session_revoked
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{config.settings.API_V1_STR}/auth/access-token"
@@ -21,24 +24,92 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+def _decode_token(token: str) -> dict:
+    """Verify the JWT (pure CPU, no database) and return its claims."""
     try:
         payload = jwt.decode(
             token, config.settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
         token_data = TokenData(id=payload.get("sub"))
     except (JWTError, ValidationError):
+        token_data = None
+    if token_data is None or token_data.id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return payload
+
+def _check_session(db: Session, payload: dict) -> None:
+    # Logged-out / revoked sessions; a filter lookup unless the session is (probably) revoked
+    sid = payload.get("sid")
+    if sid and is_session_revoked(db, sid, legacy=bool(payload.get("legacy"))):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = crud.user.get(db, id=token_data.id)
+
+def _check_token_version(payload: dict, token_version: int) -> None:
+    # Tokens issued before a password change / deactivation carry an older version
+    if payload.get("ver", 0) != token_version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
+def get_current_principal(
+    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> Principal:
+    """
+    Authenticated caller without loading the User row. Use this instead of
+    get_current_user in endpoints that only need the caller's id.
+    """
+    payload = _decode_token(token)
+    _check_session(db, payload)
+    principal = get_principal(db, int(payload["sub"]))
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
+    _check_token_version(payload, principal.token_version)
+    return principal
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> User:
+    payload = _decode_token(token)
+    _check_session(db, payload)
+    user = crud.user.get(db, id=int(payload["sub"]))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    _check_token_version(payload, user.token_version or 0)
+    remember(user)
+    return user
+
+def get_user_from_token(token: str, db: Session) -> Optional[User]:
+    """Validate a token passed outside the Authorization header (WebSockets)."""
+    try:
+        payload = _decode_token(token)
+        _check_session(db, payload)
+    except HTTPException:
+        return None
+    user = crud.user.get(db, id=int(payload["sub"]))
+    if not user or payload.get("ver", 0) != (user.token_version or 0):
+        return None
+    remember(user)
     return user
 
+def require_metrics_token(
+    x_metrics_token: Optional[str] = Header(default=None),
+) -> None:
+    """Internal endpoints: the caller must present METRICS_TOKEN."""
+    expected = config.settings.METRICS_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -1,18 +1,41 @@
 """AI Agent API endpoint."""
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.api import deps
 from app.models.user import User
 from app.schemas.agent import AgentChatRequest, AgentChatResponse
-from app.services.agent_service import agent_service
+from app.services.agent_service import MODEL, AgentLimitError, agent_service
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _user_context(current_user: User) -> dict:
+    return {
+        "user_id": current_user.id,
+        "username": current_user.username or current_user.full_name,
+        "email": current_user.email
+    }
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
 @router.post("/chat", response_model=AgentChatResponse)
 async def agent_chat(
     request: AgentChatRequest,
+    http_response: Response,
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user),
 ):
@@ -20,11 +43,7 @@ async def agent_chat(
     Chat with the AI agent.
     """
     # Create user context
-    user_context = {
-        "user_id": current_user.id,
-        "username": current_user.username or current_user.full_name,
-        "email": current_user.email
-    }
+    user_context = _user_context(current_user)
     
     response = await agent_service.chat(
         message=request.message,
@@ -33,18 +52,74 @@ async def agent_chat(
         db=db
     )
     
+    if response.get("retry_after"):
+        http_response.headers["Retry-After"] = str(response["retry_after"])
+    
     return AgentChatResponse(
         message=response["message"],
         actions=response.get("actions", []),
         success=response["success"],
-        error=response.get("error")
+        error=response.get("error"),
+        retry_after=response.get("retry_after")
     )
 
 
+@router.post("/chat/stream")
+async def agent_chat_stream(
+    request: AgentChatRequest,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Chat with the AI agent, streaming the reply as Server-Sent Events.
+    
+    Each text fragment is sent as `data: {"delta": "..."}` as soon as it arrives.
+    The stream ends with `event: done` (data: {"message": full reply}) or
+    `event: error` (data: {"error": "busy" | "rate_limited" | "timeout" | ...,
+    "message": ..., "retry_after": seconds or null}).
+    """
+    if not agent_service.is_available():
+        raise HTTPException(status_code=503, detail="AI service is not configured")
+    
+    # Context is read now: the DB session is closed once streaming starts
+    messages = await run_in_threadpool(
+        agent_service.build_messages,
+        request.message,
+        request.history,
+        _user_context(current_user),
+        db,
+    )
+    
+    return StreamingResponse(
+        _stream_reply(messages, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_reply(messages: List[Dict[str, str]], user_id: int) -> AsyncIterator[str]:
+    parts = []
+    try:
+        async for delta in agent_service.stream_chat(messages, user_id=user_id):
+            parts.append(delta)
+            yield _sse({"delta": delta})
+    except AgentLimitError as e:
+        yield _sse({"error": e.code, "message": str(e), "retry_after": e.retry_after}, event="error")
+        return
+    except asyncio.TimeoutError:
+        yield _sse({"error": "timeout", "message": "The reply took too long. Please try again."}, event="error")
+        return
+    except Exception as e:
+        logger.error(f"Agent stream failed: {e}")
+        yield _sse({"error": str(e), "message": "I encountered an error. Please try again."}, event="error")
+        return
+    yield _sse({"message": "".join(parts) or "I didn't catch that."}, event="done")
+
+
 @router.get("/health")
 async def agent_health():
     """Check if the agent service is available."""
     return {
         "available": agent_service.is_available(),
-        "model": "llama-3.3-70b-versatile" if agent_service.is_available() else None
+        "model": MODEL if agent_service.is_available() else None
     }
@@ -6,17 +6,23 @@ from sqlalchemy.orm import Session
 from app.api import deps
 from app.core import security
 from app.core.config import settings
+from app.core.password_hasher import password_hasher
 from app.models.user import User as UserModel
 from app.models.otp import OTP as OTPModel
-from app.schemas.user import User, UserCreate, Token
+from app.schemas.user import User, UserCreate, Token, RefreshTokenRequest
 from app.schemas.otp import OTPRequest, OTPVerify, PasswordReset
+from app.schemas.settings import ChangePassword
 from app.core.email import EmailService
+from app.services.typeahead import typeahead_index
+from app.services.principals import invalidate_principal
+from app.services import sessions
 from datetime import datetime
 import random
 import string
 
 router = APIRouter()
 
+
 @router.post("/login/access-token", response_model=Token)
 def login_access_token(
     db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
@@ -25,18 +31,52 @@ def login_access_token(
     OAuth2 compatible token login, get an access token for future requests
     """
     user = db.query(UserModel).filter(UserModel.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    
+    verified, new_hash = security.verify_and_update_password(
+        form_data.password, user.hashed_password
+    )
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    
+    # Stored hash used an older work factor (BCRYPT_ROUNDS was raised)
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
         
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+    # Clients that can't refresh yet opt into long-lived access tokens by client_id
+    legacy = form_data.client_id in settings.LEGACY_ACCESS_TOKEN_CLIENTS
+    return sessions.issue_tokens(db, user, legacy=legacy)
+
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(
+    refresh_in: RefreshTokenRequest,
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    Each refresh token works once; reusing one ends the session.
+    """
+    try:
+        return sessions.rotate(db, refresh_in.refresh_token)
+    except sessions.InvalidRefreshToken:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+
+@router.post("/logout")
+def logout(
+    refresh_in: RefreshTokenRequest,
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    End the session: its refresh token stops working and its access tokens are rejected.
+    """
+    sessions.revoke_session(db, refresh_in.refresh_token)
+    return {"message": "Logged out"}
 
 
 
@@ -57,7 +97,7 @@ async def create_user_signup(
         )
     user = UserModel(
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash_async(user_in.password),
         full_name=user_in.full_name,
         is_active=False,
     )
@@ -156,14 +196,20 @@ def verify_otp(
     
     otp.is_verified = True
     
+    activated_user = None
     if otp_in.purpose == "signup":
         user = db.query(UserModel).filter(UserModel.email == otp_in.email).first()
         if user:
             user.is_active = True
             db.add(user)
+            activated_user = user
 
     db.commit()
     
+    if activated_user:
+        typeahead_index.upsert_user(activated_user)
+        invalidate_principal(activated_user.id)
+    
     return {"message": "OTP verified successfully"}
 
 @router.post("/reset-password")
@@ -194,7 +240,10 @@ def reset_password(
         raise HTTPException(status_code=404, detail="User not found")
         
     user.hashed_password = security.get_password_hash(reset_in.new_password)
+    user.token_version = (user.token_version or 0) + 1
     db.commit()
+    invalidate_principal(user.id)
+    sessions.revoke_user_sessions(db, user.id)
     
     return {"message": "Password reset successfully"}
 
@@ -204,18 +253,23 @@ def change_password(
     *,
     db: Session = Depends(deps.get_db),
     current_user: UserModel = Depends(deps.get_current_user),
-    password_data: "ChangePassword",
+    password_data: ChangePassword,
 ) -> Any:
     """
     Change password for currently logged-in user.
     """
-    from app.schemas.settings import ChangePassword
-    
     if not security.verify_password(password_data.current_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect current password")
     
     current_user.hashed_password = security.get_password_hash(password_data.new_password)
+    current_user.token_version = (current_user.token_version or 0) + 1
     db.commit()
+    invalidate_principal(current_user.id)
+    sessions.revoke_user_sessions(db, current_user.id)
     
-    return {"message": "Password changed successfully"}
+    # Every session is now revoked; hand this client a fresh one
+    return {
+        "message": "Password changed successfully",
+        **sessions.issue_tokens(db, current_user),
+    }
 
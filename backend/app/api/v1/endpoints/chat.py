@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_, desc, func
 
 from app.api import deps
+from app.services.principals import Principal
 from app.models.user import User as UserModel
 from app.models.conversation import Conversation, ConversationParticipant
 from app.models.message import Message, MessageType
@@ -19,6 +20,8 @@ from app.schemas.chat import (
     MessageResponse,
     MessageSender,
 )
+from app.services.media import avatar_url
+from app.services.media_store import track_references
 
 router = APIRouter()
 
@@ -29,7 +32,7 @@ def get_participant_info(participant: ConversationParticipant, user: UserModel)
         id=user.id,
         username=user.username,
         full_name=user.full_name,
-        profile_picture=user.profile_picture,
+        profile_picture=avatar_url(user),
         last_read_at=participant.last_read_at
     )
 
@@ -44,7 +47,7 @@ def get_message_response(message: Message, db: Session) -> MessageResponse:
                 id=sender_user.id,
                 username=sender_user.username,
                 full_name=sender_user.full_name,
-                profile_picture=sender_user.profile_picture
+                profile_picture=avatar_url(sender_user)
             )
     
     # Get shared post data if this is a post_share message
@@ -59,7 +62,7 @@ def get_message_response(message: Message, db: Session) -> MessageResponse:
                 "user": {
                     "id": post.owner.id,
                     "username": post.owner.username,
-                    "profile_picture": post.owner.profile_picture,
+                    "profile_picture": avatar_url(post.owner),
                 } if post.owner else None,
                 "likes_count": post.likes_count,
                 "comments_count": post.comments_count,
@@ -87,7 +90,7 @@ def get_message_response(message: Message, db: Session) -> MessageResponse:
 def create_or_get_conversation(
     conversation_in: ConversationCreate,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> ConversationResponse:
     """Create a new conversation with a user or get existing one."""
     participant_id = conversation_in.participant_id
@@ -148,7 +151,7 @@ def create_or_get_conversation(
 @router.get("/conversations", response_model=ConversationListResponse)
 def get_conversations(
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     skip: int = 0,
     limit: int = 50,
 ) -> ConversationListResponse:
@@ -182,7 +185,7 @@ def get_conversations(
 def get_conversation_detail(
     conversation_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> ConversationDetailResponse:
     """Get a specific conversation with messages."""
     # Check if user is a participant
@@ -241,7 +244,7 @@ def send_message(
     conversation_id: int,
     message_in: MessageCreate,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> MessageResponse:
     """Send a message in a conversation."""
     # Check if user is a participant
@@ -273,6 +276,7 @@ def send_message(
         shared_post_id=message_in.shared_post_id
     )
     db.add(message)
+    track_references(db, None, [message.media_url])
     
     # Update conversation last_message_at
     conversation = db.query(Conversation).filter(
@@ -293,7 +297,7 @@ def send_message(
 def get_messages(
     conversation_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     skip: int = 0,
     limit: int = 50,
     before_id: Optional[int] = None,
@@ -330,7 +334,7 @@ def get_messages(
 def mark_conversation_read(
     conversation_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> dict:
     """Mark all messages in a conversation as read."""
     # Check if user is a participant
@@ -369,7 +373,7 @@ def mark_conversation_read(
 
 def _build_conversation_response(
     conversation: Conversation,
-    current_user: UserModel,
+    current_user: Principal,
     db: Session
 ) -> ConversationResponse:
     """Build conversation response with all needed data."""
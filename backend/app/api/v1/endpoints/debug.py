@@ -8,6 +8,22 @@ from app.models.user import User
 from app.models.social_connection import SocialConnection
 from app.core.encryption import decrypt_token
 from app.services.social import LinkedInService
+from app.core.password_hasher import password_hasher
+from app.services import principals
+from app.services.post_verification import post_verifier
+from app.services.publish_jobs import publish_worker
+from app.services.scheduler import draft_scheduler
+from app.services.token_refresh import token_refresher
+from app.services.key_rotation import token_reencryptor
+from app.services.media import media_pipeline
+from app.services.agent_service import agent_service
+from app.services.media_store import media_collector
+from app.services.profiles import profile_cache
+from app.services.sessions import revocation_filter
+from app.services.oauth_state import oauth_states
+from app.services.social.http import social_http
+from app.services.social_graph import social_graph
+from app.services.typeahead import typeahead_index
 
 router = APIRouter()
 
@@ -30,6 +46,31 @@ def check_db_tables(
         return [f"Error: {str(e)}"]
 
 
+@router.get("/metrics", dependencies=[Depends(deps.require_metrics_token)])
+def get_metrics() -> Any:
+    """
+    In-process cache and worker-pool counters for this instance (X-Metrics-Token).
+    """
+    return {
+        "agent": agent_service.stats(),
+        "media_collector": media_collector.stats(),
+        "media_pipeline": media_pipeline.stats(),
+        "oauth_states": oauth_states.stats(),
+        "password_hasher": password_hasher.stats(),
+        "post_verifier": post_verifier.stats(),
+        "principal_cache": principals.stats(),
+        "profile_cache": profile_cache.stats(),
+        "publish_jobs": publish_worker.stats(),
+        "revocation_filter": revocation_filter.stats(),
+        "scheduler": draft_scheduler.stats(),
+        "social_graph": social_graph.stats(),
+        "social_http": social_http.stats(),
+        "token_reencryption": token_reencryptor.stats(),
+        "token_refresh": token_refresher.stats(),
+        "typeahead": typeahead_index.stats(),
+    }
+
+
 @router.get("/linkedin-status")
 async def check_linkedin_status(
     current_user: User = Depends(deps.get_current_user),
@@ -5,6 +5,7 @@ from sqlalchemy import desc
 from datetime import datetime, timezone
 
 from app.api import deps
+from app.services.principals import Principal
 from app.models.user import User as UserModel
 from app.models.notification import Notification, NotificationType as NotificationTypeModel
 from app.schemas.notification import (
@@ -14,6 +15,7 @@ from app.schemas.notification import (
     UnreadCountResponse,
     ActorInfo,
 )
+from app.services.media import avatar_url
 
 router = APIRouter()
 
@@ -57,7 +59,7 @@ def build_notification_response(notification: Notification, actor: Optional[User
             id=actor.id,
             username=actor.username,
             full_name=actor.full_name,
-            profile_picture=actor.profile_picture
+            profile_picture=avatar_url(actor)
         )
     
     return NotificationResponse(
@@ -79,7 +81,7 @@ def build_notification_response(notification: Notification, actor: Optional[User
 @router.get("", response_model=NotificationsListResponse)
 def get_notifications(
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     type_filter: Optional[str] = Query(None, alias="type"),
@@ -133,7 +135,7 @@ def get_notifications(
 @router.get("/unread-count", response_model=UnreadCountResponse)
 def get_unread_count(
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> UnreadCountResponse:
     """Get count of unread notifications for the current user."""
     count = db.query(Notification).filter(
@@ -148,7 +150,7 @@ def get_unread_count(
 def mark_notification_read(
     notification_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> dict:
     """Mark a single notification as read."""
     notification = db.query(Notification).filter(
@@ -172,7 +174,7 @@ def mark_notification_read(
 @router.put("/mark-all-read")
 def mark_all_notifications_read(
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> dict:
     """Mark all notifications as read for the current user."""
     now = datetime.now(timezone.utc)
@@ -194,7 +196,7 @@ def mark_all_notifications_read(
 def delete_notification(
     notification_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> dict:
     """Delete a notification."""
     notification = db.query(Notification).filter(
@@ -4,13 +4,14 @@ Handles OAuth flow and managing social platform connections.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 import secrets
 from datetime import datetime
 
 from app.api import deps
-from app.models.user import User
+from app.services.principals import Principal
 from app.models.social_connection import SocialConnection
 from app.schemas.social_connection import (
     SocialConnectionResponse,
@@ -19,30 +20,16 @@ from app.schemas.social_connection import (
     OAuthCallbackRequest,
 )
 from app.core.encryption import encrypt_token, decrypt_token
-from app.services.social import (
-    InstagramService,
-    TwitterService,
-    LinkedInService,
-    FacebookService,
-)
+from app.services.oauth_state import oauth_states
+from app.services import token_refresh
+from app.services.publishing import SERVICES
 
 router = APIRouter()
 
-# Service instances
-SERVICES = {
-    "instagram": InstagramService(),
-    "twitter": TwitterService(),
-    "linkedin": LinkedInService(),
-    "facebook": FacebookService(),
-}
-
-# In-memory state storage (in production, use Redis or DB)
-OAUTH_STATES = {}
-
 
 @router.get("/connections", response_model=SocialConnectionList)
 async def get_connections(
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     db: Session = Depends(deps.get_db),
 ):
     """Get all social connections for the authenticated user"""
@@ -76,7 +63,7 @@ async def get_connections(
 @router.get("/{platform}/authorize", response_model=OAuthAuthorizeResponse)
 async def authorize(
     platform: str,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ):
     """Get OAuth authorization URL for a platform"""
     if platform not in SERVICES:
@@ -88,11 +75,12 @@ async def authorize(
     service = SERVICES[platform]
     state = secrets.token_urlsafe(32)
     
-    # Store state with user info
-    OAUTH_STATES[state] = {
+    # State with user info
+    state_data = {
         "user_id": current_user.id,
         "platform": platform,
     }
+    aliases = []
     
     auth_data = await service.get_authorization_url(state)
     
@@ -100,14 +88,16 @@ async def authorize(
         authorization_url = auth_data["url"]
         # Store code_verifier for PKCE (OAuth 2.0) or request_secret for OAuth 1.0a
         if "code_verifier" in auth_data:
-            OAUTH_STATES[state]["code_verifier"] = auth_data["code_verifier"]
+            state_data["code_verifier"] = auth_data["code_verifier"]
         if "oauth_token_secret" in auth_data:
-            OAUTH_STATES[state]["request_secret"] = auth_data["oauth_token_secret"]
+            state_data["request_secret"] = auth_data["oauth_token_secret"]
             if "oauth_token" in auth_data:
-                OAUTH_STATES[auth_data["oauth_token"]] = OAUTH_STATES[state]
+                aliases.append(auth_data["oauth_token"])
     else:
         authorization_url = auth_data
     
+    await run_in_threadpool(oauth_states.put, state, state_data, aliases)
+    
     return OAuthAuthorizeResponse(
         authorization_url=authorization_url,
         state=state,
@@ -133,11 +123,11 @@ async def callback(
     if not state_key and request.oauth_token:
         state_key = request.oauth_token
         
-    state_data = OAUTH_STATES.pop(state_key, None)
+    state_data = await run_in_threadpool(oauth_states.pop, state_key)
     
     # If not found, try looking up by oauth_token explicitly if state was sent but invalid
     if not state_data and request.oauth_token:
-        state_data = OAUTH_STATES.pop(request.oauth_token, None)
+        state_data = await run_in_threadpool(oauth_states.pop, request.oauth_token)
         
     if not state_data:
         raise HTTPException(
@@ -186,6 +176,8 @@ async def callback(
         existing.access_token = encrypt_token(token_data["access_token"])
         existing.refresh_token = encrypt_token(token_data.get("refresh_token", "") or "")
         existing.token_expires_at = token_data.get("expires_at")
+        existing.token_refresh_attempted_at = None
+        existing.token_refresh_error = None
         existing.updated_at = datetime.utcnow()
         db.commit()
         connection = existing
@@ -325,7 +317,7 @@ async def callback_redirect(
 @router.delete("/{platform}/disconnect")
 async def disconnect(
     platform: str,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     db: Session = Depends(deps.get_db),
 ):
     """Disconnect a social platform"""
@@ -358,7 +350,7 @@ async def disconnect(
 @router.post("/{platform}/refresh")
 async def refresh_token(
     platform: str,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     db: Session = Depends(deps.get_db),
 ):
     """Refresh access token for a platform"""
@@ -373,17 +365,16 @@ async def refresh_token(
             detail=f"No {platform} connection found"
         )
     
-    if not connection.refresh_token:
+    service = SERVICES[platform]
+    if not service.supports_refresh:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No refresh token available. Please reconnect."
+            detail=f"{platform} does not support token refresh. Please reconnect."
         )
     
-    service = SERVICES[platform]
-    
     try:
-        refresh_token = decrypt_token(connection.refresh_token)
-        new_tokens = await service.refresh_access_token(refresh_token)
+        token = token_refresh.refresh_input(service, connection.access_token, connection.refresh_token)
+        new_tokens = await service.refresh_access_token(token)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -391,11 +382,7 @@ async def refresh_token(
         )
     
     # Update tokens
-    connection.access_token = encrypt_token(new_tokens["access_token"])
-    if new_tokens.get("refresh_token"):
-        connection.refresh_token = encrypt_token(new_tokens["refresh_token"])
-    connection.token_expires_at = new_tokens.get("expires_at")
-    connection.updated_at = datetime.utcnow()
+    token_refresh.apply_tokens(connection, new_tokens)
     db.commit()
     
     return {"success": True, "expires_at": connection.token_expires_at}
@@ -1,24 +1,45 @@
 from typing import Any, List, Optional
+from datetime import datetime, timezone
 import secrets
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, or_, and_
 
 from app.api import deps
 from app.models.post import Post
 from app.models.user import User
 from app.models.like import Like
-from app.models.follow import Follow
 from app.models.comment import Comment
 from app.models.saved_post import SavedPost
+from app.models.hashtag import Hashtag, PostHashtag
 from app.schemas import post as post_schema
 from app.schemas import like as like_schema
 from app.schemas import comment as comment_schema
+from app.schemas import social as social_schema
+from app import crud
 from app.crud.crud_saved_post import saved_post as saved_post_crud
 from app.core import security
-from app.core.encryption import decrypt_token
-from app.models.social_connection import SocialConnection
-from app.services.social.linkedin import LinkedInService
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services import scheduler
+from app.services.media import attach_post_variants, avatar_url, media_pipeline
+from app.services.media_store import track_references
+from app.services.agent_service import invalidate_agent_context
+from app.services.post_verification import post_verifier
+from app.services.principals import Principal
+from app.services.social_graph import social_graph
+from app.services.profiles import (
+    build_public_profile,
+    get_cached_page,
+    invalidate_profile_view,
+    invalidate_profiles,
+    set_cached_page,
+)
+from app.services.hashtags import (
+    index_post_hashtags,
+    normalize_hashtag,
+    trending_hashtags,
+    unindex_posts_hashtags,
+)
 
 router = APIRouter()
 
@@ -26,25 +47,26 @@ router = APIRouter()
 def _build_post_response(
     post: Post, 
     current_user: Optional[User] = None, 
-    db: Optional[Session] = None
+    db: Optional[Session] = None,
+    is_liked: Optional[bool] = None,
+    is_saved: Optional[bool] = None,
 ) -> post_schema.Post:
-    """Helper to build post response with user info, like status, and saved status."""
+    """
+    Helper to build post response with user info, like status, and saved status.
+    Pass is_liked / is_saved when already known to skip the per-post queries.
+    """
     result = post_schema.Post.from_orm(post)
     
     # Check if current user is following the post owner
     is_following = False
     if current_user and db and current_user.id != post.owner.id:
-        follow_exists = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == post.owner.id
-        ).first()
-        is_following = follow_exists is not None
+        is_following = social_graph.is_following(db, current_user.id, post.owner.id)
 
     result.user = {
         "id": post.owner.id,
         "username": post.owner.username,
         "full_name": post.owner.full_name,
-        "profile_picture": post.owner.profile_picture,
+        "profile_picture": avatar_url(post.owner),
         "is_verified": False,
         "is_following": is_following,
     }
@@ -52,20 +74,55 @@ def _build_post_response(
     
     # Check if current user has liked the post
     if current_user and db:
-        like_exists = db.query(Like).filter(
-            Like.user_id == current_user.id,
-            Like.post_id == post.id
-        ).first()
-        result.is_liked = like_exists is not None
+        if is_liked is None:
+            is_liked = db.query(Like).filter(
+                Like.user_id == current_user.id,
+                Like.post_id == post.id
+            ).first() is not None
+        result.is_liked = is_liked
         
         # Check if current user has saved the post
-        result.is_saved = saved_post_crud.is_post_saved(
-            db, user_id=current_user.id, post_id=post.id
-        )
+        if is_saved is None:
+            is_saved = saved_post_crud.is_post_saved(
+                db, user_id=current_user.id, post_id=post.id
+            )
+        result.is_saved = is_saved
     
     return result
 
 
+def _build_post_responses(
+    posts: List[Post],
+    current_user: Optional[User] = None,
+    db: Optional[Session] = None
+) -> List[post_schema.Post]:
+    """Build responses for a page of posts with one like query and one saved query for the page."""
+    liked_ids, saved_ids = set(), set()
+    if current_user and db and posts:
+        post_ids = [p.id for p in posts]
+        liked_ids = {
+            post_id for (post_id,) in db.query(Like.post_id).filter(
+                Like.user_id == current_user.id,
+                Like.post_id.in_(post_ids)
+            )
+        }
+        saved_ids = {
+            post_id for (post_id,) in db.query(SavedPost.post_id).filter(
+                SavedPost.user_id == current_user.id,
+                SavedPost.post_id.in_(post_ids)
+            )
+        }
+    
+    return [
+        _build_post_response(
+            p, current_user, db,
+            is_liked=p.id in liked_ids,
+            is_saved=p.id in saved_ids,
+        )
+        for p in posts
+    ]
+
+
 @router.post("/", response_model=post_schema.Post)
 def create_post(
     post_in: post_schema.PostCreate,
@@ -86,6 +143,9 @@ def create_post(
         share_token=share_token,
     )
     db.add(post)
+    tags = index_post_hashtags(db, post)
+    unprocessed_media = attach_post_variants(db, post)
+    track_references(db, None, post.media_urls)
     
     # Update user post count
     current_user.posts_count += 1
@@ -93,6 +153,9 @@ def create_post(
     
     db.commit()
     db.refresh(post)
+    trending_hashtags.record(tags)
+    invalidate_profiles(current_user.id)
+    media_pipeline.enqueue(unprocessed_media)
     
     return _build_post_response(post, current_user, db)
 
@@ -113,9 +176,7 @@ def get_feed(
     total = db.query(Post).filter(Post.is_draft == False).count()
     posts = db.query(Post).filter(Post.is_draft == False).order_by(desc(Post.created_at)).offset(skip).limit(size).all()
     
-    post_list = []
-    for p in posts:
-        post_list.append(_build_post_response(p, current_user, db))
+    post_list = _build_post_responses(posts, current_user, db)
     
     return {
         "items": post_list,
@@ -127,7 +188,7 @@ def get_feed(
 
 
 @router.get("/user/{user_id}", response_model=post_schema.PostFeed)
-async def get_user_posts(
+def get_user_posts(
     user_id: int,
     db: Session = Depends(deps.get_db),
     page: int = 1,
@@ -156,59 +217,16 @@ async def get_user_posts(
     total = query.count()
     posts = query.order_by(desc(Post.created_at)).offset(skip).limit(size).all()
     
-    # If platform is LinkedIn, we need to verify post status
-    valid_posts = []
-    if platform == 'LinkedIn':
-        # Get LinkedIn connection
-        connection = db.query(SocialConnection).filter(
-            SocialConnection.user_id == user_id,
-            SocialConnection.platform == 'linkedin'
-        ).first()
+    post_list = _build_post_responses(posts, current_user, db)
 
-        linkedin_service = LinkedInService()
-        
-        for p in posts:
-            is_valid = True
-            # Check if we have an external ID for this platform
-            # platforms can be a list (old data) or dict (new data)
-            platform_data = p.platforms
-            if isinstance(platform_data, dict) and 'linkedin' in platform_data:
-                # New data format with metadata
-                meta = platform_data['linkedin']
-                if isinstance(meta, dict) and 'post_id' in meta:
-                    post_urn = meta['post_id']
-                    
-                    # Verify existence if we have a valid token
-                    if connection and connection.access_token:
-                        try:
-                            token = decrypt_token(connection.access_token)
-                            exists = await linkedin_service.check_post_exists(token, post_urn)
-                            
-                            if not exists:
-                                is_valid = False
-                                # Update DB: remove linkedin from platforms
-                                # If it's the only platform, maybe delete post? 
-                                # For now, just remove key to hide from LinkedIn tab
-                                del platform_data['linkedin']
-                                p.platforms = platform_data
-                                db.add(p)
-                                # Don't commit inside loop optimally, but for user safety/simplicity:
-                                db.commit() 
-                        except Exception:
-                            # If check fails (network/auth), assume valid to show user
-                            pass
-            
-            if is_valid:
-                valid_posts.append(p)
-        
-        # Update total count approximate
-        posts = valid_posts
-        
-    post_list = [_build_post_response(p, current_user, db) for p in posts]
+    # Deleted LinkedIn posts are dropped from `platforms` by the background
+    # verifier; viewing the tab moves this user to the front of its queue
+    if platform == 'LinkedIn':
+        post_verifier.request(db, user_id)
     
     return {
         "items": post_list,
-        "total": total, # Note: Total might be slightly off if we filtered items, but acceptable
+        "total": total,
         "page": page,
         "size": size,
         "has_more": (skip + size) < total
@@ -238,7 +256,7 @@ def get_my_posts(
         Post.is_draft == False
     ).order_by(desc(Post.created_at)).offset(skip).limit(size).all()
     
-    post_list = [_build_post_response(p, current_user, db) for p in posts]
+    post_list = _build_post_responses(posts, current_user, db)
     
     return {
         "items": post_list,
@@ -249,9 +267,156 @@ def get_my_posts(
     }
 
 
+@router.get("/profile/{user_id}", response_model=social_schema.ProfilePage)
+def get_profile_page(
+    user_id: int,
+    db: Session = Depends(deps.get_db),
+    size: int = Query(12, ge=1, le=50),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Profile screen in one call: public profile with both relationship flags
+    and the first page of the user's posts. Cached per viewer for a few seconds;
+    follows, new / deleted posts and profile edits drop the cached page.
+    """
+    cached = get_cached_page(current_user.id, user_id, size)
+    if cached is not None:
+        return cached
+    
+    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # posts_count is maintained on create / publish / delete, so no count query
+    total = user.posts_count or 0
+    posts = db.query(Post).filter(
+        Post.user_id == user_id,
+        Post.is_draft == False
+    ).order_by(desc(Post.created_at)).limit(size).all()
+    
+    page = social_schema.ProfilePage(
+        profile=build_public_profile(db, current_user.id, user),
+        posts=post_schema.PostFeed(
+            items=_build_post_responses(posts, current_user, db),
+            total=total,
+            page=1,
+            size=size,
+            has_more=size < total,
+        ),
+    ).model_dump()
+    set_cached_page(current_user.id, user_id, size, page)
+    
+    return page
+
+
+# ============== Search & Hashtag Endpoints ==============
+# NOTE: These MUST come BEFORE /{post_id} routes to avoid path parameter conflicts
+
+@router.get("/search", response_model=post_schema.PostFeed)
+def search_posts(
+    q: str,
+    db: Session = Depends(deps.get_db),
+    page: int = 1,
+    size: int = Query(20, ge=1, le=50),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Full-text search over published posts.
+    """
+    if len(q.strip()) < 2:
+        raise HTTPException(status_code=400, detail="Search query must be at least 2 characters")
+    
+    skip = (page - 1) * size
+    posts, total, has_more = crud.post.search(db, query=q, skip=skip, limit=size)
+    
+    return {
+        "items": _build_post_responses(posts, current_user, db),
+        "total": total,
+        "page": page,
+        "size": size,
+        "has_more": has_more
+    }
+
+
+@router.get("/hashtags/trending", response_model=post_schema.TrendingHashtags)
+def get_trending_hashtags(
+    window_hours: int = Query(24, ge=1, le=168),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Most used hashtags over a sliding window, served from in-memory counters.
+    """
+    return {
+        "items": [
+            {"tag": tag, "count": count}
+            for tag, count in trending_hashtags.top(window_hours=window_hours, limit=limit)
+        ],
+        "window_hours": window_hours,
+    }
+
+
+@router.get("/hashtags/{tag}", response_model=post_schema.PostCursorPage)
+def get_hashtag_posts(
+    tag: str,
+    db: Session = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    size: int = Query(20, ge=1, le=50),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Posts using a hashtag, newest first. Pass `next_cursor` back as `cursor` for the next page.
+    """
+    hashtag = db.query(Hashtag).filter(Hashtag.tag == normalize_hashtag(tag)).first()
+    if not hashtag:
+        return {"items": [], "next_cursor": None, "has_more": False}
+    
+    query = db.query(PostHashtag).filter(PostHashtag.hashtag_id == hashtag.id)
+    after = decode_cursor(cursor)
+    if after:
+        created_at, link_id = after
+        query = query.filter(or_(
+            PostHashtag.created_at < created_at,
+            and_(PostHashtag.created_at == created_at, PostHashtag.id < link_id),
+        ))
+    
+    # Fetch one extra row to know whether another page exists
+    links = query.order_by(
+        desc(PostHashtag.created_at), desc(PostHashtag.id)
+    ).limit(size + 1).all()
+    has_more = len(links) > size
+    links = links[:size]
+    
+    post_ids = [link.post_id for link in links]
+    posts_by_id = {}
+    if post_ids:
+        posts_by_id = {
+            p.id: p for p in db.query(Post).filter(
+                Post.id.in_(post_ids),
+                Post.is_draft == False
+            ).all()
+        }
+    
+    return {
+        "items": _build_post_responses(
+            [posts_by_id[pid] for pid in post_ids if pid in posts_by_id], current_user, db
+        ),
+        "next_cursor": encode_cursor(links[-1].created_at, links[-1].id) if has_more else None,
+        "has_more": has_more,
+    }
+
+
 # ============== Draft Endpoints ==============
 # NOTE: These MUST come BEFORE /{post_id} routes to avoid path parameter conflicts
 
+def _validate_schedule(scheduled_at: Optional[datetime]) -> Optional[datetime]:
+    """Normalize a draft's schedule to UTC; it must lie in the future."""
+    scheduled_at = scheduler.normalize_schedule(scheduled_at)
+    if scheduled_at and scheduled_at <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=400, detail="scheduled_at must be in the future")
+    return scheduled_at
+
+
 @router.post("/drafts", response_model=post_schema.Post)
 def create_draft(
     draft_in: post_schema.DraftCreate,
@@ -260,6 +425,7 @@ def create_draft(
 ) -> Any:
     """
     Create a new draft.
+    With scheduled_at set, the draft is published automatically at that time.
     """
     share_token = secrets.token_urlsafe(16)
     
@@ -271,10 +437,16 @@ def create_draft(
         user_id=current_user.id,
         is_draft=True,
         share_token=share_token,
+        scheduled_at=_validate_schedule(draft_in.scheduled_at),
     )
     db.add(draft)
+    unprocessed_media = attach_post_variants(db, draft)
+    track_references(db, None, draft.media_urls)
     db.commit()
     db.refresh(draft)
+    scheduler.notify_scheduled(draft)
+    media_pipeline.enqueue(unprocessed_media)
+    invalidate_agent_context(current_user.id)
     
     return _build_post_response(draft, current_user, db)
 
@@ -292,7 +464,7 @@ def get_drafts(
         Post.is_draft == True
     ).order_by(desc(Post.created_at)).all()
     
-    draft_list = [_build_post_response(d, current_user, db) for d in drafts]
+    draft_list = _build_post_responses(drafts, current_user, db)
     
     return {"items": draft_list, "total": len(draft_list)}
 
@@ -340,15 +512,27 @@ def update_draft(
     # Update fields if provided
     if draft_in.content is not None:
         draft.content = draft_in.content
+    unprocessed_media = []
     if draft_in.media_urls is not None:
+        track_references(db, draft.media_urls, draft_in.media_urls)
         draft.media_urls = draft_in.media_urls
+        unprocessed_media = attach_post_variants(db, draft)
     if draft_in.platforms is not None:
         draft.platforms = draft_in.platforms
     if draft_in.title is not None:
         draft.title = draft_in.title
+    # Explicit null unschedules
+    if "scheduled_at" in draft_in.model_fields_set:
+        draft.scheduled_at = _validate_schedule(draft_in.scheduled_at)
+    # An edit may fix what made a scheduled publish fail: retry without backoff
+    draft.schedule_attempts = 0
+    draft.schedule_retry_at = None
     
     db.commit()
     db.refresh(draft)
+    scheduler.notify_scheduled(draft)
+    media_pipeline.enqueue(unprocessed_media)
+    invalidate_agent_context(current_user.id)
     
     return _build_post_response(draft, current_user, db)
 
@@ -371,8 +555,10 @@ def delete_draft(
     if not draft:
         raise HTTPException(status_code=404, detail="Draft not found")
     
+    track_references(db, draft.media_urls, None)
     db.delete(draft)
     db.commit()
+    invalidate_agent_context(current_user.id)
     
     return {"message": "Draft deleted successfully", "id": draft_id}
 
@@ -386,8 +572,6 @@ def publish_draft(
     """
     Publish a draft (convert to published post).
     """
-    from datetime import datetime
-    
     draft = db.query(Post).filter(
         Post.id == draft_id,
         Post.user_id == current_user.id,
@@ -400,12 +584,15 @@ def publish_draft(
     # Convert to published post
     draft.is_draft = False
     draft.published_at = datetime.utcnow()
+    tags = index_post_hashtags(db, draft)
     
     # Update user post count
     current_user.posts_count = (current_user.posts_count or 0) + 1
     
     db.commit()
     db.refresh(draft)
+    trending_hashtags.record(tags)
+    invalidate_profiles(current_user.id)
     
     return _build_post_response(draft, current_user, db)
 
@@ -430,7 +617,7 @@ def get_saved_posts(
         db, user_id=current_user.id, skip=skip, limit=size
     )
     
-    post_list = [_build_post_response(p, current_user, db) for p in posts]
+    post_list = _build_post_responses(posts, current_user, db)
     
     return {
         "items": post_list,
@@ -455,6 +642,7 @@ def save_post(
         raise HTTPException(status_code=404, detail="Post not found")
     
     saved_post_crud.save_post(db, user_id=current_user.id, post_id=post_id)
+    invalidate_profile_view(current_user.id, post.user_id)
     
     return {
         "message": "Post saved successfully",
@@ -476,6 +664,9 @@ def unsave_post(
     
     if not removed:
         raise HTTPException(status_code=404, detail="Saved post not found")
+    owner_id = db.query(Post.user_id).filter(Post.id == post_id).scalar()
+    if owner_id:
+        invalidate_profile_view(current_user.id, owner_id)
     
     return {
         "message": "Post unsaved successfully",
@@ -579,6 +770,7 @@ def toggle_like(
         db.delete(existing_like)
         post.likes_count = max(0, post.likes_count - 1)
         db.commit()
+        invalidate_profile_view(current_user.id, post.user_id)
         
         return {
             "is_liked": False,
@@ -606,6 +798,7 @@ def toggle_like(
             db.add(notification)
             
         db.commit()
+        invalidate_profile_view(current_user.id, post.user_id)
         
         return {
             "is_liked": True,
@@ -640,7 +833,7 @@ def get_post_likes(
                 "id": like.user.id,
                 "username": like.user.username,
                 "full_name": like.user.full_name,
-                "profile_picture": like.user.profile_picture,
+                "profile_picture": avatar_url(like.user),
             },
             "created_at": like.created_at,
         })
@@ -699,7 +892,7 @@ def create_comment(
             "id": current_user.id,
             "username": current_user.username,
             "full_name": current_user.full_name,
-            "profile_picture": current_user.profile_picture,
+            "profile_picture": avatar_url(current_user),
         }
     }
 
@@ -734,7 +927,7 @@ def get_post_comments(
                 "id": c.user.id,
                 "username": c.user.username,
                 "full_name": c.user.full_name,
-                "profile_picture": c.user.profile_picture,
+                "profile_picture": avatar_url(c.user),
             }
         })
     
@@ -798,7 +991,11 @@ def delete_post(
         current_user.posts_count = max(0, (current_user.posts_count or 0) - 1)
         db.add(current_user)
     
+    track_references(db, post.media_urls, None)
+    tags = unindex_posts_hashtags(db, [post.id])
     db.delete(post)
     db.commit()
+    trending_hashtags.record(tags)
+    invalidate_profiles(current_user.id)
     
     return {"message": "Post deleted successfully", "id": post_id}
@@ -2,16 +2,21 @@
 Global presence tracking for online status.
 Manages WebSocket connections for real-time online/offline updates.
 """
-from typing import Dict, Set
+from typing import Any, Dict, Set
+import asyncio
 import logging
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core import events
+from app.services import publish_jobs
 from app.models.user import User as UserModel
-from app.models.follow import Follow
+from app.services.social_graph import social_graph
+from app.services.principals import Principal
 from app.schemas.presence import OnlineUser, OnlineFollowingResponse, PresenceEvent
+from app.services.media import avatar_url
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -28,17 +33,17 @@ class PresenceManager:
         self.active_connections: Dict[int, WebSocket] = {}
         # user_id -> set of follower user_ids (for efficient broadcasting)
         self.follower_cache: Dict[int, Set[int]] = {}
+        # Loop owning the sockets, for events arriving on other threads
+        self._loop: asyncio.AbstractEventLoop = None
     
     async def connect(self, websocket: WebSocket, user: UserModel, db: Session):
         """Accept connection and add user to online tracking."""
         await websocket.accept()
+        self._loop = asyncio.get_running_loop()
         self.active_connections[user.id] = websocket
         
         # Cache this user's followers for efficient broadcasting
-        followers = db.query(Follow.follower_id).filter(
-            Follow.following_id == user.id
-        ).all()
-        self.follower_cache[user.id] = {f.follower_id for f in followers}
+        self.follower_cache[user.id] = set(social_graph.followers(db, user.id))
         
         logger.info(f"User {user.id} ({user.username}) connected to presence")
         
@@ -72,7 +77,7 @@ class PresenceManager:
                 "is_online": is_online,
                 "username": user.username,
                 "full_name": user.full_name,
-                "profile_picture": user.profile_picture,
+                "profile_picture": avatar_url(user),
             }
         }
         
@@ -84,13 +89,26 @@ class PresenceManager:
                 except Exception as e:
                     logger.error(f"Error sending presence to user {follower_id}: {e}")
     
+    async def send_to_user(self, user_id: int, event: Dict[str, Any]):
+        """Send an event to a user's presence socket, if they are connected here."""
+        websocket = self.active_connections.get(user_id)
+        if websocket is None:
+            return
+        try:
+            await websocket.send_json(event)
+        except Exception as e:
+            logger.error(f"Error sending {event.get('type')} to user {user_id}: {e}")
+    
+    def send_to_user_threadsafe(self, user_id: int, event: Dict[str, Any]):
+        """send_to_user from any thread (event-bus handlers)."""
+        loop = self._loop
+        if user_id in self.active_connections and loop is not None and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.send_to_user(user_id, event), loop)
+    
     async def send_initial_online_list(self, websocket: WebSocket, user_id: int, db: Session):
         """Send the list of currently online following users to a newly connected user."""
         # Get users that this user is following
-        following = db.query(Follow.following_id).filter(
-            Follow.follower_id == user_id
-        ).all()
-        following_ids = {f.following_id for f in following}
+        following_ids = set(social_graph.following(db, user_id))
         
         # Filter to only online users
         online_following_ids = following_ids & self.get_online_user_ids()
@@ -109,7 +127,7 @@ class PresenceManager:
                             "id": u.id,
                             "username": u.username,
                             "full_name": u.full_name,
-                            "profile_picture": u.profile_picture,
+                            "profile_picture": avatar_url(u),
                         }
                         for u in online_users
                     ]
@@ -121,20 +139,15 @@ class PresenceManager:
 presence_manager = PresenceManager()
 
 
-def get_user_from_token(token: str, db: Session) -> UserModel:
-    """Validate JWT token and return user."""
-    from app.core.security import decode_access_token
-    
-    payload = decode_access_token(token)
-    if not payload:
-        return None
-    
-    user_id = payload.get("sub")
-    if not user_id:
-        return None
-    
-    user = db.query(UserModel).filter(UserModel.id == int(user_id)).first()
-    return user
+def _on_publish_job_finished(data: Dict[str, Any]) -> None:
+    presence_manager.send_to_user_threadsafe(
+        data["user_id"],
+        {"type": "publish_job_finished", "data": data},
+    )
+
+
+# Published by whichever instance ran the job; delivered by the one holding the socket
+events.subscribe(publish_jobs.FINISHED_TOPIC, _on_publish_job_finished)
 
 
 # ============== REST Endpoints ==============
@@ -142,17 +155,14 @@ def get_user_from_token(token: str, db: Session) -> UserModel:
 @router.get("/following/online", response_model=OnlineFollowingResponse)
 def get_online_following(
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ):
     """
     Get list of following users who are currently online.
     Used for initial load of the online users bar.
     """
     # Get users that current user is following
-    following = db.query(Follow.following_id).filter(
-        Follow.follower_id == current_user.id
-    ).all()
-    following_ids = {f.following_id for f in following}
+    following_ids = set(social_graph.following(db, current_user.id))
     
     # Filter to only online users
     online_ids = following_ids & presence_manager.get_online_user_ids()
@@ -171,7 +181,7 @@ def get_online_following(
                 id=u.id,
                 username=u.username,
                 full_name=u.full_name,
-                profile_picture=u.profile_picture,
+                profile_picture=avatar_url(u),
             )
             for u in online_users
         ],
@@ -194,6 +204,7 @@ async def websocket_presence(
     Events received:
     - initial_online_list: List of following users currently online
     - presence_change: User came online/offline
+    - publish_job_finished: A background publish job finished (see /publish/jobs)
     
     Events to send:
     - heartbeat: Send periodically to keep connection alive
@@ -202,7 +213,7 @@ async def websocket_presence(
     
     try:
         # Authenticate user
-        user = get_user_from_token(token, db)
+        user = deps.get_user_from_token(token, db)
         if not user:
             await websocket.close(code=4001, reason="Invalid token")
             return
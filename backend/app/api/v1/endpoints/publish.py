@@ -2,39 +2,53 @@
 Content Publishing API endpoint.
 Publish content to connected social platforms.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from app.api import deps
 from app.models.user import User
 from app.models.social_connection import SocialConnection
 from app.models.post import Post  # Added import
-from app.schemas.social_connection import PublishRequest, PublishResponse
-from app.core.encryption import decrypt_token
-from app.core.encryption import decrypt_token
-from app.services.social import (
-    InstagramService,
-    TwitterService,
-    LinkedInService,
-    FacebookService,
-)
+from app.models.publish_job import PublishJob
+from app.schemas.social_connection import PublishJobResponse, PublishRequest, PublishResponse
+from app.services import publish_jobs, publishing
+from app.services.principals import Principal
+from app.services.hashtags import index_post_hashtags, trending_hashtags
+from app.services.media import attach_post_variants, media_pipeline
+from app.services.media_store import track_references
+from app.services.profiles import invalidate_profiles
 
 router = APIRouter()
 
-# Service instances
-SERVICES = {
-    "instagram": InstagramService(),
-    "twitter": TwitterService(),
-    "linkedin": LinkedInService(),
-    "facebook": FacebookService(),
-}
+
+def _add_internal_post(db: Session, current_user: User, request: PublishRequest):
+    """
+    Add (and flush) the Inspire post for a publish request.
+    Returns (post, hashtag uses, media URLs to enqueue for variants after commit).
+    """
+    internal_post = Post(
+        user_id=current_user.id,
+        content=request.content,
+        media_urls=request.media_urls,
+        platforms=request.platforms,
+        published_at=datetime.utcnow()
+    )
+    db.add(internal_post)
+    tags = index_post_hashtags(db, internal_post)
+    unprocessed_media = attach_post_variants(db, internal_post)
+    track_references(db, None, internal_post.media_urls)
+    current_user.posts_count += 1
+    db.flush()
+    return internal_post, tags, unprocessed_media
 
 
 @router.post("/", response_model=PublishResponse)
 async def publish_content(
     request: PublishRequest,
+    response: Response,
     current_user: User = Depends(deps.get_current_user),
     db: Session = Depends(deps.get_db),
 ):
@@ -42,7 +56,8 @@ async def publish_content(
     Publish content to one or more connected social platforms.
     
     The content will be posted to all specified platforms that have
-    valid connections.
+    valid connections. Platforms are published concurrently; each result
+    includes its latency_ms (also sent as a Server-Timing header).
     """
     if not request.platforms:
         raise HTTPException(
@@ -56,92 +71,114 @@ async def publish_content(
         SocialConnection.platform.in_(request.platforms),
     ).all()
     
-    connections_by_platform = {c.platform: c for c in connections}
-    
     # Create internal post record
-    internal_post = Post(
-        user_id=current_user.id,
-        content=request.content,
-        media_urls=request.media_urls,
-        platforms=request.platforms,
-        published_at=datetime.utcnow()
-    )
-    db.add(internal_post)
-    current_user.posts_count += 1
+    internal_post, tags, unprocessed_media = _add_internal_post(db, current_user, request)
     db.commit()
     db.refresh(internal_post)
+    trending_hashtags.record(tags)
+    invalidate_profiles(current_user.id)
+    media_pipeline.enqueue(unprocessed_media)
     
-    results: Dict[str, Any] = {}
-    success_count = 0
+    # Everything the platform calls need is read here; no DB access while they run
+    targets, errors = publishing.resolve_targets(request.platforms, connections)
+    published = await publishing.publish_to_platforms(
+        targets, request.content, request.media_urls
+    )
     
+    results: Dict[str, Any] = {}
     for platform in request.platforms:
         # Handle 'inspire' as internal platform - always succeeds since post is already created
-        if platform == "inspire":
+        if platform == publishing.INTERNAL_PLATFORM:
             results[platform] = {
                 "success": True,
                 "post_id": internal_post.id,
                 "message": "Published to Inspire feed"
             }
-            success_count += 1
-            continue
-        
-        if platform not in SERVICES:
-            results[platform] = {
-                "success": False,
-                "error": f"Unknown platform: {platform}"
-            }
-            continue
-        
-        connection = connections_by_platform.get(platform)
-        if not connection:
-            results[platform] = {
-                "success": False,
-                "error": f"Not connected to {platform}. Please connect your {platform} account first."
-            }
-            continue
-        
-        # Check token expiry
-        if connection.token_expires_at and datetime.utcnow() >= connection.token_expires_at:
-            results[platform] = {
-                "success": False,
-                "error": "Token expired. Please reconnect your account."
-            }
-            continue
-        
-        # Try to publish
-        service = SERVICES[platform]
-        try:
-            access_token = decrypt_token(connection.access_token)
-            result = await service.publish_post(
-                access_token=access_token,
-                content=request.content,
-                media_urls=request.media_urls,
-            )
-            results[platform] = {
-                "success": True,
-                "post_id": result.get("post_id"),
-                "url": result.get("url"),
-            }
-            success_count += 1
-        except Exception as e:
-            results[platform] = {
-                "success": False,
-                "error": str(e)
-            }
-            
+        else:
+            results[platform] = published.get(platform) or errors[platform]
+    success_count = sum(1 for r in results.values() if r.get("success"))
+    
     # Update post platforms with successful publish details (IDs, URLs)
-    successful_platforms = {k: v for k, v in results.items() if v.get("success")}
+    successful_platforms = {
+        k: {f: v for f, v in r.items() if f != "latency_ms"}
+        for k, r in results.items() if r.get("success")
+    }
     # Update the JSON column with the dictionary of successful platforms and their metadata
     internal_post.platforms = successful_platforms
     db.add(internal_post)
     db.commit()
     
+    timing = publishing.server_timing(results)
+    if timing:
+        response.headers["Server-Timing"] = timing
+    
     return PublishResponse(
         success=success_count > 0,
         results=results,
     )
 
 
+# ============== Background Jobs ==============
+
+@router.post("/jobs", response_model=PublishJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def enqueue_publish_job(
+    request: PublishRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=128),
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Publish in the background and return immediately.
+    
+    Poll GET /publish/jobs/{id} or wait for the `publish_job_finished` event
+    on the presence WebSocket. Repeating a request with the same
+    Idempotency-Key header returns the original job instead of posting twice.
+    """
+    if not request.platforms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one platform must be specified"
+        )
+    
+    existing = publish_jobs.find_by_idempotency_key(db, current_user.id, idempotency_key)
+    if existing:
+        return existing
+    
+    internal_post, tags, unprocessed_media = _add_internal_post(db, current_user, request)
+    job = publish_jobs.create_job(db, internal_post, request.platforms, idempotency_key)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Concurrent request with the same Idempotency-Key won
+        db.rollback()
+        existing = publish_jobs.find_by_idempotency_key(db, current_user.id, idempotency_key)
+        if existing:
+            return existing
+        raise
+    db.refresh(job)
+    trending_hashtags.record(tags)
+    invalidate_profiles(current_user.id)
+    publish_jobs.notify_enqueued(job)
+    media_pipeline.enqueue(unprocessed_media)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=PublishJobResponse)
+def get_publish_job(
+    job_id: int,
+    current_user: Principal = Depends(deps.get_current_principal),
+    db: Session = Depends(deps.get_db),
+):
+    """Status of a background publish job, per platform."""
+    job = db.query(PublishJob).filter(
+        PublishJob.id == job_id,
+        PublishJob.user_id == current_user.id,
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Publish job not found")
+    return job
+
+
 @router.get("/platforms")
 async def get_available_platforms():
     """Get list of available social platforms"""
@@ -1,10 +1,19 @@
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, or_
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.models.user import User as UserModel
 from app.models.settings import UserSettings as SettingsModel
+from app.models.follow import Follow
+from app.models.post import Post
 from app.schemas.settings import UserSettings, UserSettingsUpdate
+from app.services.hashtags import trending_hashtags, unindex_posts_hashtags
+from app.services.typeahead import typeahead_index
+from app.services.social_graph import social_graph
+from app.services.profiles import invalidate_profiles
+from app.services.principals import Principal, invalidate_principal
+from app.services.media_store import track_references
 
 router = APIRouter()
 
@@ -12,7 +21,7 @@ router = APIRouter()
 @router.get("/me", response_model=UserSettings)
 def get_user_settings(
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get current user settings. Creates default settings if none exist.
@@ -36,7 +45,7 @@ def update_user_settings(
     *,
     db: Session = Depends(deps.get_db),
     settings_in: UserSettingsUpdate,
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Update user settings.
@@ -75,8 +84,44 @@ def delete_user_account(
         SettingsModel.user_id == current_user.id
     ).delete()
     
+    # Release their media for garbage collection
+    released = [current_user.profile_picture]
+    post_ids = []
+    for post_id, media_urls in db.query(Post.id, Post.media_urls).filter(Post.user_id == current_user.id):
+        post_ids.append(post_id)
+        released.extend(media_urls or [])
+    track_references(db, released, None)
+    tags = unindex_posts_hashtags(db, post_ids)
+    
+    # Unfollow both ways; their followers' and followees' cached lists include them
+    user_id = current_user.id
+    followees = [
+        other_id for (other_id,) in db.query(Follow.following_id).filter(Follow.follower_id == user_id)
+    ]
+    followers = [
+        other_id for (other_id,) in db.query(Follow.follower_id).filter(Follow.following_id == user_id)
+    ]
+    if followees:
+        db.query(UserModel).filter(UserModel.id.in_(followees)).update({
+            UserModel.followers_count: case((UserModel.followers_count > 0, UserModel.followers_count - 1), else_=0),
+        }, synchronize_session=False)
+    if followers:
+        db.query(UserModel).filter(UserModel.id.in_(followers)).update({
+            UserModel.following_count: case((UserModel.following_count > 0, UserModel.following_count - 1), else_=0),
+        }, synchronize_session=False)
+    db.query(Follow).filter(
+        or_(Follow.follower_id == user_id, Follow.following_id == user_id)
+    ).delete(synchronize_session=False)
+    connected = set(followees) | set(followers)
+    
     # Delete the user
     db.delete(current_user)
     db.commit()
     
+    trending_hashtags.record(tags)
+    typeahead_index.remove_user(user_id)
+    social_graph.invalidate(user_id, *connected)
+    invalidate_profiles(user_id, *connected)
+    invalidate_principal(user_id)
+    
     return {"message": "Account deleted successfully"}
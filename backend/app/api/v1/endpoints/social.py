@@ -1,9 +1,11 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import Session, aliased
 
+from app import crud
 from app.api import deps
+from app.core.pagination import encode_cursor, decode_cursor
 from app.models.user import User as UserModel
 from app.models.follow import Follow
 from app.schemas.social import (
@@ -14,8 +16,18 @@ from app.schemas.social import (
     FollowingResponse,
     UserSearchResult,
     UserSearchResponse,
+    UserSuggestion,
+    UserSuggestResponse,
+    SuggestedUser,
+    SuggestedUsersResponse,
+    MutualFollowersResponse,
     PublicProfile,
 )
+from app.services.typeahead import typeahead_index
+from app.services.social_graph import social_graph
+from app.services.profiles import build_public_profile, invalidate_profiles
+from app.services.principals import Principal
+from app.services.media import avatar_url
 
 from app.models.notification import Notification, NotificationType
 
@@ -79,6 +91,8 @@ def follow_user(
     target_user.followers_count = (target_user.followers_count or 0) + 1
     
     db.commit()
+    social_graph.invalidate(current_user.id, user_id)
+    invalidate_profiles(current_user.id, user_id)
     
     return {"message": "Successfully followed user", "following_id": user_id}
 
@@ -114,6 +128,8 @@ def unfollow_user(
         target_user.followers_count = max((target_user.followers_count or 1) - 1, 0)
     
     db.commit()
+    social_graph.invalidate(current_user.id, user_id)
+    invalidate_profiles(current_user.id, user_id)
     
     return {"message": "Successfully unfollowed user", "unfollowed_id": user_id}
 
@@ -122,98 +138,228 @@ def unfollow_user(
 def get_follow_status(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> FollowStatus:
     """Get follow status between current user and target user."""
-    # Check if current user follows target
-    is_following = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == user_id
-    ).first() is not None
-    
-    # Check if target follows current user
-    is_followed_by = db.query(Follow).filter(
-        Follow.follower_id == user_id,
-        Follow.following_id == current_user.id
-    ).first() is not None
+    is_following, is_followed_by = social_graph.relationship(db, current_user.id, user_id)
     
     return FollowStatus(is_following=is_following, is_followed_by=is_followed_by)
 
 
+# Most users returned per follower / following page
+MAX_FOLLOW_PAGE_SIZE = 100
+
+
+def _follow_page(
+    db: Session,
+    *,
+    list_column,
+    user_column,
+    user_id: int,
+    relation,
+    cursor: Optional[str],
+    skip: int,
+    limit: int,
+):
+    """
+    One page of a follow list in a single query.
+
+    Joins each Follow row to its User and computes the viewer relationship
+    (`relation`) as a correlated EXISTS, so it is only evaluated for the rows
+    on the page. Ordered newest first on (created_at, id); with a cursor the
+    page is fetched by keyset instead of OFFSET.
+    """
+    query = db.query(Follow.id, Follow.created_at, UserModel, relation.label("flag")).join(
+        UserModel, UserModel.id == user_column
+    ).filter(list_column == user_id)
+    
+    query = query.order_by(Follow.created_at.desc(), Follow.id.desc())
+    
+    after = decode_cursor(cursor)
+    if after:
+        created_at, follow_id = after
+        query = query.filter(or_(
+            Follow.created_at < created_at,
+            and_(Follow.created_at == created_at, Follow.id < follow_id),
+        ))
+    else:
+        query = query.offset(skip)
+    
+    # Larger requests are served a full page instead of being rejected
+    limit = max(1, min(limit, MAX_FOLLOW_PAGE_SIZE))
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return rows, next_cursor, has_more
+
+
 @router.get("/followers/{user_id}", response_model=FollowersResponse)
 def get_followers(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
 ) -> FollowersResponse:
     """Get list of users following the specified user."""
-    # Get all follower relationships
-    follows = db.query(Follow).filter(
-        Follow.following_id == user_id
-    ).offset(skip).limit(limit).all()
-    
-    total = db.query(Follow).filter(Follow.following_id == user_id).count()
+    viewer_follow = aliased(Follow)
+    # Whether current user follows this person back
+    is_following = exists().where(
+        viewer_follow.follower_id == current_user.id,
+        viewer_follow.following_id == UserModel.id,
+    )
     
-    # Get current user's following list for "follow back" status
-    current_user_following = set(
-        f.following_id for f in db.query(Follow).filter(
-            Follow.follower_id == current_user.id
-        ).all()
+    rows, next_cursor, has_more = _follow_page(
+        db,
+        list_column=Follow.following_id,
+        user_column=Follow.follower_id,
+        user_id=user_id,
+        relation=is_following,
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
     )
     
-    followers = []
-    for follow in follows:
-        user = db.query(UserModel).filter(UserModel.id == follow.follower_id).first()
-        if user:
-            followers.append(FollowerInfo(
-                id=user.id,
-                username=user.username,
-                full_name=user.full_name,
-                profile_picture=user.profile_picture,
-                is_following=user.id in current_user_following
-            ))
+    # Denormalised counter instead of COUNT(*) over the whole follower list
+    total = db.query(UserModel.followers_count).filter(UserModel.id == user_id).scalar() or 0
     
-    return FollowersResponse(followers=followers, total=total)
+    followers = [
+        FollowerInfo(
+            id=row.User.id,
+            username=row.User.username,
+            full_name=row.User.full_name,
+            profile_picture=avatar_url(row.User),
+            is_following=bool(row.flag)
+        )
+        for row in rows
+    ]
+    
+    return FollowersResponse(
+        followers=followers,
+        total=total,
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
 
 
 @router.get("/following/{user_id}", response_model=FollowingResponse)
 def get_following(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
 ) -> FollowingResponse:
     """Get list of users the specified user is following."""
-    # Get all following relationships
-    follows = db.query(Follow).filter(
-        Follow.follower_id == user_id
-    ).offset(skip).limit(limit).all()
-    
-    total = db.query(Follow).filter(Follow.follower_id == user_id).count()
+    viewer_follow = aliased(Follow)
+    # Whether this person follows current user
+    is_followed_by = exists().where(
+        viewer_follow.follower_id == UserModel.id,
+        viewer_follow.following_id == current_user.id,
+    )
     
-    # Get who follows current user for "follows you" status
-    current_user_followers = set(
-        f.follower_id for f in db.query(Follow).filter(
-            Follow.following_id == current_user.id
-        ).all()
+    rows, next_cursor, has_more = _follow_page(
+        db,
+        list_column=Follow.follower_id,
+        user_column=Follow.following_id,
+        user_id=user_id,
+        relation=is_followed_by,
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
     )
     
-    following = []
-    for follow in follows:
-        user = db.query(UserModel).filter(UserModel.id == follow.following_id).first()
-        if user:
-            following.append(FollowingInfo(
-                id=user.id,
-                username=user.username,
-                full_name=user.full_name,
-                profile_picture=user.profile_picture,
-                is_followed_by=user.id in current_user_followers
-            ))
+    # Denormalised counter instead of COUNT(*) over the whole following list
+    total = db.query(UserModel.following_count).filter(UserModel.id == user_id).scalar() or 0
+    
+    following = [
+        FollowingInfo(
+            id=row.User.id,
+            username=row.User.username,
+            full_name=row.User.full_name,
+            profile_picture=avatar_url(row.User),
+            is_followed_by=bool(row.flag)
+        )
+        for row in rows
+    ]
     
-    return FollowingResponse(following=following, total=total)
+    return FollowingResponse(
+        following=following,
+        total=total,
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
+
+
+# ============== Suggestions ==============
+
+@router.get("/suggestions", response_model=SuggestedUsersResponse)
+def get_suggested_users(
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+    limit: int = Query(10, ge=1, le=50),
+) -> SuggestedUsersResponse:
+    """People you may know: users followed by the people you follow."""
+    candidates = social_graph.suggestions(db, current_user.id, limit=limit * 2)
+    if not candidates:
+        return SuggestedUsersResponse(results=[])
+    
+    # Over-fetch above so inactive accounts can be dropped without a second round
+    users_by_id = {
+        u.id: u for u in db.query(UserModel).filter(
+            UserModel.id.in_([candidate_id for candidate_id, _ in candidates]),
+            UserModel.is_active == True
+        ).all()
+    }
+    
+    results = [
+        SuggestedUser(
+            id=candidate_id,
+            username=users_by_id[candidate_id].username,
+            full_name=users_by_id[candidate_id].full_name,
+            profile_picture=avatar_url(users_by_id[candidate_id]),
+            followers_count=users_by_id[candidate_id].followers_count or 0,
+            mutual_count=mutual_count,
+        )
+        for candidate_id, mutual_count in candidates
+        if candidate_id in users_by_id
+    ]
+    return SuggestedUsersResponse(results=results[:limit])
+
+
+@router.get("/mutual/{user_id}", response_model=MutualFollowersResponse)
+def get_mutual_followers(
+    user_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+    limit: int = Query(3, ge=1, le=50),
+) -> MutualFollowersResponse:
+    """People you follow who also follow this user ("Followed by ...")."""
+    mutual_ids = social_graph.mutual_followers(db, current_user.id, user_id)
+    
+    users = []
+    if mutual_ids:
+        users_by_id = {
+            u.id: u for u in db.query(UserModel).filter(
+                UserModel.id.in_(mutual_ids[:limit])
+            ).all()
+        }
+        users = [
+            FollowerInfo(
+                id=u.id,
+                username=u.username,
+                full_name=u.full_name,
+                profile_picture=avatar_url(u),
+                is_following=True
+            )
+            for u in (users_by_id.get(uid) for uid in mutual_ids[:limit]) if u
+        ]
+    
+    return MutualFollowersResponse(users=users, total=len(mutual_ids))
 
 
 # ============== User Search ==============
@@ -222,7 +368,7 @@ def get_following(
 def search_users(
     q: str,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     skip: int = 0,
     limit: int = 20,
 ) -> UserSearchResponse:
@@ -233,91 +379,79 @@ def search_users(
             detail="Search query must be at least 2 characters"
         )
     
-    search_pattern = f"%{q.lower()}%"
-    
-    # Search by username or full name (case-insensitive)
-    users = db.query(UserModel).filter(
-        UserModel.id != current_user.id,  # Exclude current user
-        UserModel.is_active == True,
-        or_(
-            UserModel.username.ilike(search_pattern),
-            UserModel.full_name.ilike(search_pattern)
-        )
-    ).offset(skip).limit(limit).all()
-    
-    total = db.query(UserModel).filter(
-        UserModel.id != current_user.id,
-        UserModel.is_active == True,
-        or_(
-            UserModel.username.ilike(search_pattern),
-            UserModel.full_name.ilike(search_pattern)
-        )
-    ).count()
-    
-    # Get current user's following list
-    current_user_following = set(
-        f.following_id for f in db.query(Follow).filter(
-            Follow.follower_id == current_user.id
-        ).all()
+    users, total, has_more = crud.user.search(
+        db, query=q, exclude_id=current_user.id, skip=skip, limit=limit
     )
     
+    # Follow check limited to the ids on this page
+    page_ids = [user.id for user in users]
+    current_user_following = set()
+    if page_ids:
+        current_user_following = {
+            f.following_id for f in db.query(Follow.following_id).filter(
+                Follow.follower_id == current_user.id,
+                Follow.following_id.in_(page_ids)
+            ).all()
+        }
+    
     results = [
         UserSearchResult(
             id=user.id,
             username=user.username,
             full_name=user.full_name,
             bio=user.bio,
-            profile_picture=user.profile_picture,
+            profile_picture=avatar_url(user),
             followers_count=user.followers_count or 0,
             is_following=user.id in current_user_following
         )
         for user in users
     ]
     
-    return UserSearchResponse(results=results, total=total, query=q)
+    return UserSearchResponse(
+        results=results,
+        total=total,
+        query=q,
+        has_more=has_more,
+    )
 
 
-@router.get("/profile/{username}", response_model=PublicProfile)
-def get_public_profile(
-    username: str,
-    db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
-) -> PublicProfile:
-    """Get public profile of a user by username."""
-    user = db.query(UserModel).filter(
-        UserModel.username == username,
-        UserModel.is_active == True
-    ).first()
+@router.get("/suggest", response_model=UserSuggestResponse)
+def suggest_users(
+    q: str,
+    current_user: Principal = Depends(deps.get_current_principal),
+    limit: int = Query(10, ge=1, le=25),
+) -> UserSuggestResponse:
+    """
+    Autocomplete usernames and display names by prefix.
+    Served from the in-memory typeahead index; no search query hits the database.
+    """
+    suggestions = typeahead_index.suggest(q, limit=limit, exclude_id=current_user.id)
+    return UserSuggestResponse(
+        results=[UserSuggestion(**s) for s in suggestions],
+        query=q,
+    )
+
+
+def _get_active_user(db: Session, *criteria) -> UserModel:
+    user = db.query(UserModel).filter(*criteria, UserModel.is_active == True).first()
     
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    # Check follow status
-    is_following = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == user.id
-    ).first() is not None
-    
-    is_followed_by = db.query(Follow).filter(
-        Follow.follower_id == user.id,
-        Follow.following_id == current_user.id
-    ).first() is not None
-    
-    return PublicProfile(
-        id=user.id,
-        username=user.username,
-        full_name=user.full_name,
-        bio=user.bio,
-        profile_picture=user.profile_picture,
-        posts_count=user.posts_count or 0,
-        followers_count=user.followers_count or 0,
-        following_count=user.following_count or 0,
-        is_following=is_following,
-        is_followed_by=is_followed_by
-    )
+    return user
+
+
+@router.get("/profile/{username}", response_model=PublicProfile)
+def get_public_profile(
+    username: str,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> PublicProfile:
+    """Get public profile of a user by username."""
+    user = _get_active_user(db, UserModel.username == username)
+    return build_public_profile(db, current_user.id, user)
 
 
 # Use different path structure to avoid conflict with /profile/{username}
@@ -325,41 +459,8 @@ def get_public_profile(
 def get_public_profile_by_id(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: UserModel = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> PublicProfile:
     """Get public profile of a user by user ID."""
-    user = db.query(UserModel).filter(
-        UserModel.id == user_id,
-        UserModel.is_active == True
-    ).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    # Check follow status
-    is_following = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == user.id
-    ).first() is not None
-    
-    is_followed_by = db.query(Follow).filter(
-        Follow.follower_id == user.id,
-        Follow.following_id == current_user.id
-    ).first() is not None
-    
-    return PublicProfile(
-        id=user.id,
-        username=user.username,
-        full_name=user.full_name,
-        bio=user.bio,
-        profile_picture=user.profile_picture,
-        posts_count=user.posts_count or 0,
-        followers_count=user.followers_count or 0,
-        following_count=user.following_count or 0,
-        is_following=is_following,
-        is_followed_by=is_followed_by
-    )
-
+    user = _get_active_user(db, UserModel.id == user_id)
+    return build_public_profile(db, current_user.id, user)
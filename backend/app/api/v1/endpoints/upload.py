@@ -1,11 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Request
 from typing import Any, Optional
 from app.api import deps
+from app.core.config import settings
 from app.models.user import User as UserModel
-from app.core.storage import StorageService
+from app.core.storage import StorageService, LocalStorageBackend, get_backend
+from app.schemas.upload import DirectUploadRequest, DirectUploadResponse
+from app.services.media import media_pipeline
+from app.services.media_store import find_upload, store_upload
 
 router = APIRouter()
 
+
+def _check_media_type(content_type: Optional[str]) -> None:
+    if not content_type or not (content_type.startswith("image/") or content_type.startswith("video/")):
+        raise HTTPException(status_code=400, detail="File must be an image or video")
+
+
 @router.post("/", response_model=dict)
 async def upload_file(
     file: UploadFile = File(...),
@@ -14,10 +24,64 @@ async def upload_file(
 ) -> Any:
     """
     Upload a file (e.g. profile picture, post media).
+    A file identical to one already stored isn't stored again; its URL is returned.
     """
-    if not file.content_type.startswith("image/") and not file.content_type.startswith("video/"):
-        raise HTTPException(status_code=400, detail="File must be an image or video")
-        
-    url = await StorageService.upload_file(file, folder=folder)
+    _check_media_type(file.content_type)
+    if file.size is not None and file.size > settings.STORAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    url, existing = await store_upload(file, folder=folder)
+    if file.content_type.startswith("image/") and not existing:
+        # Thumbnails and resized variants, generated in the background
+        media_pipeline.enqueue([url])
     return {"url": url}
 
+
+@router.post("/direct", response_model=DirectUploadResponse)
+async def create_direct_upload(
+    request: DirectUploadRequest,
+    current_user: UserModel = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Get a URL to upload a file straight to storage, bypassing the API.
+    PUT the file there with the returned headers, then use `public_url`.
+    With `sha256` set and that file already stored, `exists` is true and there's nothing to upload.
+    """
+    _check_media_type(request.content_type)
+
+    if request.sha256:
+        url = await find_upload(request.sha256, request.size)
+        if url is not None:
+            return {"public_url": url, "exists": True}
+
+    return await StorageService.create_direct_upload(
+        request.content_type,
+        folder=request.folder,
+        size=request.size,
+    )
+
+
+@router.put("/local/{path:path}", include_in_schema=False)
+async def upload_local(
+    path: str,
+    request: Request,
+    expires: int,
+    max_bytes: int,
+    signature: str,
+) -> Any:
+    """
+    Direct-upload target of the local storage backend (signed URL from /upload/direct).
+    """
+    backend = get_backend()
+    if not isinstance(backend, LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    content_type = request.headers.get("content-type", "")
+    if not backend.verify_upload(path, content_type, expires, max_bytes, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload URL")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    url = await backend.save_stream(request.stream(), path, max_bytes)
+    return {"url": url}
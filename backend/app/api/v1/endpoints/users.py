@@ -5,6 +5,10 @@ from app import crud
 from app.api import deps
 from app.models.user import User as UserModel
 from app.schemas.user import User, UserUpdate
+from app.services.typeahead import typeahead_index
+from app.services.profiles import invalidate_profiles
+from app.services.media import attach_profile_variants, media_pipeline
+from app.services.media_store import track_references
 
 router = APIRouter()
 
@@ -18,7 +22,15 @@ def update_user_me(
     """
     Update own user.
     """
+    unprocessed_media = []
+    if "profile_picture" in user_in.model_fields_set:
+        track_references(db, [current_user.profile_picture], [user_in.profile_picture])
+        current_user.profile_picture = user_in.profile_picture
+        unprocessed_media = attach_profile_variants(db, current_user)
     user = crud.user.update(db, db_obj=current_user, obj_in=user_in)
+    typeahead_index.upsert_user(user)
+    invalidate_profiles(user.id)
+    media_pipeline.enqueue(unprocessed_media)
     return user
 @router.put("/fcm-token", response_model=Any)
 def update_fcm_token(
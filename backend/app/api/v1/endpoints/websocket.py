@@ -11,6 +11,8 @@ from app.models.user import User as UserModel
 from app.models.conversation import ConversationParticipant
 from app.models.message import Message
 from app.schemas.chat import MessageResponse, MessageSender
+from app.services.media import avatar_url
+from app.services.media_store import track_references
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -76,22 +78,6 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-def get_user_from_token(token: str, db: Session) -> UserModel:
-    """Validate JWT token and return user."""
-    from app.core.security import decode_access_token
-    
-    payload = decode_access_token(token)
-    if not payload:
-        return None
-    
-    user_id = payload.get("sub")
-    if not user_id:
-        return None
-    
-    user = db.query(UserModel).filter(UserModel.id == int(user_id)).first()
-    return user
-
-
 @router.websocket("/chat/{conversation_id}")
 async def websocket_chat(
     websocket: WebSocket,
@@ -114,7 +100,7 @@ async def websocket_chat(
     
     try:
         # Authenticate user
-        user = get_user_from_token(token, db)
+        user = deps.get_user_from_token(token, db)
         if not user:
             await websocket.close(code=4001, reason="Invalid token")
             return
@@ -168,6 +154,7 @@ async def websocket_chat(
                         media_url=media_url
                     )
                     db.add(message)
+                    track_references(db, None, [media_url])
                     
                     # Update conversation timestamp
                     from app.models.conversation import Conversation
@@ -191,7 +178,7 @@ async def websocket_chat(
                                 "id": user.id,
                                 "username": user.username,
                                 "full_name": user.full_name,
-                                "profile_picture": user.profile_picture
+                                "profile_picture": avatar_url(user)
                             },
                             "content": message.content,
                             "message_type": message.message_type,
@@ -17,6 +17,14 @@ from app.models.notification import Notification
 from app.models.like import Like
 from app.models.comment import Comment
 from app.models.saved_post import SavedPost
+from app.models.hashtag import Hashtag, PostHashtag
+from app.models.post_media import PostMedia
+from app.models.refresh_token import RefreshToken
+from app.models.oauth_state import OAuthState
+from app.models.publish_job import PublishJob
+from app.models.media_asset import MediaAsset
+from app.models.agent_response import AgentResponse
+from app.models.agent_usage import AgentUsage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -0,0 +1,37 @@
+"""
+Fixed-size Bloom filter.
+
+Membership tests are O(k) bit lookups with no false negatives; positives
+may be false and must be confirmed by the caller where that matters.
+"""
+import hashlib
+import threading
+
+
+class BloomFilter:
+    """Bloom filter over strings with `num_bits` bits and `num_hashes` probes."""
+
+    def __init__(self, num_bits: int, num_hashes: int):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: position_i = h1 + i * h2
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        with self._lock:
+            for pos in self._positions(item):
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
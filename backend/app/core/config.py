@@ -5,7 +5,12 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Vextra Backend"
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    # Clients that don't call /auth/refresh yet (the mobile app) log in with one of these
+    # OAuth2 client_ids and get long-lived access tokens instead
+    LEGACY_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    LEGACY_ACCESS_TOKEN_CLIENTS: list[str] = ["vextra-mobile"]
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     DATABASE_URL: str
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
 
@@ -24,6 +29,35 @@ class Settings(BaseSettings):
     GCS_BUCKET_NAME: str = ""  # Set in .env
     GOOGLE_APPLICATION_CREDENTIALS: str = ""  # Auto-detected or set via env
 
+    # Media storage backend: "gcs" (GCS_BUCKET_NAME) or "local" (files under
+    # STORAGE_LOCAL_ROOT served at STORAGE_LOCAL_BASE_URL, for development and tests).
+    # Larger files upload resumably in chunks (multiples of 256 KiB); direct-upload
+    # URLs expire after STORAGE_UPLOAD_URL_EXPIRE_SECONDS. No upload may exceed
+    # STORAGE_MAX_UPLOAD_BYTES
+    STORAGE_BACKEND: str = "gcs"
+    STORAGE_LOCAL_ROOT: str = "media"
+    STORAGE_LOCAL_BASE_URL: str = "http://localhost:8080/media"
+    STORAGE_RESUMABLE_THRESHOLD_BYTES: int = 8 * 1024 * 1024
+    STORAGE_CHUNK_SIZE_BYTES: int = 8 * 1024 * 1024
+    STORAGE_UPLOAD_URL_EXPIRE_SECONDS: int = 900
+    STORAGE_MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+
+    # Image derivatives: WebP variants (name -> longest side in px) generated after
+    # upload in a process pool of MEDIA_DERIVATIVE_WORKERS, at most
+    # MEDIA_DERIVATIVE_CONCURRENCY images at a time; larger images are skipped
+    MEDIA_VARIANT_SIZES: dict[str, int] = {"thumb": 200, "small": 640, "medium": 1280}
+    MEDIA_VARIANT_QUALITY: int = 80
+    MEDIA_DERIVATIVE_WORKERS: int = 2
+    MEDIA_DERIVATIVE_CONCURRENCY: int = 4
+    MEDIA_MAX_IMAGE_PIXELS: int = 50_000_000
+
+    # Uploads are stored under their SHA-256 and deduplicated. Media released by
+    # every post, draft, profile and message that used it is deleted every
+    # MEDIA_GC_INTERVAL_SECONDS, once unused for MEDIA_GC_GRACE_SECONDS
+    MEDIA_GC_INTERVAL_SECONDS: int = 3600
+    MEDIA_GC_GRACE_SECONDS: int = 24 * 3600
+    MEDIA_GC_BATCH_SIZE: int = 100
+
     # OAuth - Meta (Instagram + Facebook)
     META_APP_ID: str = ""
     META_APP_SECRET: str = ""
@@ -52,6 +86,130 @@ class Settings(BaseSettings):
 
     # AI Agent - Groq
     GROQ_API_KEY: str = ""
+    # Per-call timeout (also the longest gap between streamed chunks) and total time
+    # for a streamed reply; at most AGENT_MAX_CONCURRENCY calls in flight per
+    # instance (chat ahead of hashtag suggestions) and AGENT_USER_TOKENS_PER_MINUTE
+    # per user (bursts up to AGENT_USER_TOKEN_BURST); requests wait up to
+    # AGENT_QUEUE_TIMEOUT_SECONDS for both together before being refused
+    AGENT_REQUEST_TIMEOUT_SECONDS: float = 30.0
+    AGENT_STREAM_TIMEOUT_SECONDS: float = 90.0
+    AGENT_MAX_CONCURRENCY: int = 16
+    AGENT_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    AGENT_USER_TOKENS_PER_MINUTE: int = 20000
+    AGENT_USER_TOKEN_BURST: int = 40000
+    # Per-user system prompt (stats, recent posts, drafts) cache, dropped on changes;
+    # chat history beyond AGENT_HISTORY_TOKEN_BUDGET estimated tokens is left out
+    AGENT_CONTEXT_CACHE_TTL_SECONDS: int = 300
+    AGENT_CONTEXT_CACHE_MAX_ENTRIES: int = 10000
+    AGENT_HISTORY_TOKEN_BUDGET: int = 2000
+    # Generated posts / hashtag suggestions, keyed by prompt hash, kept in memory
+    # (up to AGENT_RESPONSE_CACHE_MAX_ENTRIES) and in the database
+    AGENT_RESPONSE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    AGENT_RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+
+    # Typeahead index full rebuild interval (incremental updates happen in between)
+    TYPEAHEAD_REFRESH_SECONDS: int = 600
+
+    # Social graph cache: max adjacency lists (following / followers) kept in memory,
+    # each for at most GRAPH_CACHE_TTL_SECONDS
+    GRAPH_CACHE_MAX_LISTS: int = 20000
+    GRAPH_CACHE_TTL_SECONDS: int = 600
+
+    # Per-viewer profile page cache (GET /posts/profile/{user_id})
+    PROFILE_CACHE_TTL_SECONDS: int = 30
+    PROFILE_CACHE_MAX_ENTRIES: int = 10000
+
+    # Authenticated-principal cache (token version / is_active per user)
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 50000
+
+    # Revoked-session Bloom filter (per generation): ~100k sessions at <1% false positives
+    REVOCATION_FILTER_BITS: int = 1 << 20
+    REVOCATION_FILTER_HASHES: int = 7
+
+    # Password hashing: bcrypt work factor (raising it rehashes on next login),
+    # hashing processes (0 = hash inline) and how many hashes may wait before 503
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # OAuth authorization state: "database", "redis" (REDIS_URL) or "memory" (single instance / tests)
+    OAUTH_STATE_BACKEND: str = "database"
+    OAUTH_STATE_TTL_SECONDS: int = 600
+    OAUTH_STATE_SWEEP_SECONDS: int = 300
+    REDIS_URL: str = ""
+
+    # Shared social platform HTTP clients: timeouts (seconds), retries of failed
+    # connections / throttled idempotent requests, and idle keep-alive lifetime
+    SOCIAL_HTTP_CONNECT_TIMEOUT: float = 5.0
+    SOCIAL_HTTP_READ_TIMEOUT: float = 30.0
+    SOCIAL_HTTP_RETRIES: int = 2
+    SOCIAL_HTTP_BACKOFF_SECONDS: float = 0.5
+    SOCIAL_HTTP_KEEPALIVE_SECONDS: float = 60.0
+
+    # Upper bound for one platform's whole publish flow (uploads, container polling)
+    PUBLISH_PLATFORM_TIMEOUT_SECONDS: float = 120.0
+
+    # Instagram publishing: concurrent carousel item uploads, how long to wait for
+    # containers (video processing) before giving up, and the per-token account cache
+    INSTAGRAM_CONTAINER_CONCURRENCY: int = 4
+    INSTAGRAM_CONTAINER_READY_TIMEOUT_SECONDS: float = 90.0
+    INSTAGRAM_ACCOUNT_CACHE_TTL_SECONDS: int = 3600
+    INSTAGRAM_ACCOUNT_CACHE_MAX_ENTRIES: int = 10000
+
+    # Background check that published LinkedIn posts still exist: pass interval
+    # (0 disables), re-check age, users / posts per pass, and call concurrency,
+    # rate (per instance) and per-user deadline
+    POST_VERIFY_INTERVAL_SECONDS: float = 300.0
+    POST_VERIFY_AFTER_SECONDS: int = 6 * 3600
+    POST_VERIFY_USERS_PER_PASS: int = 50
+    POST_VERIFY_POSTS_PER_USER: int = 20
+    POST_VERIFY_CONCURRENCY: int = 5
+    POST_VERIFY_RATE_PER_SECOND: float = 5.0
+    POST_VERIFY_DEADLINE_SECONDS: float = 20.0
+
+    # Background refresh of social connection tokens: pass interval (0 disables), how
+    # long before expiry each platform's tokens are refreshed (Twitter's live ~2 hours,
+    # Meta's ~60 days), connections per batch, concurrent refreshes per platform and
+    # how long a failed connection waits before the next attempt
+    TOKEN_REFRESH_INTERVAL_SECONDS: float = 300.0
+    TOKEN_REFRESH_AHEAD_SECONDS: dict[str, int] = {
+        "twitter": 30 * 60,
+        "instagram": 7 * 86400,
+        "facebook": 7 * 86400,
+    }
+    TOKEN_REFRESH_BATCH_SIZE: int = 100
+    TOKEN_REFRESH_CONCURRENCY_PER_PLATFORM: int = 4
+    TOKEN_REFRESH_RETRY_SECONDS: int = 900
+
+    # OAuth token encryption secrets, newest first; SECRET_KEY is used when empty (list it
+    # after the new secret when moving off it). Put a new secret in front to rotate: at
+    # startup, stored tokens are re-encrypted with it in chunks, pausing between chunks
+    TOKEN_ENCRYPTION_KEYS: list[str] = []
+    TOKEN_REENCRYPT_CHUNK_SIZE: int = 500
+    TOKEN_REENCRYPT_PAUSE_SECONDS: float = 0.5
+
+    # Background publish jobs: async workers per instance, idle poll interval for
+    # due retries, claim lease (must exceed the platform timeout) and retry policy
+    PUBLISH_JOB_WORKERS: int = 4
+    PUBLISH_JOB_POLL_SECONDS: float = 5.0
+    PUBLISH_JOB_LEASE_SECONDS: int = 300
+    PUBLISH_JOB_MAX_ATTEMPTS: int = 5
+    PUBLISH_JOB_RETRY_BASE_SECONDS: float = 30.0
+    PUBLISH_JOB_RETRY_MAX_SECONDS: float = 900.0
+
+    # Scheduled drafts: longest sleep between checks (wake-ups are event driven)
+    # and how many due drafts one pass publishes
+    SCHEDULER_MAX_SLEEP_SECONDS: float = 60.0
+    SCHEDULER_BATCH_SIZE: int = 100
+    # A draft whose publish fails is retried with backoff, then unscheduled
+    SCHEDULER_MAX_ATTEMPTS: int = 5
+    SCHEDULER_RETRY_BASE_SECONDS: float = 60.0
+    SCHEDULER_RETRY_MAX_SECONDS: float = 3600.0
+
+    # Shared secret for /debug/metrics, sent as the X-Metrics-Token header; the
+    # endpoint is disabled while it is empty
+    METRICS_TOKEN: str = ""
 
     # Ignore extra environment variables to prevent validation errors
     model_config = SettingsConfigDict(
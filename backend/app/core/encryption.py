@@ -1,34 +1,75 @@
 """
 Token encryption utility for secure storage of OAuth tokens.
-Uses Fernet symmetric encryption with key derived from SECRET_KEY.
+Uses Fernet symmetric encryption with keys derived from secrets.
+
+Keyring: TOKEN_ENCRYPTION_KEYS (newest first), or SECRET_KEY alone when
+none are configured. Tokens are encrypted with the first key and decrypted
+with any of them, so a key is rotated by putting a new secret in front; the
+re-encryption job (app.services.key_rotation) then moves stored tokens onto
+it. When moving off SECRET_KEY, list it after the new secret until the job
+has finished. The keyring is built once per process.
 """
 import base64
 import hashlib
-from cryptography.fernet import Fernet
+from functools import lru_cache
+from typing import List, Optional
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from app.core.config import settings
 
 
-def _get_fernet() -> Fernet:
-    """Get Fernet instance with key derived from SECRET_KEY"""
-    # Derive a 32-byte key from SECRET_KEY
-    key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
-    fernet_key = base64.urlsafe_b64encode(key)
-    return Fernet(fernet_key)
+def _derive_fernet(secret: str) -> Fernet:
+    """Fernet instance with a 32-byte key derived from `secret`"""
+    key = hashlib.sha256(secret.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def _secrets() -> List[str]:
+    return [s for s in settings.TOKEN_ENCRYPTION_KEYS if s] or [settings.SECRET_KEY]
+
+
+@lru_cache(maxsize=1)
+def _get_fernet() -> MultiFernet:
+    """Keyring: encrypts with the primary key, decrypts with any key"""
+    return MultiFernet([_derive_fernet(secret) for secret in _secrets()])
+
+
+@lru_cache(maxsize=1)
+def _get_primary() -> Fernet:
+    return _derive_fernet(_secrets()[0])
+
+
+def has_rotation_keys() -> bool:
+    """Whether tokens may still be encrypted with a key other than the primary"""
+    return len(_secrets()) > 1
 
 
 def encrypt_token(token: str) -> str:
     """Encrypt a token for secure storage"""
     if not token:
         return token
-    fernet = _get_fernet()
-    encrypted = fernet.encrypt(token.encode())
-    return encrypted.decode()
+    return _get_fernet().encrypt(token.encode()).decode()
 
 
 def decrypt_token(encrypted_token: str) -> str:
     """Decrypt a stored token"""
     if not encrypted_token:
         return encrypted_token
-    fernet = _get_fernet()
-    decrypted = fernet.decrypt(encrypted_token.encode())
-    return decrypted.decode()
+    return _get_fernet().decrypt(encrypted_token.encode()).decode()
+
+
+def rotate_token(encrypted_token: str) -> Optional[str]:
+    """
+    Re-encrypt a stored token with the primary key. Returns None when it
+    already uses the primary key (nothing to do); raises InvalidToken when
+    no key in the keyring can decrypt it.
+    """
+    if not encrypted_token:
+        return None
+    data = encrypted_token.encode()
+    try:
+        _get_primary().decrypt(data)
+        return None
+    except InvalidToken:
+        pass
+    return _get_fernet().rotate(data).decode()
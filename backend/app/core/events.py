@@ -0,0 +1,207 @@
+"""
+Cross-instance event bus for cache invalidation.
+
+In-process caches (typeahead index, graph cache, ...) subscribe to topics here.
+`publish` runs the local handlers immediately and, on PostgreSQL, fans the
+event out to every other instance via LISTEN/NOTIFY. On other databases the
+bus is process-local, which is all a single-instance deployment needs.
+
+Broadcasts are queued and sent by a background thread, so publishing never
+waits on a database round trip. The listener reconnects with backoff; since
+notifications sent while it was disconnected are lost, the handlers
+registered with `on_reconnect` run after every reconnect to drop or reload
+what may have gone stale.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "vextra_events"
+
+# Identifies this process so it can ignore its own NOTIFY echoes
+NODE_ID = uuid.uuid4().hex
+
+# Listener reconnect backoff (seconds)
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+# Notifications sent per transaction by the sender thread
+SEND_BATCH_SIZE = 100
+
+_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+_reconnect_handlers: List[Callable[[], None]] = []
+_listener: "threading.Thread | None" = None
+_sender: "threading.Thread | None" = None
+_outbox: "queue.Queue[Optional[str]]" = queue.Queue()
+_stop = threading.Event()
+_connected = threading.Event()
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def subscribe(topic: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+    """Register a handler for a topic. Handlers may run on the listener thread."""
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def on_reconnect(handler: Callable[[], None]) -> None:
+    """Register a handler run (on the listener thread) after events may have been missed."""
+    _reconnect_handlers.append(handler)
+
+
+def _dispatch(topic: str, data: Dict[str, Any]) -> None:
+    for handler in _handlers.get(topic, []):
+        try:
+            handler(data)
+        except Exception as e:
+            logger.error(f"Event handler for {topic} failed: {e}")
+
+
+def _resync() -> None:
+    for handler in _reconnect_handlers:
+        try:
+            handler()
+        except Exception as e:
+            logger.error(f"Event reconnect handler failed: {e}")
+
+
+def publish(topic: str, data: Dict[str, Any]) -> None:
+    """Apply an event locally and queue it for broadcast to the other instances."""
+    _dispatch(topic, data)
+
+    if not _is_postgres():
+        return
+
+    payload = json.dumps({"topic": topic, "data": data, "origin": NODE_ID})
+    if _sender is not None:
+        _outbox.put(payload)
+    else:
+        # Bus not started (scripts, migrations): send inline
+        _send([payload])
+
+
+def _send(payloads: List[str]) -> None:
+    try:
+        with engine.begin() as conn:
+            for payload in payloads:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {
+                    "channel": CHANNEL,
+                    "payload": payload,
+                })
+    except Exception as e:
+        # Peers converge on their next periodic refresh
+        logger.warning(f"Failed to broadcast {len(payloads)} events: {e}")
+
+
+def _send_loop() -> None:
+    """Drain the outbox, a batch per transaction, until the stop sentinel."""
+    while True:
+        payload = _outbox.get()
+        if payload is None:
+            return
+        batch = [payload]
+        while len(batch) < SEND_BATCH_SIZE:
+            try:
+                payload = _outbox.get_nowait()
+            except queue.Empty:
+                break
+            if payload is None:
+                _send(batch)
+                return
+            batch.append(payload)
+        _send(batch)
+
+
+def _listen_once(reconnected: bool) -> None:
+    """LISTEN on one connection and dispatch peer events until stopped or the connection fails."""
+    raw = engine.raw_connection()
+    conn = raw.driver_connection
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        _connected.set()
+        if reconnected:
+            logger.info("Event listener reconnected")
+            _resync()
+
+        while not _stop.is_set():
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    event = json.loads(notify.payload)
+                except ValueError:
+                    continue
+                if event.get("origin") == NODE_ID:
+                    continue
+                _dispatch(event.get("topic", ""), event.get("data") or {})
+    except Exception:
+        # Possibly broken: keep it out of the pool
+        raw.invalidate()
+        raise
+    else:
+        # Back to the pool in the state the engine expects
+        with conn.cursor() as cursor:
+            cursor.execute("UNLISTEN *")
+        conn.autocommit = False
+        raw.close()
+
+
+def _listen() -> None:
+    """Keep a LISTEN connection open, reconnecting with exponential backoff."""
+    delay = RECONNECT_MIN_DELAY
+    attempted = False
+    while not _stop.is_set():
+        _connected.clear()
+        try:
+            _listen_once(reconnected=attempted)
+            return
+        except Exception as e:
+            if _connected.is_set():
+                # The connection was up for a while: start over with a short delay
+                delay = RECONNECT_MIN_DELAY
+            logger.error(f"Event listener disconnected, retrying in {delay:.0f}s: {e}")
+        attempted = True
+        if _stop.wait(delay):
+            return
+        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+def start() -> None:
+    """Start the NOTIFY listener and sender threads (PostgreSQL only)."""
+    global _listener, _sender
+    if not _is_postgres() or _listener is not None:
+        return
+    _stop.clear()
+    _sender = threading.Thread(target=_send_loop, name="event-sender", daemon=True)
+    _sender.start()
+    _listener = threading.Thread(target=_listen, name="event-listener", daemon=True)
+    _listener.start()
+
+
+def stop() -> None:
+    """Stop the listener, after the sender has flushed queued broadcasts."""
+    global _listener, _sender
+    _stop.set()
+    if _sender is not None:
+        _outbox.put(None)
+        _sender.join(timeout=5)
+        _sender = None
+    if _listener is not None:
+        _listener.join(timeout=5)
+        _listener = None
@@ -0,0 +1,42 @@
+"""
+Image derivative rendering (Pillow).
+
+Runs in the media pipeline's process pool: decoding and resampling are CPU
+bound and would stall request workers. Kept free of app imports so pool
+processes start cheaply.
+"""
+import io
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps
+
+
+def render_variants(
+    data: bytes,
+    sizes: Dict[str, int],
+    quality: int,
+    max_pixels: int,
+) -> Tuple[int, int, Dict[str, bytes]]:
+    """
+    Resize an image to fit each size (longest side, never upscaled) and
+    recompress as WebP. EXIF orientation is applied first; EXIF, ICC and
+    other metadata are not copied to the variants.
+    Returns (original width, original height, variant name -> WebP bytes).
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        # The header is read lazily; refuse decompression bombs before decoding
+        if original.width * original.height > max_pixels:
+            raise ValueError(f"Image too large: {original.width}x{original.height}")
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        variants = {}
+        for name, size in sizes.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, "WEBP", quality=quality, method=4)
+            variants[name] = buffer.getvalue()
+    return width, height, variants
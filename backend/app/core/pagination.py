@@ -0,0 +1,33 @@
+"""
+Opaque keyset-pagination cursors.
+
+A cursor encodes the (created_at, id) of the last row on a page so the next
+page can continue with a `(created_at, id) < cursor` predicate instead of
+OFFSET, which stays fast however deep the client scrolls.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Build an opaque cursor pointing after the given row."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Parse a cursor from `encode_cursor`; None means start from the top."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
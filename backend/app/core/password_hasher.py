@@ -0,0 +1,175 @@
+"""
+bcrypt hashing / verification in a bounded process pool.
+
+bcrypt is deliberately slow and holds the GIL for the whole hash, so running
+it in request workers (or worse, on the event loop) lets a login storm stall
+every other request. Work is submitted to a small process pool instead; at
+most `workers` hashes run at once, up to `max_queue` more wait, and anything
+beyond that is rejected with PasswordHasherBusy (503) rather than piling up.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_contexts: Dict[int, CryptContext] = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    # min_rounds makes hashes with a lower work factor "need update" (rehash on login)
+    if rounds not in _contexts:
+        _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+        )
+    return _contexts[rounds]
+
+
+# ---- worker functions (run in the pool processes) ----
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class PasswordHasher:
+    """Process-pool bcrypt with a bounded queue and queueing metrics."""
+
+    def __init__(self, rounds: int, workers: int, max_queue: int):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_pending = 0
+        self._total_seconds = 0.0
+
+    def start(self) -> None:
+        """Start the pool (app startup); until then hashing runs inline."""
+        with self._lock:
+            self._start_locked()
+
+    def _start_locked(self) -> None:
+        if self._pool is None and self.workers > 0:
+            # spawn: the pool may be (re)started after the event-bus thread exists
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, started: float) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self._total_seconds += time.monotonic() - started
+
+    def _submit(self, fn: Callable, *args: Any) -> Future:
+        with self._lock:
+            pool = self._pool
+            if pool is not None:
+                if self._pending >= self.workers + self.max_queue:
+                    self.rejected += 1
+                    raise PasswordHasherBusy()
+                self._pending += 1
+                self.submitted += 1
+                self.max_pending = max(self.max_pending, self._pending)
+
+        if pool is None:
+            # Not started (scripts, crud outside the app) or workers=0: hash in the calling thread
+            future: Future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        started = time.monotonic()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died; replace the pool and retry once
+            logger.error("Password hasher pool broken, restarting")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+                self._start_locked()
+                pool = self._pool
+            try:
+                future = pool.submit(fn, *args)
+            except Exception:
+                self._done(started)
+                raise
+        future.add_done_callback(lambda _: self._done(started))
+        return future
+
+    # ---- sync API (threadpool endpoints, crud, scripts) ----
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password, self.rounds).result()
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new_hash); new_hash is set when the stored hash used an outdated work factor."""
+        return self._submit(_verify_and_update, password, hashed, self.rounds).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self.verify_and_update(password, hashed)[0]
+
+    # ---- async API (async endpoints) ----
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password, self.rounds))
+
+    async def verify_and_update_async(
+        self, password: str, hashed: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(
+            self._submit(_verify_and_update, password, hashed, self.rounds)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "in_flight": min(self._pending, self.workers),
+                "queued": max(self._pending - self.workers, 0),
+                "max_queue": self.max_queue,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self._total_seconds * 1000 / self.completed, 1) if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
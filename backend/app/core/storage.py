@@ -1,30 +1,167 @@
-from google.cloud import storage
-from google.oauth2 import service_account
-from app.core.config import settings
-from fastapi import UploadFile, HTTPException
-import uuid
+"""
+Media storage.
+
+Two backends with the same interface: Google Cloud Storage (production) and
+the local filesystem (development and tests), picked by STORAGE_BACKEND.
+
+Uploads through the API stream the spooled request file to the backend in a
+worker thread, so the event loop never blocks on storage I/O; files over
+STORAGE_RESUMABLE_THRESHOLD_BYTES go to GCS as a resumable upload in
+STORAGE_CHUNK_SIZE_BYTES chunks instead of one request.
+
+Direct uploads skip the API entirely: the client asks for an upload URL,
+PUTs the file to it and then uses the returned public URL. On GCS that is a
+V4 signed URL, or a resumable upload session for large files (the client
+sends chunks with Content-Range and can resume after a dropped connection).
+The local backend hands out an HMAC-signed URL on PUT /upload/local/...
+Either way the upload is limited to the declared size, or to
+STORAGE_MAX_UPLOAD_BYTES when none was declared: GCS enforces the signed
+x-goog-content-length-range header (or the session's size), the local
+backend signs the limit and stops reading past it.
+
+API uploads are content-addressed: the spooled file is hashed first and
+stored as <folder>/<sha256>.<ext>, so services/media_store.py can skip the
+transfer entirely when the same bytes were uploaded before.
+"""
+import hashlib
+import hmac
 import logging
 import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Tuple
+from urllib.parse import quote, unquote, urlencode, urlparse
 
-class StorageService:
+from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# Buffer size when copying files
+COPY_BUFFER_BYTES = 1024 * 1024
+
+# File extension per content type; other types use their (sanitized) subtype
+EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/heic": "heic",
+    "image/heif": "heif",
+    "video/mp4": "mp4",
+    "video/quicktime": "mov",
+    "video/webm": "webm",
+}
+
+
+def extension_for(content_type: Optional[str]) -> str:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if media_type in EXTENSIONS:
+        return EXTENSIONS[media_type]
+    return re.sub(r"[^a-z0-9]", "", media_type.rsplit("/", 1)[-1])[:10] or "bin"
+
+
+def object_path(content_type: Optional[str], folder: Optional[str], name: Optional[str] = None) -> str:
+    """
+    Object name under a sanitized folder: `name` (a content hash) or a fresh
+    uuid, with the extension of the (validated) content type, never the client's filename.
+    """
+    folder = re.sub(r"[^A-Za-z0-9_\-/]", "", folder or "").strip("/")
+    folder = re.sub(r"/+", "/", folder) or "uploads"
+    return f"{folder}/{name or uuid.uuid4()}.{extension_for(content_type)}"
+
+
+def file_digest(fileobj: BinaryIO) -> Tuple[str, int]:
+    """SHA-256 (hex) and size of a seekable file, read in chunks (blocking). Rewinds it."""
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(COPY_BUFFER_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+class StorageBackend(ABC):
+    """Where uploaded media lives."""
+
+    name: str
+
+    @abstractmethod
+    def save(self, fileobj: BinaryIO, path: str, content_type: str, size: Optional[int] = None) -> str:
+        """Store a file (blocking; run in a worker thread). Returns its public URL."""
+        pass
+
+    @abstractmethod
+    def create_upload_url(
+        self,
+        path: str,
+        content_type: str,
+        max_bytes: int,
+        size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Target for a direct client upload of at most `max_bytes`: upload_url, method,
+        headers to send, whether it's a resumable session, and the file's public URL afterwards.
+        """
+        pass
+
+    @abstractmethod
+    def public_url(self, path: str) -> str:
+        pass
+
+    @abstractmethod
+    def read(self, path: str) -> bytes:
+        """A stored file's content (blocking)."""
+        pass
+
+    @abstractmethod
+    def delete(self, path: str) -> None:
+        """Remove a stored file if it exists (blocking)."""
+        pass
+
+    def path_for_url(self, url: str) -> Optional[str]:
+        """Object path of one of our public URLs; None for anything else."""
+        prefix = self.public_url("")
+        if url and url.startswith(prefix) and len(url) > len(prefix):
+            return unquote(url[len(prefix):])
+        return None
+
+
+class GCSStorageBackend(StorageBackend):
+    """Google Cloud Storage bucket GCS_BUCKET_NAME."""
+
+    name = "gcs"
     _client = None
-    
+
     @classmethod
     def _get_client(cls):
         """Get or create a storage client with proper credentials."""
         if cls._client is not None:
             return cls._client
-            
+
+        from google.cloud import storage
+        from google.oauth2 import service_account
+
         try:
             # On Cloud Run, default credentials automatically use the attached service account
             # This is the simplest and most secure approach
             cls._client = storage.Client()
             logging.info("Using default GCP credentials (Cloud Run service account)")
             return cls._client
-            
+
         except Exception as e:
             logging.warning(f"Default credentials failed: {e}, trying local file...")
-            
+
             # Fallback: Check for local credentials file (for local development)
             local_creds = os.path.join(os.path.dirname(__file__), '../../firebase_credentials.json')
             if os.path.exists(local_creds):
@@ -35,38 +172,239 @@ class StorageService:
                     return cls._client
                 except Exception as e2:
                     logging.error(f"Local credentials also failed: {e2}")
-            
+
             raise Exception(f"Could not initialize storage client: {e}")
 
-    @staticmethod
-    async def upload_file(file: UploadFile, folder: str = "uploads") -> str:
-        """
-        Uploads a file to Google Cloud Storage and returns the public URL.
-        """
+    def _bucket(self):
         bucket_name = settings.GCS_BUCKET_NAME
-        
         if not bucket_name:
-             logging.warning("GCS_BUCKET_NAME not set. Skipping upload.")
-             raise HTTPException(status_code=500, detail="Storage configuration missing: GCS_BUCKET_NAME not set")
+            logging.warning("GCS_BUCKET_NAME not set. Skipping upload.")
+            raise HTTPException(status_code=500, detail="Storage configuration missing: GCS_BUCKET_NAME not set")
+        return self._get_client().bucket(bucket_name)
 
+    def _signing_kwargs(self) -> Dict[str, Any]:
+        """
+        Service account keys sign URLs locally; Cloud Run's metadata-server
+        credentials can't, so signing goes through the IAM signBlob API.
+        """
+        from google.auth.credentials import Signing
+        from google.auth.transport import requests as google_requests
+
+        credentials = self._get_client()._credentials
+        if isinstance(credentials, Signing):
+            return {}
+        if not credentials.valid:
+            credentials.refresh(google_requests.Request())
+        return {
+            "service_account_email": credentials.service_account_email,
+            "access_token": credentials.token,
+        }
+
+    def save(self, fileobj: BinaryIO, path: str, content_type: str, size: Optional[int] = None) -> str:
+        blob = self._bucket().blob(path)
+        if size is None or size > settings.STORAGE_RESUMABLE_THRESHOLD_BYTES:
+            # Resumable upload, sent chunk by chunk
+            blob.chunk_size = settings.STORAGE_CHUNK_SIZE_BYTES
+        blob.upload_from_file(fileobj, content_type=content_type, size=size)
+        return blob.public_url
+
+    def create_upload_url(
+        self,
+        path: str,
+        content_type: str,
+        max_bytes: int,
+        size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        blob = self._bucket().blob(path)
+        if size is not None and size > settings.STORAGE_RESUMABLE_THRESHOLD_BYTES:
+            # The session only accepts the declared size
+            upload_url = blob.create_resumable_upload_session(content_type=content_type, size=size)
+            return {
+                "upload_url": upload_url,
+                "method": "PUT",
+                "headers": {},
+                "resumable": True,
+                "public_url": blob.public_url,
+            }
+        # Signed, so the client must send it and GCS rejects larger bodies
+        length_range = {"x-goog-content-length-range": f"0,{max_bytes}"}
+        upload_url = blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=settings.STORAGE_UPLOAD_URL_EXPIRE_SECONDS),
+            method="PUT",
+            content_type=content_type,
+            headers=length_range,
+            **self._signing_kwargs(),
+        )
+        return {
+            "upload_url": upload_url,
+            "method": "PUT",
+            "headers": {"Content-Type": content_type, **length_range},
+            "resumable": False,
+            "public_url": blob.public_url,
+        }
+
+    def public_url(self, path: str) -> str:
+        return f"https://storage.googleapis.com/{settings.GCS_BUCKET_NAME}/{quote(path)}"
+
+    def read(self, path: str) -> bytes:
+        return self._bucket().blob(path).download_as_bytes()
+
+    def delete(self, path: str) -> None:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self._bucket().blob(path).delete()
+        except NotFound:
+            pass
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files under STORAGE_LOCAL_ROOT, served at STORAGE_LOCAL_BASE_URL."""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.realpath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _file_path(self, path: str) -> str:
+        full = os.path.realpath(os.path.join(self.root, path))
+        if not full.startswith(self.root + os.sep):
+            raise HTTPException(status_code=400, detail="Invalid file path")
+        return full
+
+    def _open_temp(self, path: str):
+        """Temp file next to the destination, renamed into place once complete."""
+        directory = os.path.dirname(self._file_path(path))
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, delete=False, suffix=".part")
+
+    def save(self, fileobj: BinaryIO, path: str, content_type: str, size: Optional[int] = None) -> str:
+        with self._open_temp(path) as temp:
+            shutil.copyfileobj(fileobj, temp, COPY_BUFFER_BYTES)
+        os.replace(temp.name, self._file_path(path))
+        return self.public_url(path)
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], path: str, max_bytes: int) -> str:
+        """Store a streamed request body (direct uploads), writing in a worker thread."""
+        temp = await run_in_threadpool(self._open_temp, path)
         try:
-            storage_client = StorageService._get_client()
-            bucket = storage_client.bucket(bucket_name)
-            
-            # Generate unique filename
-            extension = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-            filename = f"{folder}/{uuid.uuid4()}.{extension}"
-            
-            blob = bucket.blob(filename)
-            
-            # Upload file
-            blob.upload_from_file(file.file, content_type=file.content_type)
-            
-            # Return public URL
-            return blob.public_url
-            
+            written = 0
+            async for chunk in chunks:
+                if chunk:
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise HTTPException(status_code=413, detail="File too large")
+                    await run_in_threadpool(temp.write, chunk)
+            await run_in_threadpool(temp.close)
+            await run_in_threadpool(os.replace, temp.name, self._file_path(path))
+        except BaseException:
+            temp.close()
+            if os.path.exists(temp.name):
+                os.remove(temp.name)
+            raise
+        return self.public_url(path)
+
+    def _signature(self, path: str, content_type: str, expires: int, max_bytes: int) -> str:
+        message = f"{path}\n{content_type}\n{expires}\n{max_bytes}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_upload(self, path: str, content_type: str, expires: int, max_bytes: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(path, content_type, expires, max_bytes), signature)
+
+    def create_upload_url(
+        self,
+        path: str,
+        content_type: str,
+        max_bytes: int,
+        size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        expires = int(time.time()) + settings.STORAGE_UPLOAD_URL_EXPIRE_SECONDS
+        query = urlencode({
+            "expires": expires,
+            "max_bytes": max_bytes,
+            "signature": self._signature(path, content_type, expires, max_bytes),
+        })
+        return {
+            "upload_url": f"{settings.API_V1_STR}/upload/local/{quote(path)}?{query}",
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+            "resumable": False,
+            "public_url": self.public_url(path),
+        }
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{quote(path)}"
+
+    def read(self, path: str) -> bytes:
+        with open(self._file_path(path), "rb") as f:
+            return f.read()
+
+    def delete(self, path: str) -> None:
+        try:
+            os.remove(self._file_path(path))
+        except FileNotFoundError:
+            pass
+
+    @property
+    def mount_path(self) -> str:
+        """URL path the files are served under."""
+        return urlparse(self.base_url).path or "/media"
+
+
+_backend: Optional[StorageBackend] = None
+
+
+def get_backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        if settings.STORAGE_BACKEND == "local":
+            _backend = LocalStorageBackend(settings.STORAGE_LOCAL_ROOT, settings.STORAGE_LOCAL_BASE_URL)
+        else:
+            _backend = GCSStorageBackend()
+    return _backend
+
+
+class StorageService:
+
+    @staticmethod
+    async def upload_file(file: UploadFile, folder: str = "uploads", name: Optional[str] = None) -> str:
+        """
+        Uploads a file to the storage backend and returns the public URL.
+        `name` replaces the random object name (content-addressed uploads).
+        """
+        backend = get_backend()
+        path = object_path(file.content_type, folder, name)
+        try:
+            return await run_in_threadpool(backend.save, file.file, path, file.content_type, file.size)
+        except HTTPException:
+            raise
         except Exception as e:
-            logging.error(f"Failed to upload file to GCS: {e}")
+            logging.error(f"Failed to upload file to {backend.name}: {e}")
             raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
-
+    @staticmethod
+    async def create_direct_upload(
+        content_type: str,
+        folder: str = "uploads",
+        size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload URL for a client-side upload straight to storage, limited to
+        `size` bytes when given, else STORAGE_MAX_UPLOAD_BYTES.
+        """
+        if size is not None and size > settings.STORAGE_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="File too large")
+        max_bytes = size if size is not None else settings.STORAGE_MAX_UPLOAD_BYTES
+        backend = get_backend()
+        path = object_path(content_type, folder)
+        try:
+            return await run_in_threadpool(backend.create_upload_url, path, content_type, max_bytes, size)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logging.error(f"Failed to create {backend.name} upload URL: {e}")
+            raise HTTPException(status_code=500, detail=f"Could not create upload URL: {str(e)}")
@@ -2,13 +2,29 @@ from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
 from app.db.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Search totals are counted up to this many rows; beyond it the UI only needs "1000+"
+SEARCH_COUNT_CAP = 1000
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally (backslash escape)."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def capped_count(db: Session, query: Query, column: Any, cap: int = SEARCH_COUNT_CAP) -> int:
+    """Count the rows of `query`, stopping after `cap` instead of scanning every match."""
+    capped = query.with_entities(column).limit(cap + 1).subquery()
+    total = db.query(func.count()).select_from(capped).scalar() or 0
+    return min(total, cap)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
@@ -1,9 +1,10 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, capped_count, escape_like
 from app.models.post import Post
 from app.schemas.post import PostCreate, PostUpdate
 
@@ -30,5 +31,31 @@ class CRUDPost(CRUDBase[Post, PostCreate, PostUpdate]):
             .all()
         )
 
+    def search(
+        self, db: Session, *, query: str, skip: int = 0, limit: int = 20
+    ) -> Tuple[List[Post], int, bool]:
+        """
+        Full-text search over published post content.
+
+        On PostgreSQL this matches the GIN index on
+        to_tsvector('simple', coalesce(content, '')) and ranks by ts_rank;
+        elsewhere it falls back to a case-insensitive substring match.
+        Returns the page, a capped total and whether more results follow.
+        """
+        base = db.query(self.model).filter(Post.is_draft == False)
+
+        if db.get_bind().dialect.name == "postgresql":
+            document = func.to_tsvector("simple", func.coalesce(Post.content, ""))
+            ts_query = func.plainto_tsquery("simple", query)
+            base = base.filter(document.op("@@")(ts_query))
+            ordering = (func.ts_rank(document, ts_query).desc(), Post.created_at.desc(), Post.id.desc())
+        else:
+            pattern = f"%{escape_like(query.lower())}%"
+            base = base.filter(func.lower(Post.content).like(pattern, escape="\\"))
+            ordering = (Post.created_at.desc(), Post.id.desc())
+
+        posts = base.order_by(*ordering).offset(skip).limit(limit + 1).all()
+        return posts[:limit], capped_count(db, base, Post.id), len(posts) > limit
+
 
 post = CRUDPost(Post)
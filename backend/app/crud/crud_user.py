@@ -1,9 +1,10 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from sqlalchemy import case, func, or_
 from sqlalchemy.orm import Session
 
 from app.core.security import get_password_hash, verify_password
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, SEARCH_COUNT_CAP, capped_count, escape_like
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
@@ -40,6 +41,63 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
+    def _search_filter(self, db: Session, *, query: str, exclude_id: Optional[int]):
+        """
+        Base query for user search.
+
+        Matches on lower(username) / lower(full_name) so Postgres can serve the
+        substring LIKE from the pg_trgm GIN expression indexes; other databases
+        fall back to a plain scan with identical results.
+        """
+        pattern = f"%{escape_like(query.lower())}%"
+        q = db.query(User).filter(
+            User.is_active == True,
+            or_(
+                func.lower(User.username).like(pattern, escape="\\"),
+                func.lower(User.full_name).like(pattern, escape="\\"),
+            ),
+        )
+        if exclude_id is not None:
+            q = q.filter(User.id != exclude_id)
+        return q
+
+    def search(
+        self,
+        db: Session,
+        *,
+        query: str,
+        exclude_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[User], int, bool]:
+        """
+        Search active users by username or full name.
+
+        Results are ranked username-prefix first, then full-name prefix, then
+        any substring match, with popularity as the tie-breaker. Returns the
+        page, a total capped at SEARCH_COUNT_CAP and whether more results
+        follow (from one extra row, so it stays right past the cap).
+        """
+        prefix = f"{escape_like(query.lower())}%"
+        rank = case(
+            (func.lower(User.username).like(prefix, escape="\\"), 0),
+            (func.lower(User.full_name).like(prefix, escape="\\"), 1),
+            else_=2,
+        )
+        users = (
+            self._search_filter(db, query=query, exclude_id=exclude_id)
+            .order_by(rank, User.followers_count.desc(), User.id)
+            .offset(skip)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(users) > limit
+
+        total = capped_count(
+            db, self._search_filter(db, query=query, exclude_id=exclude_id), User.id
+        )
+        return users[:limit], total, has_more
+
     def is_active(self, user: User) -> bool:
         return user.is_active
 
@@ -1,17 +1,169 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core import events
+from app.core.password_hasher import PasswordHasherBusy, password_hasher
+from app.core.storage import LocalStorageBackend, get_backend
 from app.api.v1.api import api_router
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import engine, SessionLocal
+from app.services.typeahead import typeahead_index
+from app.services.hashtags import trending_hashtags
+from app.services import sessions
+from app.services.oauth_state import oauth_states
+from app.services.social.http import social_http
+from app.services.publish_jobs import publish_worker
+from app.services.scheduler import draft_scheduler
+from app.services.post_verification import post_verifier
+from app.services.token_refresh import token_refresher
+from app.services.key_rotation import token_reencryptor
+from app.services.media import media_pipeline
+from app.services.media_store import media_collector
+from app.services.agent_service import agent_service
+
+logger = logging.getLogger(__name__)
 
 
 # Create Tables (for anything not covered by migrations, though migrations should cover all)
 
 
+def _load_typeahead_index() -> None:
+    db = SessionLocal()
+    try:
+        typeahead_index.load(db)
+    finally:
+        db.close()
+
+
+def _load_trending_hashtags() -> None:
+    db = SessionLocal()
+    try:
+        trending_hashtags.load(db)
+    finally:
+        db.close()
+
+
+def _load_revocations() -> None:
+    db = SessionLocal()
+    try:
+        sessions.load_revocations(db)
+    finally:
+        db.close()
+
+
+def _reload_after_reconnect() -> None:
+    """Events missed while the listener was disconnected: rebuild the DB-backed state."""
+    for load in (_load_typeahead_index, _load_trending_hashtags, _load_revocations):
+        try:
+            load()
+        except Exception as e:
+            logger.error(f"Reload after event bus reconnect failed: {e}")
+
+
+events.on_reconnect(_reload_after_reconnect)
+
+
+def _sweep_refresh_tokens() -> None:
+    db = SessionLocal()
+    try:
+        deleted = sessions.sweep_expired(db)
+        if deleted:
+            logger.info(f"Deleted {deleted} expired refresh tokens")
+    finally:
+        db.close()
+
+
+async def _sweep_sessions() -> None:
+    """Periodically delete expired refresh tokens."""
+    while True:
+        await asyncio.sleep(sessions.SWEEP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(_sweep_refresh_tokens)
+        except Exception as e:
+            logger.error(f"Refresh token sweep failed: {e}")
+
+
+async def _sweep_oauth_states() -> None:
+    """Periodically delete OAuth states that were never called back."""
+    while True:
+        await asyncio.sleep(settings.OAUTH_STATE_SWEEP_SECONDS)
+        try:
+            removed = await run_in_threadpool(oauth_states.sweep)
+            if removed:
+                logger.info(f"Swept {removed} expired OAuth states")
+        except Exception as e:
+            logger.error(f"OAuth state sweep failed: {e}")
+
+
+async def _refresh_typeahead_index() -> None:
+    """Periodically rebuild the index so follower-count ranking doesn't drift."""
+    while True:
+        await asyncio.sleep(settings.TYPEAHEAD_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(_load_typeahead_index)
+        except Exception as e:
+            logger.error(f"Typeahead refresh failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    events.start()
+    password_hasher.start()
+    social_http.start()
+    try:
+        await run_in_threadpool(_load_typeahead_index)
+    except Exception as e:
+        # /social/suggest returns empty results until the next refresh
+        logger.error(f"Failed to load typeahead index: {e}")
+    try:
+        await run_in_threadpool(_load_trending_hashtags)
+    except Exception as e:
+        logger.error(f"Failed to warm trending hashtags: {e}")
+    try:
+        await run_in_threadpool(_load_revocations)
+    except Exception as e:
+        logger.error(f"Failed to seed revocation filter: {e}")
+    refresh_task = asyncio.create_task(_refresh_typeahead_index())
+    sweep_task = asyncio.create_task(_sweep_sessions())
+    oauth_sweep_task = asyncio.create_task(_sweep_oauth_states())
+    publish_worker.start()
+    draft_scheduler.start()
+    post_verifier.start()
+    token_refresher.start()
+    token_reencryptor.start()
+    media_pipeline.start()
+    media_collector.start()
+
+    yield
+
+    refresh_task.cancel()
+    sweep_task.cancel()
+    oauth_sweep_task.cancel()
+    await media_collector.stop()
+    await media_pipeline.stop()
+    await token_reencryptor.stop()
+    await token_refresher.stop()
+    await post_verifier.stop()
+    await draft_scheduler.stop()
+    await publish_worker.stop()
+    await social_http.close()
+    await agent_service.close()
+    password_hasher.shutdown()
+    events.stop()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -24,12 +176,27 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # WebSocket routes for real-time features
 from app.api.v1.endpoints import websocket as ws_router
 app.include_router(ws_router.router, prefix=f"{settings.API_V1_STR}/ws", tags=["websocket"])
 
+# Uploaded media, when stored on the local filesystem
+media_backend = get_backend()
+if isinstance(media_backend, LocalStorageBackend):
+    os.makedirs(media_backend.root, exist_ok=True)
+    app.mount(media_backend.mount_path, StaticFiles(directory=media_backend.root), name="media")
+
 @app.get("/")
 def root():
     return {"message": "Welcome to Vextra API", "status": "active"}
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class AgentResponse(Base):
+    """
+    Persistent tier of the AI agent's response cache.
+
+    A generated post or hashtag suggestion, keyed by the SHA-256 of the
+    model, prompt and sampling parameters, so an identical request is
+    answered without calling the model again until `expires_at`.
+    """
+    __tablename__ = "agent_responses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(64), nullable=False)
+    kind = Column(String(20), nullable=False)  # content / hashtags
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('uq_agent_response_key', 'key', unique=True),
+        Index('idx_agent_response_expires', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<AgentResponse(id={self.id}, kind={self.kind}, key={self.key})>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, ForeignKey, UniqueConstraint
+from app.db.base import Base
+
+
+class AgentUsage(Base):
+    """
+    Groq usage per user and (UTC) day: requests and prompt / completion
+    tokens as reported by the API, for quotas and cost accounting.
+    """
+    __tablename__ = "agent_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    day = Column(Date, nullable=False)
+    requests = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'day', name='uq_agent_usage_user_day'),
+    )
+
+    def __repr__(self):
+        return f"<AgentUsage(user_id={self.user_id}, day={self.day}, requests={self.requests})>"
@@ -42,6 +42,9 @@ class Follow(Base):
         UniqueConstraint('follower_id', 'following_id', name='unique_follow'),
         Index('idx_follower_id', 'follower_id'),
         Index('idx_following_id', 'following_id'),
+        # Keyset pagination of follower / following lists, newest first
+        Index('idx_follow_following_created', 'following_id', 'created_at', 'id'),
+        Index('idx_follow_follower_created', 'follower_id', 'created_at', 'id'),
     )
 
     def __repr__(self):
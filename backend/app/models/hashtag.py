@@ -0,0 +1,55 @@
+"""
+Hashtag models.
+Hashtags are extracted from post content on publish and normalised into
+their own table so hashtag pages and trending counts never scan post text.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class Hashtag(Base):
+    """A unique, lower-cased hashtag (stored without the leading '#')."""
+    __tablename__ = "hashtags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tag = Column(String(100), unique=True, index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Hashtag(id={self.id}, tag={self.tag})>"
+
+
+class PostHashtag(Base):
+    """Links a published post to a hashtag used in its content."""
+    __tablename__ = "post_hashtags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    hashtag_id = Column(
+        Integer,
+        ForeignKey("hashtags.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    # When the post was published; drives hashtag page order and trending windows
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    post = relationship("Post", back_populates="hashtag_links")
+    hashtag = relationship("Hashtag")
+
+    __table_args__ = (
+        UniqueConstraint('post_id', 'hashtag_id', name='uq_post_hashtag'),
+        # Keyset pagination of a hashtag page: WHERE hashtag_id = ? ORDER BY created_at, id
+        Index('idx_post_hashtag_tag_created', 'hashtag_id', 'created_at', 'id'),
+        # Trending warm-up scans recent rows only
+        Index('idx_post_hashtag_created', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<PostHashtag(post_id={self.post_id}, hashtag_id={self.hashtag_id})>"
@@ -0,0 +1,52 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, JSON, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class MediaAsset(Base):
+    """
+    An uploaded media file and its generated derivatives.
+
+    `variants` maps variant name to URL, e.g.
+    {"thumb": ".../<id>_thumb.webp", "small": ..., "medium": ...}: resized,
+    recompressed WebP copies without metadata. Posts and users copy the
+    variants of their media into Post.media_variants / User.profile_picture_variants.
+
+    Uploads through the API are stored under their SHA-256 (`content_hash`),
+    so identical files share one object and one row. `ref_count` counts the
+    posts, drafts and profiles using the URL; `orphaned_at` is when it last
+    dropped to zero, after which the media collector may delete the object.
+    """
+    __tablename__ = "media_assets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(1024), nullable=False)
+    path = Column(String(1024), nullable=True)  # Object path in storage
+    content_type = Column(String(100), nullable=True)
+
+    content_hash = Column(String(64), nullable=True)  # SHA-256 hex, for uploads through the API
+    size = Column(BigInteger, nullable=True)
+
+    # pending -> ready / failed / skipped (not an image, or not in our storage);
+    # deleting while the media collector removes the objects
+    status = Column(String(20), nullable=False, default="pending")
+    variants = Column(JSON, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    orphaned_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index('uq_media_asset_url', 'url', unique=True),
+        Index('idx_media_asset_status', 'status'),
+        Index('idx_media_asset_content_hash', 'content_hash'),
+        Index('idx_media_asset_orphaned', 'orphaned_at'),
+    )
+
+    def __repr__(self):
+        return f"<MediaAsset(id={self.id}, url={self.url}, status={self.status})>"
@@ -62,6 +62,7 @@ class Message(Base):
         Index('idx_message_conversation_id', 'conversation_id'),
         Index('idx_message_sender_id', 'sender_id'),
         Index('idx_message_created_at', 'created_at'),
+        Index('idx_message_media_url', 'media_url'),
     )
 
     def __repr__(self):
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime, JSON, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class OAuthState(Base):
+    """
+    Pending OAuth authorization (state -> user, platform, PKCE verifier...).
+    Single use: the callback deletes the row; unclaimed rows are swept after they expire.
+    """
+    __tablename__ = "oauth_states"
+
+    key = Column(String(128), primary_key=True)
+    data = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_oauth_state_expires', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<OAuthState(key={self.key[:8]}...)>"
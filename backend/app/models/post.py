@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -11,11 +11,15 @@ class Post(Base):
     
     content = Column(Text, nullable=True)
     media_urls = Column(JSON, nullable=True)  # List of strings [url1, url2]
+    media_variants = Column(JSON, nullable=True)  # Per media URL: {"thumb": url, ...} ({} until generated)
     platforms = Column(JSON, nullable=True)   # List of strings ["instagram", "inspire"]
     
     # Draft support
     is_draft = Column(Boolean, default=False, index=True)
     title = Column(String, nullable=True)  # Optional title for drafts
+    scheduled_at = Column(DateTime(timezone=True), nullable=True)  # Draft auto-publishes at this time
+    schedule_attempts = Column(Integer, default=0, server_default="0", nullable=False)  # Failed scheduled publishes
+    schedule_retry_at = Column(DateTime(timezone=True), nullable=True)  # Not retried before this time
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -34,4 +38,11 @@ class Post(Base):
     saved_by = relationship("SavedPost", back_populates="post", cascade="all, delete-orphan")
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
+    hashtag_links = relationship("PostHashtag", back_populates="post", cascade="all, delete-orphan")
+    media_links = relationship("PostMedia", back_populates="post", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Due scheduled drafts: is_draft AND scheduled_at <= now ORDER BY scheduled_at
+        Index('idx_post_scheduled', 'is_draft', 'scheduled_at'),
+    )
 
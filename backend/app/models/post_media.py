@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+
+
+class PostMedia(Base):
+    """
+    One use of a media URL by a post or draft (a row per entry of Post.media_urls).
+    Lets the media pipeline and collector find the posts using a URL with an index lookup.
+    """
+    __tablename__ = "post_media"
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    url = Column(String(1024), nullable=False)
+
+    # Relationships
+    post = relationship("Post", back_populates="media_links")
+
+    __table_args__ = (
+        Index('idx_post_media_url', 'url'),
+        Index('idx_post_media_post', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f"<PostMedia(post_id={self.post_id}, url={self.url})>"
@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class PublishJob(Base):
+    """
+    Background publish of a post to external platforms.
+
+    `platforms` holds the per-platform state:
+    {"linkedin": {"status": "succeeded", "attempts": 1, "post_id": ..., "url": ..., "latency_ms": ...}}
+    with status pending / retrying / succeeded / failed. A job is claimed by
+    one worker at a time (status "running" until `locked_until`); platforms
+    that already succeeded are never re-published on retry.
+    """
+    __tablename__ = "publish_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    post_id = Column(
+        Integer,
+        ForeignKey("posts.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    # Client-supplied Idempotency-Key: repeating a request returns the same job
+    idempotency_key = Column(String(128), nullable=True)
+
+    content = Column(Text, nullable=False)
+    media_urls = Column(JSON, nullable=True)
+    platforms = Column(JSON, nullable=False)
+
+    # queued -> running -> queued (retry) / succeeded / partial / failed
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(64), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'idempotency_key', name='uq_publish_job_idempotency'),
+        Index('idx_publish_job_due', 'status', 'next_attempt_at'),
+        Index('idx_publish_job_user', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f"<PublishJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
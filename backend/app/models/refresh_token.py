@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class RefreshToken(Base):
+    """
+    A refresh token, stored as a SHA-256 hash. Every login starts a new
+    family (session); each refresh rotates the token within its family.
+    Presenting an already-rotated token revokes the whole family.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family_id = Column(String(32), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    rotated_at = Column(DateTime(timezone=True), nullable=True)  # exchanged for a newer token
+    revoked_at = Column(DateTime(timezone=True), nullable=True)  # family revoked (logout, reuse, password change)
+
+    __table_args__ = (
+        Index('idx_refresh_token_family', 'family_id'),
+        Index('idx_refresh_token_user', 'user_id'),
+        Index('idx_refresh_token_revoked', 'revoked_at'),
+        Index('idx_refresh_token_expires', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<RefreshToken(user_id={self.user_id}, family_id={self.family_id})>"
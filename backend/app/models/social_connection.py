@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -25,6 +25,12 @@ class SocialConnection(Base):
     access_token = Column(Text, nullable=False)
     refresh_token = Column(Text, nullable=True)
     token_expires_at = Column(DateTime, nullable=True)
+    # Background refresh: last attempt (also the cross-instance claim) and its error, if any
+    token_refresh_attempted_at = Column(DateTime, nullable=True)
+    token_refresh_error = Column(Text, nullable=True)
+    # LinkedIn post verification: asked for by a tab view, and the last cross-instance claim
+    verify_requested_at = Column(DateTime, nullable=True)
+    verify_claimed_at = Column(DateTime, nullable=True)
     
     # Granted permissions
     scopes = Column(Text, nullable=True)  # Comma-separated scopes
@@ -36,5 +42,12 @@ class SocialConnection(Base):
     # Relationship to user
     user = relationship("User", backref="social_connections")
 
+    __table_args__ = (
+        # Tokens nearing expiry, for the background refresher
+        Index('idx_social_connection_expires', 'token_expires_at'),
+        # Connections least recently verified, for the post verifier
+        Index('idx_social_connection_verify', 'platform', 'verify_claimed_at'),
+    )
+
     class Config:
         orm_mode = True
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import Boolean, Column, Integer, String, JSON
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -10,7 +10,10 @@ class User(Base):
     full_name = Column(String, index=True)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    # Bumped to revoke every issued access token (password change, deactivation)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     profile_picture = Column(String, nullable=True)
+    profile_picture_variants = Column(JSON, nullable=True)  # {"thumb": url, ...}, see MediaAsset
     username = Column(String, unique=True, index=True, nullable=True) # Optional initially
     bio = Column(String, nullable=True)
     
@@ -36,3 +36,7 @@ class AgentChatResponse(BaseModel):
     )
     success: bool = Field(default=True, description="Whether the request succeeded")
     error: Optional[str] = Field(default=None, description="Error message if failed")
+    retry_after: Optional[int] = Field(
+        default=None,
+        description="Seconds to wait before retrying, when busy or rate limited"
+    )
@@ -1,6 +1,6 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 
 # Shared properties
 class PostBase(BaseModel):
@@ -15,15 +15,15 @@ class PostCreate(PostBase):
 
 # Properties for draft creation
 class DraftCreate(PostBase):
-    pass  # is_draft will be set to True by the endpoint
+    scheduled_at: Optional[datetime] = None  # publish automatically at this time (UTC if naive)
 
 # Properties to receive on item update
 class PostUpdate(PostBase):
     pass
 
-# Properties for updating a draft
+# Properties for updating a draft (send scheduled_at: null to unschedule)
 class DraftUpdate(PostBase):
-    pass
+    scheduled_at: Optional[datetime] = None
 
 # Properties shared by models stored in DB
 class PostInDBBase(PostBase):
@@ -33,8 +33,23 @@ class PostInDBBase(PostBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     published_at: Optional[datetime] = None
+    scheduled_at: Optional[datetime] = None
     likes_count: Optional[int] = 0
     comments_count: Optional[int] = 0
+    # Per media URL: resized WebP variants {"thumb": url, "small": url, "medium": url}
+    media_variants: Optional[List[Dict[str, str]]] = None
+
+    @computed_field
+    @property
+    def media_previews(self) -> Optional[List[str]]:
+        """Feed-sized ("medium") variant of each media URL; the original until variants exist"""
+        if self.media_urls is None:
+            return None
+        variants = self.media_variants or []
+        return [
+            (variants[i].get("medium") if i < len(variants) else None) or url
+            for i, url in enumerate(self.media_urls)
+        ]
 
     class Config:
         from_attributes = True
@@ -57,6 +72,20 @@ class PostFeed(BaseModel):
     size: int
     has_more: bool
 
+# Keyset-paginated post list (hashtag pages)
+class PostCursorPage(BaseModel):
+    items: List[Post]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+class HashtagCount(BaseModel):
+    tag: str
+    count: int
+
+class TrendingHashtags(BaseModel):
+    items: List[HashtagCount]
+    window_hours: int
+
 # Draft list response
 class DraftList(BaseModel):
     items: List[Post]
@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
 
+from app.schemas.post import PostFeed
+
 
 # ============== Follow Schemas ==============
 
@@ -44,12 +46,39 @@ class FollowersResponse(BaseModel):
     """Response schema for followers list."""
     followers: List[FollowerInfo]
     total: int
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page
+    has_more: bool = False
 
 
 class FollowingResponse(BaseModel):
     """Response schema for following list."""
     following: List[FollowingInfo]
     total: int
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page
+    has_more: bool = False
+
+
+class MutualFollowersResponse(BaseModel):
+    """People the current user follows who also follow the target user."""
+    users: List[FollowerInfo]
+    total: int
+
+
+# ============== Suggestion Schemas ==============
+
+class SuggestedUser(BaseModel):
+    """Schema for a "people you may know" suggestion."""
+    id: int
+    username: Optional[str]
+    full_name: Optional[str]
+    profile_picture: Optional[str]
+    followers_count: int
+    mutual_count: int  # How many people you follow also follow this user
+
+
+class SuggestedUsersResponse(BaseModel):
+    """Response schema for follow suggestions."""
+    results: List[SuggestedUser]
 
 
 # ============== User Search Schemas ==============
@@ -71,7 +100,23 @@ class UserSearchResult(BaseModel):
 class UserSearchResponse(BaseModel):
     """Response schema for user search."""
     results: List[UserSearchResult]
-    total: int
+    total: int  # Capped at crud.base.SEARCH_COUNT_CAP
+    query: str
+    has_more: bool = False
+
+
+class UserSuggestion(BaseModel):
+    """Schema for a typeahead completion."""
+    id: int
+    username: Optional[str]
+    full_name: Optional[str]
+    profile_picture: Optional[str]
+    followers_count: int
+
+
+class UserSuggestResponse(BaseModel):
+    """Response schema for username autocomplete."""
+    results: List[UserSuggestion]
     query: str
 
 
@@ -92,3 +137,9 @@ class PublicProfile(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ProfilePage(BaseModel):
+    """Profile screen in one response: header, relationship flags and first page of posts."""
+    profile: PublicProfile
+    posts: PostFeed
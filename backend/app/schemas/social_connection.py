@@ -64,3 +64,18 @@ class PublishResponse(BaseModel):
     """Response from publish request"""
     success: bool
     results: dict  # platform -> result
+
+
+class PublishJobResponse(BaseModel):
+    """Background publish job and its per-platform status"""
+    id: int
+    post_id: Optional[int] = None
+    status: str  # queued, running, succeeded, partial, failed
+    platforms: dict  # platform -> {status, attempts, post_id, url, error, latency_ms}
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+
+class DirectUploadRequest(BaseModel):
+    """Schema for requesting a direct-to-storage upload URL"""
+    filename: str  # Informational; the stored extension comes from content_type
+    content_type: str
+    folder: Optional[str] = "posts"
+    size: Optional[int] = Field(default=None, ge=0)  # Bytes; the upload may not exceed it, large files get a resumable session
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")  # Skips the upload if already stored
+
+
+class DirectUploadResponse(BaseModel):
+    """Where and how the client uploads the file, and its URL afterwards"""
+    upload_url: Optional[str] = None  # None when the file is already stored (`exists`)
+    method: str = "PUT"
+    headers: Dict[str, str] = {}
+    resumable: bool = False
+    public_url: str
+    exists: bool = False
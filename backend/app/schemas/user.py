@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel, EmailStr
 
 # Shared properties
@@ -34,6 +34,7 @@ class UserUpdate(BaseModel):
 class User(UserBase):
     id: int
     profile_picture: Optional[str] = None
+    profile_picture_variants: Optional[Dict[str, str]] = None  # {"thumb": url, ...}
     posts_count: int = 0
     followers_count: int = 0
     following_count: int = 0
@@ -45,6 +46,11 @@ class User(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # access token lifetime, seconds
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     id: Optional[int] = None
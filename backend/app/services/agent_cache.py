@@ -0,0 +1,172 @@
+"""
+Response cache for the AI agent's one-shot generations.
+
+`generate_content` and `suggest_hashtags` are pure functions of their
+prompt, and the AI-generation screen often retries the same inputs. Their
+responses are cached under the SHA-256 of (kind, model, messages, sampling
+parameters): first in an in-process LRU, then in the agent_responses table
+(shared by all instances, survives restarts), both for
+AGENT_RESPONSE_CACHE_TTL_SECONDS. Identical requests arriving while the
+first is still being generated wait for it instead of calling the model
+again (single flight); if that generation fails or is cancelled, the
+waiters start over, one of them generating under its own user's limits for
+the rest, rather than inheriting the first caller's error. Failed or empty generations are not cached.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.agent_response import AgentResponse
+
+logger = logging.getLogger(__name__)
+
+
+def response_key(kind: str, request: Dict[str, Any]) -> str:
+    """Stable hash of everything that determines a response."""
+    payload = json.dumps({"kind": kind, **request}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---- persistent tier (run in the threadpool, own sessions) ----
+
+def _load(key: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        row = db.query(AgentResponse.response).filter(
+            AgentResponse.key == key,
+            AgentResponse.expires_at > _utcnow(),
+        ).first()
+        return row.response if row else None
+    finally:
+        db.close()
+
+
+def _store(key: str, kind: str, response: str, ttl: float) -> None:
+    db = SessionLocal()
+    try:
+        now = _utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        # An expired copy of this key is replaced; other expired rows are dropped on the way
+        db.query(AgentResponse).filter(AgentResponse.expires_at <= now).delete(synchronize_session=False)
+        updated = db.query(AgentResponse).filter(AgentResponse.key == key).update({
+            AgentResponse.response: response,
+            AgentResponse.expires_at: expires_at,
+        }, synchronize_session=False)
+        if not updated:
+            db.add(AgentResponse(key=key, kind=kind, response=response, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Stored concurrently by another instance
+            db.rollback()
+    finally:
+        db.close()
+
+
+class ResponseCache:
+    """Two-tier (memory, database) response cache with single-flight generation."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.db_hits = 0
+        self.generated = 0
+        self.coalesced = 0
+
+    async def get_or_generate(
+        self,
+        kind: str,
+        request: Dict[str, Any],
+        generate: Callable[[], Awaitable[str]],
+    ) -> str:
+        """The cached response for `request`, calling `generate` (once) on a miss."""
+        key = response_key(kind, request)
+        while True:
+            response = self._memory.get(key)
+            if response is not None:
+                return response
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                # Shielded: a waiter giving up must not cancel the shared call
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This waiter was cancelled, not the shared call
+                    raise
+            except Exception:
+                pass
+            # The shared call failed (possibly for its caller's reasons, e.g. a rate limit):
+            # start over, the first waiter back generating for the others
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._load_or_generate(key, kind, generate)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Retrieved here so an unawaited future doesn't log it again
+                future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load_or_generate(self, key: str, kind: str, generate: Callable[[], Awaitable[str]]) -> str:
+        try:
+            response = await run_in_threadpool(_load, key)
+        except Exception as e:
+            logger.warning(f"Agent response cache lookup failed: {e}")
+            response = None
+        if response is not None:
+            self.db_hits += 1
+        else:
+            response = await generate()
+            self.generated += 1
+            if not response:
+                return response
+            try:
+                await run_in_threadpool(_store, key, kind, response, self.ttl)
+            except Exception as e:
+                logger.warning(f"Storing agent response failed: {e}")
+        self._memory.set(key, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self._memory.stats()
+        return {
+            "entries": memory["entries"],
+            "memory_hits": memory["hits"],
+            "db_hits": self.db_hits,
+            "coalesced": self.coalesced,
+            "generated": self.generated,
+            "in_flight": len(self._inflight),
+        }
+
+
+response_cache = ResponseCache(
+    maxsize=settings.AGENT_RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.AGENT_RESPONSE_CACHE_TTL_SECONDS,
+)
@@ -4,16 +4,50 @@ AI Agent Service with Groq Integration.
 This service provides the core agent functionality using Groq's LLM API.
 It acts as an "Expert Guide" using real-time user context to answer questions
 and provide instructions, rather than executing actions directly.
+
+Calls go through the async Groq client, so a multi-second completion never
+blocks the event loop. Each request has a timeout (AGENT_REQUEST_TIMEOUT_SECONDS,
+also the longest pause between streamed chunks; streamed replies are capped at
+AGENT_STREAM_TIMEOUT_SECONDS overall) and is admitted by the LLM scheduler
+(services/llm_scheduler.py): per-user token budgets, a global concurrency
+cap, chat ahead of hashtag suggestions, and per-user usage accounting.
+
+The system prompt with a user's context (profile stats, recent posts, draft
+count) is built once and cached per user, so a chat turn usually costs no
+queries. Entries are dropped on every instance when the user's posts,
+drafts, follows or profile change (the profile invalidation events plus
+`invalidate_agent_context` for drafts). Conversation history is trimmed to
+the newest messages fitting AGENT_HISTORY_TOKEN_BUDGET. Post and hashtag
+generations go through the response cache (services/agent_cache.py).
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List, Dict, Any, AsyncIterator, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from groq import Groq
+from groq import AsyncGroq
+from starlette.concurrency import run_in_threadpool
 
+from app.core import events
+from app.core.cache import LRUCache
 from app.core.config import settings
 from app.schemas.agent import AgentAction, AgentMessage
 from app.models.user import User
 from app.models.post import Post
+from app.services.agent_cache import response_cache
+from app.services.llm_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    AgentLimitError,
+    llm_scheduler,
+)
+from app.services.profiles import CHANGED_TOPIC as PROFILES_CHANGED_TOPIC
+
+logger = logging.getLogger(__name__)
+
+MODEL = "llama-3.3-70b-versatile"
 
 # System prompt that defines the agent's personality
 SYSTEM_PROMPT = """You are Vextra AI, the expert guide and creative co-pilot for the Vextra app.
@@ -38,6 +72,63 @@ You have access to the user's real-time data:
   Agent: "You currently have 124 followers." (Based on context)
 """
 
+# The prompt around the per-user context, split once instead of formatted per turn
+_PROMPT_HEAD, _PROMPT_TAIL = SYSTEM_PROMPT.split("{user_context}")
+_NO_CONTEXT_PROMPT = _PROMPT_HEAD + "No user data available." + _PROMPT_TAIL
+
+CONTEXT_CHANGED_TOPIC = "agent.context_changed"
+
+# user_id -> system prompt with that user's context
+context_cache = LRUCache(
+    maxsize=settings.AGENT_CONTEXT_CACHE_MAX_ENTRIES,
+    ttl=settings.AGENT_CONTEXT_CACHE_TTL_SECONDS,
+)
+
+# Users share invalidation versions by id modulo this, keeping them bounded
+VERSION_STRIPES = 1024
+
+# Bumped on invalidation, so a prompt built from data read before it isn't cached
+_context_versions: List[int] = [0] * VERSION_STRIPES
+
+
+def _apply_context_changed(data: Dict) -> None:
+    for user_id in data.get("user_ids", []):
+        _context_versions[user_id % VERSION_STRIPES] += 1
+        context_cache.delete(user_id)
+
+
+def _clear_context() -> None:
+    for stripe in range(VERSION_STRIPES):
+        _context_versions[stripe] += 1
+    context_cache.clear()
+
+
+def invalidate_agent_context(*user_ids: int) -> None:
+    """Drop the cached agent context of these users (drafts changed; profile events are followed already)."""
+    events.publish(CONTEXT_CHANGED_TOPIC, {"user_ids": list(user_ids)})
+
+
+events.subscribe(CONTEXT_CHANGED_TOPIC, _apply_context_changed)
+events.subscribe(PROFILES_CHANGED_TOPIC, _apply_context_changed)
+events.on_reconnect(_clear_context)
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text, plus per-message overhead
+    return len(text) // 4 + 4
+
+
+def trim_history(history: Optional[List[AgentMessage]], budget: int) -> List[AgentMessage]:
+    """The most recent messages whose estimated size fits in `budget` tokens."""
+    kept = []
+    for msg in reversed(history or []):
+        budget -= _estimate_tokens(msg.content)
+        if budget < 0:
+            break
+        kept.append(msg)
+    kept.reverse()
+    return kept
+
 
 class AgentService:
     """Service for AI agent interactions using Groq."""
@@ -46,50 +137,142 @@ class AgentService:
         """Initialize the Groq client."""
         self.client = None
         if settings.GROQ_API_KEY:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
+            self.client = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                timeout=settings.AGENT_REQUEST_TIMEOUT_SECONDS,
+                # A retry would hold the scheduler slot for another full timeout
+                max_retries=0,
+            )
+        self.completed = 0
+        self.failed = 0
     
     def is_available(self) -> bool:
         """Check if the agent service is configured and available."""
         return self.client is not None
+
+    async def close(self) -> None:
+        """Close the client's connection pool (app shutdown)."""
+        if self.client is not None:
+            await self.client.close()
+
+    @asynccontextmanager
+    async def _slot(self, user_id: Optional[int], lane: str, messages: List[Dict[str, str]], max_tokens: int):
+        """Admission through the scheduler, budgeting the prompt estimate plus `max_tokens`."""
+        estimated = sum(_estimate_tokens(m["content"]) for m in messages) + max_tokens
+        async with llm_scheduler.slot(user_id, lane, estimated) as usage:
+            try:
+                yield usage
+                self.completed += 1
+            except BaseException:
+                self.failed += 1
+                raise
+
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        user_id: Optional[int] = None,
+        lane: str = INTERACTIVE,
+    ) -> str:
+        async with self._slot(user_id, lane, messages, max_tokens) as usage:
+            response = await self.client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+            if response.usage is not None:
+                usage.record(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content or ""
+
+    async def _cached_complete(
+        self,
+        kind: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        user_id: Optional[int] = None,
+        lane: str = INTERACTIVE,
+    ) -> str:
+        """`_complete` through the response cache: identical prompts are generated once."""
+        request = {"model": MODEL, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        return await response_cache.get_or_generate(
+            kind, request, partial(self._complete, messages, temperature, max_tokens, user_id, lane)
+        )
         
-    def get_user_context(self, db: Session, user_id: int) -> str:
-        """Fetch real-time user stats and recent activity."""
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                return "User data not found."
-            
-            # Fetch recent posts
-            recent_posts = db.query(Post).filter(
-                Post.user_id == user_id,
-                Post.is_draft == False
-            ).order_by(desc(Post.created_at)).limit(3).all()
+    def _load_user_context(self, db: Session, user_id: int) -> Optional[str]:
+        """The context text for the prompt; None if the user doesn't exist."""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return None
+        
+        # Fetch recent posts
+        recent_posts = db.query(Post).filter(
+            Post.user_id == user_id,
+            Post.is_draft == False
+        ).order_by(desc(Post.created_at)).limit(3).all()
+        
+        post_summaries = []
+        for p in recent_posts:
+            content_preview = (p.content[:30] + "...") if p.content else "Image Post"
+            post_summaries.append(f"- Post '{content_preview}' ({p.likes_count} likes)")
             
-            post_summaries = []
-            for p in recent_posts:
-                content_preview = (p.content[:30] + "...") if p.content else "Image Post"
-                post_summaries.append(f"- Post '{content_preview}' ({p.likes_count} likes)")
-                
-            drafts_count = db.query(Post).filter(
-                Post.user_id == user_id, 
-                Post.is_draft == True
-            ).count()
-
-            context_str = f"""
-            - Name: {user.full_name or user.username}
-            - Bio: {user.bio or 'No bio set'}
-            - Followers: {user.followers_count}
-            - Following: {user.following_count}
-            - Total Posts: {user.posts_count}
-            - Drafts Pending: {drafts_count}
-            - Recent Activity:
-              {chr(10).join(post_summaries) if post_summaries else "No recent posts."}
-            """
-            return context_str
+        drafts_count = db.query(Post).filter(
+            Post.user_id == user_id, 
+            Post.is_draft == True
+        ).count()
+
+        context_str = f"""
+        - Name: {user.full_name or user.username}
+        - Bio: {user.bio or 'No bio set'}
+        - Followers: {user.followers_count}
+        - Following: {user.following_count}
+        - Total Posts: {user.posts_count}
+        - Drafts Pending: {drafts_count}
+        - Recent Activity:
+          {chr(10).join(post_summaries) if post_summaries else "No recent posts."}
+        """
+        return context_str
+
+    def get_system_prompt(self, db: Session, user_id: int) -> str:
+        """System prompt with the user's context, from the per-user cache when possible."""
+        prompt = context_cache.get(user_id)
+        if prompt is not None:
+            return prompt
+        version = _context_versions[user_id % VERSION_STRIPES]
+        try:
+            context_data = self._load_user_context(db, user_id)
         except Exception as e:
-            print(f"Error fetching context: {e}")
-            return "Error loading user context."
+            logger.error(f"Error fetching context: {e}")
+            return _PROMPT_HEAD + "Error loading user context." + _PROMPT_TAIL
+        if context_data is None:
+            return _PROMPT_HEAD + "User data not found." + _PROMPT_TAIL
+        prompt = _PROMPT_HEAD + context_data + _PROMPT_TAIL
+        if _context_versions[user_id % VERSION_STRIPES] == version:
+            context_cache.set(user_id, prompt)
+        return prompt
     
+    def build_messages(
+        self,
+        message: str,
+        history: Optional[List[AgentMessage]] = None,
+        user_context: Optional[Dict[str, Any]] = None,
+        db: Optional[Session] = None
+    ) -> List[Dict[str, str]]:
+        """System prompt with the user's context, the (trimmed) history and the new message."""
+        # 1. Prompt with rich context if DB is available
+        current_system_prompt = _NO_CONTEXT_PROMPT
+        if db and user_context and "user_id" in user_context:
+            current_system_prompt = self.get_system_prompt(db, user_context["user_id"])
+
+        # 2. Build messages, keeping only as much history as the budget allows
+        messages = [{"role": "system", "content": current_system_prompt}]
+        for msg in trim_history(history, settings.AGENT_HISTORY_TOKEN_BUDGET):
+            messages.append({"role": msg.role, "content": msg.content})
+        messages.append({"role": "user", "content": message})
+        return messages
+
     async def chat(
         self,
         message: str,
@@ -109,55 +292,84 @@ class AgentService:
             }
         
         try:
-            # 1. Fetch rich context if DB is available
-            context_data = "No user data available."
-            if db and user_context and "user_id" in user_context:
-                context_data = self.get_user_context(db, user_context["user_id"])
-            
-            # 2. Inject context into Prompt
-            current_system_prompt = SYSTEM_PROMPT.format(user_context=context_data)
-
-            # 3. Build messages
-            messages = [{"role": "system", "content": current_system_prompt}]
-            if history:
-                for msg in history:
-                    messages.append({"role": msg.role, "content": msg.content})
-            messages.append({"role": "user", "content": message})
+            messages = await run_in_threadpool(self.build_messages, message, history, user_context, db)
             
-            # 4. Call LLM (No Tools)
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
+            # Call LLM (No Tools)
+            response_text = await self._complete(
+                messages,
                 temperature=0.7,
-                max_tokens=500
+                max_tokens=500,
+                user_id=(user_context or {}).get("user_id"),
             )
             
-            response_text = response.choices[0].message.content or "I didn't catch that."
-            
             return {
-                "message": response_text,
+                "message": response_text or "I didn't catch that.",
                 "actions": [], # No actions in Guide Mode
                 "success": True
             }
             
+        except AgentLimitError as e:
+            return {
+                "message": str(e),
+                "actions": [],
+                "success": False,
+                "error": e.code,
+                "retry_after": e.retry_after
+            }
         except Exception as e:
-            import traceback
-            print(f"Error in agent chat: {e}")
-            traceback.print_exc()
+            logger.exception(f"Error in agent chat: {e}")
             return {
                 "message": "I encountered an error. Please try again.",
                 "actions": [],
                 "success": False,
                 "error": str(e)
             }
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the reply to `build_messages` output, yielding text as it arrives.
+        Raises AgentLimitError when the scheduler refuses the call,
+        asyncio.TimeoutError past AGENT_STREAM_TIMEOUT_SECONDS.
+        """
+        async with self._slot(user_id, INTERACTIVE, messages, 500) as usage:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.AGENT_STREAM_TIMEOUT_SECONDS
+            stream = await self.client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True,
+            )
+            try:
+                async for chunk in stream:
+                    if loop.time() > deadline:
+                        raise asyncio.TimeoutError("Agent reply took too long")
+                    # Groq reports usage on the final chunk
+                    x_groq = getattr(chunk, "x_groq", None)
+                    if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                        usage.record(x_groq.usage.prompt_tokens, x_groq.usage.completion_tokens)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
     
     async def generate_content(
         self,
         topic: str,
         style: str = "casual",
-        existing_content: Optional[str] = None
+        existing_content: Optional[str] = None,
+        user_id: Optional[int] = None
     ) -> str:
-        """Generate or improve content for a post."""
+        """
+        Generate or improve content for a post.
+        Raises AgentLimitError when the scheduler refuses the call.
+        """
         if not self.is_available():
             return ""
         
@@ -166,39 +378,57 @@ class AgentService:
             prompt = f"Improve this content:\n{existing_content}\n\nMake it more {style}."
         
         try:
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
+            return await self._cached_complete(
+                "content",
+                [
                     {"role": "system", "content": "You are a social media content creator. Generate engaging, concise content. No hashtags unless asked."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.8,
-                max_tokens=280
+                max_tokens=280,
+                user_id=user_id
             )
-            return response.choices[0].message.content or ""
+        except AgentLimitError:
+            raise
         except Exception:
             return ""
     
-    async def suggest_hashtags(self, content: str, count: int = 5) -> List[str]:
-        """Suggest relevant hashtags for content."""
+    async def suggest_hashtags(self, content: str, count: int = 5, user_id: Optional[int] = None) -> List[str]:
+        """
+        Suggest relevant hashtags for content (batch lane: chat goes first).
+        Raises AgentLimitError when the scheduler refuses the call.
+        """
         if not self.is_available():
             return []
         
         try:
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
+            hashtags_text = await self._cached_complete(
+                "hashtags",
+                [
                     {"role": "system", "content": f"Generate exactly {count} relevant hashtags for social media content. Return ONLY the hashtags separated by spaces, starting with #. No explanations."},
                     {"role": "user", "content": content}
                 ],
                 temperature=0.6,
-                max_tokens=100
+                max_tokens=100,
+                user_id=user_id,
+                lane=BATCH
             )
-            hashtags_text = response.choices[0].message.content or ""
             return [tag.strip() for tag in hashtags_text.split() if tag.startswith("#")][:count]
+        except AgentLimitError:
+            raise
         except Exception:
             return []
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.is_available(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "scheduler": llm_scheduler.stats(),
+            "context_cache": context_cache.stats(),
+            "response_cache": response_cache.stats(),
+        }
+
 
 # Singleton instance
 agent_service = AgentService()
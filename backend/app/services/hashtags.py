@@ -0,0 +1,189 @@
+"""
+Hashtag extraction, indexing and trending counts.
+
+Published posts have their hashtags written to `post_hashtags`. Trending
+counts are kept in memory as hourly buckets: publishing increments the
+current bucket (on every instance, via app.core.events), and a window query
+sums the last N buckets, so trending never scans posts. Re-indexing a post
+whose content changed and deleting a post take its uses back out of the
+buckets they were counted in.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.models.hashtag import Hashtag, PostHashtag
+from app.models.post import Post
+
+logger = logging.getLogger(__name__)
+
+HASHTAG_PATTERN = re.compile(r"#(\w{1,100})", re.UNICODE)
+
+USED_TOPIC = "hashtags.used"
+
+# A change to the trending counts: (tag, unix time of the use, +1 or -1)
+TagUse = Tuple[str, float, int]
+
+BUCKET_SECONDS = 3600
+MAX_WINDOW_HOURS = 24 * 7
+
+
+def normalize_hashtag(tag: str) -> str:
+    """Lower-case a tag and strip any leading '#'."""
+    return tag.lstrip("#").lower()
+
+
+def extract_hashtags(content: Optional[str]) -> List[str]:
+    """Unique, normalised hashtags in order of first appearance."""
+    if not content:
+        return []
+    seen = []
+    for match in HASHTAG_PATTERN.findall(content):
+        tag = normalize_hashtag(match)
+        if tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+def _get_or_create_hashtags(db: Session, tags: List[str]) -> List[Hashtag]:
+    existing = {
+        h.tag: h for h in db.query(Hashtag).filter(Hashtag.tag.in_(tags)).all()
+    }
+    for tag in tags:
+        if tag in existing:
+            continue
+        # Savepoint so a concurrent insert of the same tag doesn't abort the caller's transaction
+        try:
+            with db.begin_nested():
+                hashtag = Hashtag(tag=tag)
+                db.add(hashtag)
+            existing[tag] = hashtag
+        except IntegrityError:
+            existing[tag] = db.query(Hashtag).filter(Hashtag.tag == tag).one()
+    return [existing[tag] for tag in tags]
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def index_post_hashtags(db: Session, post: Post) -> List[TagUse]:
+    """
+    Link a published post to the hashtags in its content, dropping links to
+    tags its content no longer has (re-indexing after an edit).
+    Does not commit; call `trending_hashtags.record` with the result after the commit.
+    """
+    tags = extract_hashtags(post.content)
+    if post.id is None:
+        if not tags:
+            return []
+        db.flush()  # make sure post.id is assigned
+
+    uses: List[TagUse] = []
+    linked = set()
+    for link, tag in db.query(PostHashtag, Hashtag.tag).join(
+        Hashtag, Hashtag.id == PostHashtag.hashtag_id
+    ).filter(PostHashtag.post_id == post.id):
+        if tag in tags:
+            linked.add(tag)
+        else:
+            uses.append((tag, _timestamp(link.created_at), -1))
+            db.delete(link)
+
+    added = [tag for tag in tags if tag not in linked]
+    if added:
+        now = datetime.now(timezone.utc)
+        for hashtag in _get_or_create_hashtags(db, added):
+            db.add(PostHashtag(post_id=post.id, hashtag_id=hashtag.id, created_at=now))
+            uses.append((hashtag.tag, now.timestamp(), 1))
+    return uses
+
+
+def unindex_posts_hashtags(db: Session, post_ids: List[int]) -> List[TagUse]:
+    """
+    The trending uses of posts about to be deleted (their links cascade).
+    Call `trending_hashtags.record` with the result after the commit.
+    """
+    if not post_ids:
+        return []
+    rows = db.query(Hashtag.tag, PostHashtag.created_at).join(
+        Hashtag, Hashtag.id == PostHashtag.hashtag_id
+    ).filter(PostHashtag.post_id.in_(post_ids)).all()
+    return [(tag, _timestamp(created_at), -1) for tag, created_at in rows]
+
+
+class TrendingHashtags:
+    """Hourly-bucketed hashtag usage counts over a sliding window."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, Counter] = {}
+
+    @staticmethod
+    def _bucket(timestamp: float) -> int:
+        return int(timestamp // BUCKET_SECONDS)
+
+    def _expire(self, now_bucket: int) -> None:
+        oldest = now_bucket - MAX_WINDOW_HOURS
+        for bucket in [b for b in self._buckets if b <= oldest]:
+            del self._buckets[bucket]
+
+    def _apply(self, data: Dict) -> None:
+        with self._lock:
+            for tag, at, change in data.get("uses", []):
+                bucket = self._bucket(at)
+                if change > 0:
+                    self._buckets.setdefault(bucket, Counter())[tag] += change
+                    continue
+                counts = self._buckets.get(bucket)
+                if counts is not None and tag in counts:
+                    counts[tag] += change
+                    if counts[tag] <= 0:
+                        del counts[tag]
+
+    def record(self, uses: List[TagUse]) -> None:
+        """Apply hashtag (un)indexing results to the buckets on every instance."""
+        if uses:
+            events.publish(USED_TOPIC, {"uses": [list(use) for use in uses]})
+
+    def load(self, db: Session) -> None:
+        """Warm the buckets from the last MAX_WINDOW_HOURS of post_hashtags."""
+        since = datetime.now(timezone.utc) - timedelta(hours=MAX_WINDOW_HOURS)
+        rows = db.query(Hashtag.tag, PostHashtag.created_at).join(
+            Hashtag, Hashtag.id == PostHashtag.hashtag_id
+        ).filter(PostHashtag.created_at >= since).all()
+
+        buckets: Dict[int, Counter] = {}
+        for tag, created_at in rows:
+            bucket = self._bucket(_timestamp(created_at))
+            buckets.setdefault(bucket, Counter())[tag] += 1
+
+        with self._lock:
+            self._buckets = buckets
+        logger.info(f"Trending hashtags warmed from {len(rows)} recent uses")
+
+    def top(self, window_hours: int = 24, limit: int = 10) -> List[Tuple[str, int]]:
+        """Most used hashtags in the last `window_hours` hours."""
+        window_hours = max(1, min(window_hours, MAX_WINDOW_HOURS))
+        now_bucket = self._bucket(time.time())
+        totals: Counter = Counter()
+        with self._lock:
+            self._expire(now_bucket)
+            for bucket, counts in self._buckets.items():
+                if bucket > now_bucket - window_hours:
+                    totals.update(counts)
+        return totals.most_common(limit)
+
+
+trending_hashtags = TrendingHashtags()
+events.subscribe(USED_TOPIC, trending_hashtags._apply)
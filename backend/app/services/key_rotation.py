@@ -0,0 +1,136 @@
+"""
+Re-encryption of stored OAuth tokens after a key rotation.
+
+When TOKEN_ENCRYPTION_KEYS puts a new secret in front of the keyring, new
+tokens are encrypted with it right away while existing rows still decrypt
+with the older keys. This job (started in the app lifespan when the keyring
+has more than one key) walks social_connections by id in chunks of
+TOKEN_REENCRYPT_CHUNK_SIZE and re-encrypts every token not yet on the
+primary key, one commit per chunk, pausing between chunks to keep the load
+low. Once a pass finishes, the old secrets can be dropped.
+
+Updates are conditional on the ciphertext read, so a token refreshed or
+reconnected meanwhile (already on the primary key) is never overwritten.
+Every instance runs the job; rows another instance rotated first are simply
+skipped.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from cryptography.fernet import InvalidToken
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.encryption import has_rotation_keys, rotate_token
+from app.db.session import SessionLocal
+from app.models.social_connection import SocialConnection
+
+logger = logging.getLogger(__name__)
+
+TOKEN_COLUMNS = (SocialConnection.access_token, SocialConnection.refresh_token)
+
+
+def _matches(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _reencrypt_chunk(after_id: int, chunk_size: int) -> Tuple[Optional[int], int, int]:
+    """
+    Re-encrypt the next chunk of connections after `after_id`.
+    Returns (last id or None when done, tokens rotated, tokens undecryptable).
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(SocialConnection.id, *TOKEN_COLUMNS).filter(
+            SocialConnection.id > after_id
+        ).order_by(SocialConnection.id).limit(chunk_size).all()
+        if not rows:
+            return None, 0, 0
+
+        rotated = failed = 0
+        for row in rows:
+            current = (row.access_token, row.refresh_token)
+            values = {}
+            for column, value in zip(TOKEN_COLUMNS, current):
+                try:
+                    new_value = rotate_token(value)
+                except InvalidToken:
+                    failed += 1
+                    continue
+                if new_value is not None:
+                    values[column] = new_value
+            if not values:
+                continue
+            updated = db.query(SocialConnection).filter(
+                SocialConnection.id == row.id,
+                *(_matches(column, value) for column, value in zip(TOKEN_COLUMNS, current)),
+            ).update(values, synchronize_session=False)
+            if updated:
+                rotated += len(values)
+        db.commit()
+        return rows[-1].id, rotated, failed
+    finally:
+        db.close()
+
+
+class TokenReencryptor:
+    """One chunked pass moving stored tokens onto the primary key."""
+
+    def __init__(self, chunk_size: int, pause_seconds: float):
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.cursor = 0
+        self.rotated = 0
+        self.failed = 0
+        self.finished = False
+
+    def start(self) -> None:
+        if self._task is None and has_rotation_keys():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        try:
+            await self.run()
+        except Exception as e:
+            logger.error(f"Token re-encryption stopped at connection {self.cursor}: {e}")
+
+    async def run(self) -> None:
+        """Re-encrypt all connections, chunk by chunk."""
+        while True:
+            last_id, rotated, failed = await run_in_threadpool(
+                _reencrypt_chunk, self.cursor, self.chunk_size
+            )
+            if last_id is None:
+                break
+            self.cursor = last_id
+            self.rotated += rotated
+            self.failed += failed
+            await asyncio.sleep(self.pause_seconds)
+        self.finished = True
+        logger.info(
+            f"Token re-encryption finished: {self.rotated} rotated, "
+            f"{self.failed} undecryptable"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self.finished,
+            "cursor": self.cursor,
+            "rotated": self.rotated,
+            "failed": self.failed,
+            "finished": self.finished,
+        }
+
+
+token_reencryptor = TokenReencryptor(
+    chunk_size=settings.TOKEN_REENCRYPT_CHUNK_SIZE,
+    pause_seconds=settings.TOKEN_REENCRYPT_PAUSE_SECONDS,
+)
@@ -0,0 +1,289 @@
+"""
+Admission control for Groq calls.
+
+Every call from AgentService goes through `llm_scheduler.slot(...)`:
+
+- Per-user token buckets: each user may spend AGENT_USER_TOKENS_PER_MINUTE
+  (estimated prompt + max completion tokens), with bursts up to
+  AGENT_USER_TOKEN_BURST. A request that fits after a short wait is held
+  until its tokens are available; one that would wait longer than
+  AGENT_QUEUE_TIMEOUT_SECONDS is refused with AgentRateLimitError and a
+  retry-after. Once the call returns, the bucket is corrected by the usage
+  the API reported.
+- A global cap of AGENT_MAX_CONCURRENCY calls in flight per instance, so
+  one user's burst can't exhaust the shared Groq rate limit. Waiters are
+  served by lane, interactive chat before batch work (hashtag suggestions),
+  first come first served within a lane. A request that gets no slot within
+  AGENT_QUEUE_TIMEOUT_SECONDS fails with AgentBusyError. The queue timeout
+  covers both waits together: time spent waiting for tokens counts against
+  the wait for a slot.
+- Reported usage is added to the user's daily AgentUsage row.
+
+Limits are per instance; buckets of users idle long enough to be evicted
+simply start full again.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.agent_usage import AgentUsage
+
+logger = logging.getLogger(__name__)
+
+# Lanes, highest priority first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+# Users whose bucket state is kept
+MAX_TRACKED_USERS = 10000
+
+
+class AgentLimitError(Exception):
+    """A request refused by the scheduler; `code` for clients, `retry_after` in seconds."""
+
+    code = "limited"
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AgentBusyError(AgentLimitError):
+    """No call slot became free in time."""
+
+    code = "busy"
+
+
+class AgentRateLimitError(AgentLimitError):
+    """The user's token budget is spent for now."""
+
+    code = "rate_limited"
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`; may go negative to hold reservations."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available."""
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def give(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class Usage:
+    """Filled in by the caller with the token counts the API reported."""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reported = False
+
+    def record(self, prompt_tokens: int, completion_tokens: int) -> None:
+        self.prompt_tokens = prompt_tokens or 0
+        self.completion_tokens = completion_tokens or 0
+        self.reported = True
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens if self.reported else self.estimated_tokens
+
+
+def _record_usage(user_id: int, prompt_tokens: int, completion_tokens: int) -> None:
+    db = SessionLocal()
+    try:
+        day = datetime.now(timezone.utc).date()
+        values = {
+            AgentUsage.requests: AgentUsage.requests + 1,
+            AgentUsage.prompt_tokens: AgentUsage.prompt_tokens + prompt_tokens,
+            AgentUsage.completion_tokens: AgentUsage.completion_tokens + completion_tokens,
+        }
+        query = db.query(AgentUsage).filter(AgentUsage.user_id == user_id, AgentUsage.day == day)
+        if not query.update(values, synchronize_session=False):
+            db.add(AgentUsage(
+                user_id=user_id,
+                day=day,
+                requests=1,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            ))
+            try:
+                db.commit()
+                return
+            except IntegrityError:
+                # First call of the day raced with another one
+                db.rollback()
+                query.update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class LLMScheduler:
+    """Global concurrency cap with priority lanes, plus per-user token buckets."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_timeout: float,
+        user_tokens_per_minute: int,
+        user_token_burst: int,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_tokens_per_minute / 60.0
+        self.user_burst = user_token_burst
+        self._active = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self.admitted: Dict[str, int] = {lane: 0 for lane in LANES}
+        self.busy = 0
+        self.rate_limited = 0
+        self.tokens_used = 0
+
+    def _bucket(self, user_id: int) -> TokenBucket:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.user_burst, self.user_rate)
+            while len(self._buckets) > MAX_TRACKED_USERS:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(user_id)
+        return bucket
+
+    async def _reserve_tokens(self, user_id: int, amount: int) -> None:
+        """Take `amount` from the user's bucket, waiting for a refill if it's short."""
+        bucket = self._bucket(user_id)
+        wait = bucket.wait_time(amount)
+        if wait > self.queue_timeout:
+            self.rate_limited += 1
+            raise AgentRateLimitError(
+                "You've reached the AI usage limit for now. Please try again shortly.",
+                retry_after=math.ceil(wait),
+            )
+        # Reserved now (possibly into debt), so later requests queue behind this one
+        bucket.take(amount)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                bucket.give(amount)
+                raise
+
+    async def _acquire(self, lane: str, timeout: float) -> None:
+        if self._active < self.max_concurrency and not any(self._waiters.values()):
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted at the deadline
+                return
+            self.busy += 1
+            raise AgentBusyError("The AI service is busy right now. Please try again in a moment.")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller went away: pass the slot on
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters[lane]:
+                self._waiters[lane].remove(waiter)
+
+    def _release(self) -> None:
+        """Hand the slot to the next live waiter, by lane priority, or free it."""
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[int], lane: str, estimated_tokens: int):
+        """
+        Admit one Groq call for `user_id` (None: system work, no bucket) in `lane`.
+        Yields a Usage for the caller to record the reported token counts on.
+        """
+        estimated_tokens = min(estimated_tokens, self.user_burst)
+        # One queue timeout for the token wait and the slot wait together
+        deadline = time.monotonic() + self.queue_timeout
+        if user_id is not None:
+            await self._reserve_tokens(user_id, estimated_tokens)
+        try:
+            await self._acquire(lane, deadline - time.monotonic())
+        except BaseException:
+            if user_id is not None:
+                self._bucket(user_id).give(estimated_tokens)
+            raise
+
+        self.admitted[lane] += 1
+        usage = Usage(estimated_tokens)
+        try:
+            yield usage
+        finally:
+            self._release()
+            self.tokens_used += usage.total_tokens
+            if user_id is not None:
+                # Settle the reservation against what was actually used
+                self._bucket(user_id).take(usage.total_tokens - estimated_tokens)
+                if usage.reported:
+                    try:
+                        await run_in_threadpool(
+                            _record_usage, user_id, usage.prompt_tokens, usage.completion_tokens
+                        )
+                    except Exception as e:
+                        logger.warning(f"Recording agent usage of user {user_id} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.max_concurrency,
+            "active": self._active,
+            "queued": {lane: sum(1 for w in self._waiters[lane] if not w.done()) for lane in LANES},
+            "admitted": dict(self.admitted),
+            "busy": self.busy,
+            "rate_limited": self.rate_limited,
+            "tokens_used": self.tokens_used,
+            "tracked_users": len(self._buckets),
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.AGENT_MAX_CONCURRENCY,
+    queue_timeout=settings.AGENT_QUEUE_TIMEOUT_SECONDS,
+    user_tokens_per_minute=settings.AGENT_USER_TOKENS_PER_MINUTE,
+    user_token_burst=settings.AGENT_USER_TOKEN_BURST,
+)
@@ -0,0 +1,362 @@
+"""
+Image derivatives.
+
+Uploads are stored as sent; mobile clients showing a 64 px avatar or a feed
+thumbnail shouldn't download the multi-megabyte original. After an image is
+uploaded (or first referenced by a post or profile, for direct uploads) its
+URL is queued here. A few async workers read the original from storage,
+render resized, metadata-free WebP variants (MEDIA_VARIANT_SIZES) in a
+process pool, store them next to the original and record them on the
+MediaAsset row. Variants are copied onto the posts / users referencing the
+image (Post.media_variants, User.profile_picture_variants), so responses pick
+a size-appropriate URL without extra queries: list avatars use the "thumb"
+variant, post schemas expose "medium" previews. Until variants exist the
+original URL is used.
+
+Pending assets are re-queued at startup, so an instance restart doesn't lose
+work. Queued URLs are deduplicated; a URL queued again while it renders (a
+post saved meanwhile) runs once more afterwards, which only propagates the
+finished variants to the new rows.
+"""
+import asyncio
+import io
+import logging
+import mimetypes
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.images import render_variants
+from app.core.storage import get_backend
+from app.db.session import SessionLocal
+from app.models.media_asset import MediaAsset
+from app.models.message import Message
+from app.models.post import Post
+from app.models.post_media import PostMedia
+from app.models.user import User
+from app.services.profiles import invalidate_profiles
+
+logger = logging.getLogger(__name__)
+
+# Asset statuses
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+SKIPPED = "skipped"
+DELETING = "deleting"  # Unreferenced; objects being removed by the media collector
+
+# Variant shown for avatars in lists (chat, notifications, followers, likes, ...)
+AVATAR_VARIANT = "thumb"
+
+
+def variant_path(path: str, name: str) -> str:
+    """posts/<id>.jpg -> posts/<id>_thumb.webp"""
+    return f"{os.path.splitext(path)[0]}_{name}.webp"
+
+
+def avatar_url(user: Any) -> Optional[str]:
+    """Small avatar for list rows; the original picture until variants exist."""
+    variants = getattr(user, "profile_picture_variants", None) or {}
+    return variants.get(AVATAR_VARIANT) or user.profile_picture
+
+
+# ---- request path: copy known variants onto rows ----
+
+def _assets(db: Session, urls: Iterable[str]) -> Dict[str, MediaAsset]:
+    urls = list({url for url in urls if url})
+    if not urls:
+        return {}
+    return {asset.url: asset for asset in db.query(MediaAsset).filter(MediaAsset.url.in_(urls))}
+
+
+def _unprocessed(urls: Iterable[str], assets: Dict[str, MediaAsset]) -> List[str]:
+    """URLs that still need rendering (no asset yet, or pending)."""
+    return [
+        url for url in urls
+        if url and (url not in assets or assets[url].status == PENDING)
+    ]
+
+
+def _post_variants(post: Post, assets: Dict[str, MediaAsset]) -> Optional[List[Dict[str, str]]]:
+    if not post.media_urls:
+        return None
+    return [
+        (assets[url].variants or {}) if url in assets and assets[url].status == READY else {}
+        for url in post.media_urls
+    ]
+
+
+def attach_post_variants(db: Session, post: Post) -> List[str]:
+    """
+    Set post.media_variants from the known variants of its media and record
+    its media links (post_media). Call whenever post.media_urls is set. Returns
+    the URLs still without variants: pass them to `media_pipeline.enqueue` after commit.
+    """
+    urls = post.media_urls or []
+    post.media_links = [PostMedia(url=url) for url in urls if url]
+    assets = _assets(db, urls)
+    post.media_variants = _post_variants(post, assets)
+    return _unprocessed(urls, assets)
+
+
+def attach_profile_variants(db: Session, user: User) -> List[str]:
+    """Same as attach_post_variants, for the profile picture."""
+    if not user.profile_picture:
+        user.profile_picture_variants = None
+        return []
+    assets = _assets(db, [user.profile_picture])
+    asset = assets.get(user.profile_picture)
+    user.profile_picture_variants = asset.variants if asset and asset.status == READY else None
+    return _unprocessed([user.profile_picture], assets)
+
+
+# ---- references: the users and posts using a URL ----
+
+def _referencing_users(db: Session, url: str):
+    return db.query(User).filter(User.profile_picture == url)
+
+
+def _referencing_posts(db: Session, url: str) -> List[Post]:
+    return db.query(Post).filter(
+        Post.id.in_(db.query(PostMedia.post_id).filter(PostMedia.url == url))
+    ).all()
+
+
+def count_references(db: Session, url: str) -> int:
+    """How many times posts, drafts, profiles and chat messages use a URL (the true MediaAsset.ref_count)."""
+    count = _referencing_users(db, url).count()
+    count += db.query(func.count(PostMedia.id)).filter(PostMedia.url == url).scalar() or 0
+    count += db.query(func.count(Message.id)).filter(Message.media_url == url).scalar() or 0
+    return count
+
+
+# ---- pipeline steps (run in the threadpool, own sessions) ----
+
+def _get_or_create_asset(db: Session, url: str) -> MediaAsset:
+    asset = db.query(MediaAsset).filter(MediaAsset.url == url).first()
+    if asset is not None:
+        return asset
+    path = get_backend().path_for_url(url)
+    content_type = mimetypes.guess_type(path)[0] if path else None
+    # Direct uploads get their row when first used; count the rows already using it
+    ref_count = count_references(db, url)
+    asset = MediaAsset(
+        url=url,
+        path=path,
+        content_type=content_type,
+        # Only our own images get variants (not videos or external URLs)
+        status=PENDING if content_type and content_type.startswith("image/") else SKIPPED,
+        ref_count=ref_count,
+    )
+    db.add(asset)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created concurrently
+        db.rollback()
+        asset = db.query(MediaAsset).filter(MediaAsset.url == url).first()
+    return asset
+
+
+def _propagate(db: Session, asset: MediaAsset) -> Set[int]:
+    """Copy a ready asset's variants onto the users and posts using it; returns their owners."""
+    owners = set()
+    for user in _referencing_users(db, asset.url):
+        if user.profile_picture_variants != asset.variants:
+            user.profile_picture_variants = asset.variants
+            owners.add(user.id)
+    for post in _referencing_posts(db, asset.url):
+        variants = _post_variants(post, _assets(db, post.media_urls))
+        if post.media_variants != variants:
+            post.media_variants = variants
+            owners.add(post.user_id)
+    return owners
+
+
+def _prepare(url: str) -> Optional[str]:
+    """The object path to render, or None when there's nothing (more) to render."""
+    db = SessionLocal()
+    try:
+        asset = _get_or_create_asset(db, url)
+        if asset.status == READY:
+            owners = _propagate(db, asset)
+            db.commit()
+            if owners:
+                invalidate_profiles(*owners)
+            return None
+        return asset.path if asset.status == PENDING else None
+    finally:
+        db.close()
+
+
+def _record(url: str, width: int, height: int, variants: Dict[str, str]) -> None:
+    db = SessionLocal()
+    try:
+        asset = db.query(MediaAsset).filter(MediaAsset.url == url).first()
+        if asset is None:
+            return
+        asset.status = READY
+        asset.width = width
+        asset.height = height
+        asset.variants = variants
+        asset.error = None
+        owners = _propagate(db, asset)
+        db.commit()
+        if owners:
+            invalidate_profiles(*owners)
+    finally:
+        db.close()
+
+
+def _record_failure(url: str, error: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(MediaAsset).filter(MediaAsset.url == url).update({
+            MediaAsset.status: FAILED,
+            MediaAsset.error: error,
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _pending_urls(limit: int) -> List[str]:
+    db = SessionLocal()
+    try:
+        return [
+            url for (url,) in db.query(MediaAsset.url).filter(
+                MediaAsset.status == PENDING
+            ).order_by(MediaAsset.id).limit(limit)
+        ]
+    finally:
+        db.close()
+
+
+class MediaPipeline:
+    """Async workers rendering image variants in a process pool."""
+
+    def __init__(self, workers: int, concurrency: int):
+        self.workers = workers
+        self.concurrency = concurrency
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._active: Set[str] = set()
+        self._again: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.rendered = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the pool and workers (app startup, on the running loop)."""
+        if self._tasks or self.workers <= 0 or self.concurrency <= 0:
+            return
+        # spawn: the event-bus thread already exists
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._resume()))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = None
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def enqueue(self, urls: Iterable[str]) -> None:
+        """Queue images for rendering; callable from any thread. No-op until started."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        for url in urls:
+            if url:
+                loop.call_soon_threadsafe(self._put, url)
+
+    def _put(self, url: str) -> None:
+        if url in self._active:
+            # Re-run once it's done, to propagate to rows saved meanwhile
+            self._again.add(url)
+        elif url not in self._queued:
+            self._queued.add(url)
+            self._queue.put_nowait(url)
+
+    async def _resume(self) -> None:
+        """Re-queue assets left pending by a previous run."""
+        try:
+            self.enqueue(await run_in_threadpool(_pending_urls, 10000))
+        except Exception as e:
+            logger.error(f"Failed to resume pending media: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            url = await self._queue.get()
+            self._queued.discard(url)
+            self._active.add(url)
+            try:
+                await self.process(url)
+            except Exception as e:
+                logger.error(f"Media variants for {url} failed: {e}")
+            finally:
+                self._active.discard(url)
+                if url in self._again:
+                    self._again.discard(url)
+                    self._put(url)
+
+    async def process(self, url: str) -> None:
+        path = await run_in_threadpool(_prepare, url)
+        if path is None:
+            return
+        backend = get_backend()
+        try:
+            data = await run_in_threadpool(backend.read, path)
+            width, height, rendered = await asyncio.get_running_loop().run_in_executor(
+                self._pool,
+                render_variants,
+                data,
+                settings.MEDIA_VARIANT_SIZES,
+                settings.MEDIA_VARIANT_QUALITY,
+                settings.MEDIA_MAX_IMAGE_PIXELS,
+            )
+        except Exception as e:
+            # Unreadable or undecodable: keep serving the original
+            self.failed += 1
+            await run_in_threadpool(_record_failure, url, str(e) or type(e).__name__)
+            return
+        variants = {}
+        for name, content in rendered.items():
+            variants[name] = await run_in_threadpool(
+                backend.save, io.BytesIO(content), variant_path(path, name), "image/webp", len(content)
+            )
+        await run_in_threadpool(_record, url, width, height, variants)
+        self.rendered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers if self._pool is not None else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "busy": len(self._active),
+            "rendered": self.rendered,
+            "failed": self.failed,
+        }
+
+
+media_pipeline = MediaPipeline(
+    workers=settings.MEDIA_DERIVATIVE_WORKERS,
+    concurrency=settings.MEDIA_DERIVATIVE_CONCURRENCY,
+)
@@ -0,0 +1,282 @@
+"""
+Content-addressed uploads and garbage collection of unused media.
+
+Uploads through the API are hashed (SHA-256) from the spooled request file
+before anything is sent to storage. If a MediaAsset with that hash exists,
+its URL is returned and the transfer is skipped; otherwise the file is
+stored as <folder>/<sha256>.<ext> and recorded. Direct uploads can send the
+hash they are about to upload and get the existing URL back instead of an
+upload URL; their objects keep random names, as the server never sees the
+bytes to verify the hash.
+
+MediaAsset.ref_count tracks how often posts, drafts, profile pictures and
+chat messages use each URL: `track_references` adjusts it in the same
+transaction as the row change, and `orphaned_at` is set when it drops to
+zero. Fresh uploads start unreferenced without `orphaned_at`, so a file that
+was never attached (an upload whose use we don't track) is never collected.
+The MediaCollector periodically deletes the objects (original and variants)
+of assets released for MEDIA_GC_GRACE_SECONDS, after recounting the actual
+references, so a drifted counter can delay a deletion but never cause a
+wrong one.
+"""
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.storage import StorageService, file_digest, get_backend
+from app.db.session import SessionLocal
+from app.models.media_asset import MediaAsset
+from app.services.media import DELETING, PENDING, SKIPPED, count_references
+
+logger = logging.getLogger(__name__)
+
+
+# ---- reference counting (request path, caller's transaction) ----
+
+def track_references(db: Session, old_urls: Optional[Iterable[str]], new_urls: Optional[Iterable[str]]) -> None:
+    """
+    Adjust ref counts for a row whose media changed from `old_urls` to
+    `new_urls` (None for a created / deleted row). Committed with the row.
+    URLs without an asset yet are counted when the media pipeline creates it.
+    """
+    delta = Counter(url for url in new_urls or [] if url)
+    delta.subtract(url for url in old_urls or [] if url)
+    now = datetime.now(timezone.utc)
+    for url, change in delta.items():
+        if change == 0:
+            continue
+        count = MediaAsset.ref_count + change
+        # An asset being collected is left alone; its row is about to be deleted
+        db.query(MediaAsset).filter(
+            MediaAsset.url == url,
+            MediaAsset.status != DELETING,
+        ).update({
+            MediaAsset.ref_count: count,
+            MediaAsset.orphaned_at: case((count <= 0, now), else_=None),
+        }, synchronize_session=False)
+
+
+# ---- uploads ----
+
+def _find(digest: str, size: Optional[int] = None) -> Optional[str]:
+    """URL of a stored file with this content; restarts its grace period if released."""
+    db = SessionLocal()
+    try:
+        query = db.query(MediaAsset).filter(
+            MediaAsset.content_hash == digest,
+            MediaAsset.status != DELETING,
+        )
+        if size is not None:
+            query = query.filter(MediaAsset.size == size)
+        asset = query.first()
+        if asset is None:
+            return None
+        if asset.ref_count <= 0 and asset.orphaned_at is not None:
+            # About to be used again: keep the collector away meanwhile
+            asset.orphaned_at = datetime.now(timezone.utc)
+            db.commit()
+        return asset.url
+    finally:
+        db.close()
+
+
+def _name_taken(digest: str) -> bool:
+    """Whether the content-addressed name is still held by an asset being deleted."""
+    db = SessionLocal()
+    try:
+        return db.query(MediaAsset.id).filter(MediaAsset.content_hash == digest).first() is not None
+    finally:
+        db.close()
+
+
+def _record_upload(url: str, digest: str, size: int, content_type: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        db.add(MediaAsset(
+            url=url,
+            path=get_backend().path_for_url(url),
+            content_type=content_type,
+            content_hash=digest,
+            size=size,
+            status=PENDING if content_type and content_type.startswith("image/") else SKIPPED,
+            ref_count=0,
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # The same file, uploaded concurrently to the same name
+            db.rollback()
+    finally:
+        db.close()
+
+
+async def store_upload(file: UploadFile, folder: str = "uploads") -> Tuple[str, bool]:
+    """
+    Store an uploaded file under its content hash.
+    Returns (public URL, whether an identical file was already stored).
+    """
+    digest, size = await run_in_threadpool(file_digest, file.file)
+    url = await run_in_threadpool(_find, digest, size)
+    if url is not None:
+        return url, True
+
+    name = digest
+    if await run_in_threadpool(_name_taken, digest):
+        # The previous copy is being collected; don't reuse its object name
+        name = f"{digest}-{uuid.uuid4().hex[:8]}"
+    url = await StorageService.upload_file(file, folder=folder, name=name)
+    await run_in_threadpool(_record_upload, url, digest, size, file.content_type)
+    return url, False
+
+
+async def find_upload(digest: str, size: Optional[int] = None) -> Optional[str]:
+    """URL of an already stored file with this SHA-256 (direct uploads)."""
+    return await run_in_threadpool(_find, digest.lower(), size)
+
+
+# ---- garbage collection (run in the threadpool, own sessions) ----
+
+def _orphans(cutoff: datetime, limit: int) -> List[int]:
+    db = SessionLocal()
+    try:
+        return [
+            asset_id for (asset_id,) in db.query(MediaAsset.id).filter(
+                MediaAsset.ref_count <= 0,
+                MediaAsset.orphaned_at < cutoff,
+            ).order_by(MediaAsset.orphaned_at).limit(limit)
+        ]
+    finally:
+        db.close()
+
+
+def _claim(asset_id: int, cutoff: datetime) -> Optional[List[str]]:
+    """
+    Mark an orphaned asset as deleting after checking nothing uses it.
+    Returns the object paths to delete, or None when it's in use (count fixed) or gone.
+    """
+    db = SessionLocal()
+    try:
+        asset = db.query(MediaAsset).filter(MediaAsset.id == asset_id).first()
+        if asset is None:
+            return None
+        if asset.status != DELETING:
+            references = count_references(db, asset.url)
+            if references:
+                db.query(MediaAsset).filter(MediaAsset.id == asset_id).update({
+                    MediaAsset.ref_count: references,
+                    MediaAsset.orphaned_at: None,
+                }, synchronize_session=False)
+                db.commit()
+                return None
+            claimed = db.query(MediaAsset).filter(
+                MediaAsset.id == asset_id,
+                MediaAsset.ref_count <= 0,
+                MediaAsset.orphaned_at < cutoff,
+            ).update({MediaAsset.status: DELETING}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+
+        backend = get_backend()
+        paths = [asset.path] if asset.path else []
+        for url in (asset.variants or {}).values():
+            path = backend.path_for_url(url)
+            if path:
+                paths.append(path)
+        return paths
+    finally:
+        db.close()
+
+
+def _forget(asset_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(MediaAsset).filter(
+            MediaAsset.id == asset_id,
+            MediaAsset.status == DELETING,
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class MediaCollector:
+    """Periodic deletion of media no post, draft, profile or message uses anymore."""
+
+    def __init__(self, interval_seconds: float, grace_seconds: float, batch_size: int):
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.passes = 0
+        self.deleted = 0
+        self.kept = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Media collection pass failed: {e}")
+
+    async def run_once(self) -> int:
+        """Delete one batch of expired orphans; returns how many were deleted."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.grace_seconds)
+        deleted = 0
+        backend = get_backend()
+        for asset_id in await run_in_threadpool(_orphans, cutoff, self.batch_size):
+            paths = await run_in_threadpool(_claim, asset_id, cutoff)
+            if paths is None:
+                self.kept += 1
+                continue
+            try:
+                for path in paths:
+                    await run_in_threadpool(backend.delete, path)
+            except Exception as e:
+                # Stays "deleting"; retried next pass
+                self.failed += 1
+                logger.warning(f"Deleting media asset {asset_id} failed: {e}")
+                continue
+            await run_in_threadpool(_forget, asset_id)
+            deleted += 1
+        self.deleted += deleted
+        self.passes += 1
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "passes": self.passes,
+            "deleted": self.deleted,
+            "kept": self.kept,
+            "failed": self.failed,
+        }
+
+
+media_collector = MediaCollector(
+    interval_seconds=settings.MEDIA_GC_INTERVAL_SECONDS,
+    grace_seconds=settings.MEDIA_GC_GRACE_SECONDS,
+    batch_size=settings.MEDIA_GC_BATCH_SIZE,
+)
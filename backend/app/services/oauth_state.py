@@ -0,0 +1,250 @@
+"""
+Expiring, single-use store for OAuth authorization state.
+
+The authorize request saves who started the flow (and the PKCE verifier or
+OAuth 1.0a request secret) under the `state` value; the callback pops it.
+Entries expire after OAUTH_STATE_TTL_SECONDS and `pop` is atomic, so a state
+can be redeemed once, on any instance. Backends:
+
+- "database": the oauth_states table (default)
+- "redis": any Redis-compatible server at REDIS_URL (needs the `redis` package)
+- "memory": process-local dict, for tests and single-instance development
+"""
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.oauth_state import OAuthState
+
+logger = logging.getLogger(__name__)
+
+
+class OAuthStateStore(ABC):
+    """Interface: put / atomic pop with TTL, sweep of expired entries, metrics."""
+
+    backend = ""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._counter_lock = threading.Lock()
+        self.puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.swept = 0
+
+    def put(self, key: str, data: Dict[str, Any], aliases: Optional[List[str]] = None) -> None:
+        """Save `data` under `key` and any `aliases`; popping one of them consumes all."""
+        keys = [key] + list(aliases or [])
+        for k in keys:
+            self._put(k, {**data, "_keys": keys})
+        self._count("puts")
+
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return and delete the entry, or None if unknown, expired or already used."""
+        data = self._pop(key) if key else None
+        if data is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        for alias in data.pop("_keys", []):
+            if alias != key:
+                self._pop(alias)
+        return data
+
+    def sweep(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        removed = self._sweep()
+        self._count("swept", removed)
+        return removed
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            counters = {
+                "puts": self.puts,
+                "hits": self.hits,
+                "misses": self.misses,
+                "swept": self.swept,
+            }
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl_seconds,
+            **counters,
+            **self._size(),
+        }
+
+    # ---- backend hooks ----
+
+    @abstractmethod
+    def _put(self, key: str, data: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def _pop(self, key: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def _sweep(self) -> int:
+        pass
+
+    def _size(self) -> Dict[str, Any]:
+        """Size metrics, for backends that can report them cheaply."""
+        return {}
+
+
+class MemoryOAuthStateStore(OAuthStateStore):
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int):
+        super().__init__(ttl_seconds)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, tuple] = {}  # key -> (expires_at, json)
+
+    def _put(self, key: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, json.dumps(data))
+
+    def _pop(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return json.loads(entry[1])
+
+    def _sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+        return len(expired)
+
+    def _size(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(k) + len(v) for k, (_, v) in self._entries.items()),
+            }
+
+
+class DatabaseOAuthStateStore(OAuthStateStore):
+    backend = "database"
+
+    def _put(self, key: str, data: Dict[str, Any]) -> None:
+        db = SessionLocal()
+        try:
+            db.add(OAuthState(
+                key=key,
+                data=data,
+                expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def _pop(self, key: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            row = db.query(OAuthState).filter(OAuthState.key == key).first()
+            if not row:
+                return None
+            data, expires_at = row.data, row.expires_at
+            # Whoever deletes the row owns the state; a concurrent pop sees rowcount 0
+            deleted = db.query(OAuthState).filter(
+                OAuthState.key == key
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if not deleted:
+            return None
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return data
+
+    def _sweep(self) -> int:
+        db = SessionLocal()
+        try:
+            removed = db.query(OAuthState).filter(
+                OAuthState.expires_at <= datetime.now(timezone.utc)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def _size(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            count = db.query(func.count(OAuthState.key)).scalar() or 0
+        finally:
+            db.close()
+        return {"entries": count}
+
+
+class RedisOAuthStateStore(OAuthStateStore):
+    """
+    Entries are keys with a server-side TTL. A sorted set of the live keys,
+    scored by expiry, gives the entry count without scanning the keyspace;
+    `sweep` trims the index of keys the server has expired.
+    """
+
+    backend = "redis"
+    PREFIX = "oauth_state:"
+    INDEX = "oauth_state_index"
+
+    def __init__(self, ttl_seconds: int, url: str):
+        super().__init__(ttl_seconds)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("OAUTH_STATE_BACKEND=redis requires the 'redis' package")
+        self._redis = redis.Redis.from_url(url)
+
+    def _put(self, key: str, data: Dict[str, Any]) -> None:
+        pipe = self._redis.pipeline()
+        pipe.set(self.PREFIX + key, json.dumps(data), ex=self.ttl_seconds)
+        pipe.zadd(self.INDEX, {key: time.time() + self.ttl_seconds})
+        pipe.execute()
+
+    def _pop(self, key: str) -> Optional[Dict[str, Any]]:
+        # GETDEL is atomic; expiry is handled by the server
+        pipe = self._redis.pipeline()
+        pipe.getdel(self.PREFIX + key)
+        pipe.zrem(self.INDEX, key)
+        raw, _ = pipe.execute()
+        return json.loads(raw) if raw else None
+
+    def _sweep(self) -> int:
+        return self._redis.zremrangebyscore(self.INDEX, "-inf", time.time())
+
+    def _size(self) -> Dict[str, Any]:
+        return {"entries": self._redis.zcard(self.INDEX)}
+
+
+def create_store() -> OAuthStateStore:
+    backend = settings.OAUTH_STATE_BACKEND
+    ttl = settings.OAUTH_STATE_TTL_SECONDS
+    if backend == "memory":
+        return MemoryOAuthStateStore(ttl)
+    if backend == "redis":
+        return RedisOAuthStateStore(ttl, settings.REDIS_URL)
+    if backend != "database":
+        logger.warning(f"Unknown OAUTH_STATE_BACKEND {backend!r}, using database")
+    return DatabaseOAuthStateStore(ttl)
+
+
+oauth_states = create_store()
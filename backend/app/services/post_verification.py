@@ -0,0 +1,290 @@
+"""
+Background verification that published LinkedIn posts still exist.
+
+The LinkedIn tab of a profile used to call LinkedIn once per post on every
+page view. Instead, this reconciler walks users with a LinkedIn connection
+and re-checks their posts whose last verification (`verified_at` in
+Post.platforms["linkedin"]) is older than POST_VERIFY_AFTER_SECONDS. Posts
+deleted on LinkedIn get the "linkedin" entry removed, so the read path only
+filters on stored data.
+
+Checks for one user run concurrently (bounded, under a shared rate limit)
+with a deadline; checks that can't tell (errors, deadline) leave the post
+untouched for a later pass. Viewing a user's LinkedIn tab sets
+`verify_requested_at` on their connection, moving them to the front.
+
+Every instance runs the verifier, so connections are claimed with a
+conditional update of `verify_claimed_at` (as the token refresher does):
+each is verified by one instance per POST_VERIFY_AFTER_SECONDS, or once
+per request. POST_VERIFY_RATE_PER_SECOND applies per instance.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.encryption import decrypt_token
+from app.db.session import SessionLocal
+from app.models.post import Post
+from app.models.social_connection import SocialConnection
+from app.services.profiles import invalidate_profiles
+from app.services.social import LinkedInService
+
+logger = logging.getLogger(__name__)
+
+PLATFORM = "linkedin"
+
+# Most recent posts looked at per user and pass
+POSTS_PER_USER = 200
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _linkedin_urn(post: Post) -> Optional[str]:
+    meta = post.platforms.get(PLATFORM) if isinstance(post.platforms, dict) else None
+    if isinstance(meta, dict):
+        return meta.get("post_id")
+    return None
+
+
+def _is_stale(post: Post, cutoff: datetime) -> bool:
+    verified_at = post.platforms[PLATFORM].get("verified_at")
+    if not verified_at:
+        return True
+    try:
+        return datetime.fromisoformat(verified_at) < cutoff
+    except ValueError:
+        return True
+
+
+class RateLimiter:
+    """Spaces out calls to at most `rate` per second (shared by all concurrent checks)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# ---- DB steps (run in the threadpool) ----
+
+def _due(now: datetime):
+    """Connections to verify now (verify_* columns are naive UTC)."""
+    revisit_before = now - timedelta(seconds=settings.POST_VERIFY_AFTER_SECONDS)
+    return and_(
+        SocialConnection.platform == PLATFORM,
+        or_(
+            SocialConnection.verify_requested_at.isnot(None),
+            SocialConnection.verify_claimed_at.is_(None),
+            SocialConnection.verify_claimed_at < revisit_before,
+        ),
+    )
+
+
+def _claim_users(limit: int) -> List[Tuple]:
+    """
+    Claim up to `limit` due connections: requested ones first, then the least
+    recently verified. Returns (user id, encrypted token) rows.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        due = _due(now)
+        candidates = db.query(
+            SocialConnection.id, SocialConnection.user_id, SocialConnection.access_token
+        ).filter(due).order_by(
+            SocialConnection.verify_requested_at.is_(None),
+            SocialConnection.verify_claimed_at.isnot(None),
+            SocialConnection.verify_claimed_at,
+        ).limit(limit).all()
+
+        claimed = []
+        for row in candidates:
+            updated = db.query(SocialConnection).filter(
+                SocialConnection.id == row.id,
+                due,
+            ).update({
+                SocialConnection.verify_claimed_at: now,
+                SocialConnection.verify_requested_at: None,
+            }, synchronize_session=False)
+            if updated:
+                claimed.append((row.user_id, row.access_token))
+        db.commit()
+        return claimed
+    finally:
+        db.close()
+
+
+def _stale_posts(user_id: int, limit: int) -> List[Tuple[int, str]]:
+    """(post id, LinkedIn URN) of the user's posts due for verification, newest first."""
+    db = SessionLocal()
+    try:
+        cutoff = _utcnow() - timedelta(seconds=settings.POST_VERIFY_AFTER_SECONDS)
+        posts = db.query(Post).filter(
+            Post.user_id == user_id,
+            Post.is_draft == False,
+            cast(Post.platforms, String).like(f'%"{PLATFORM}"%'),
+        ).order_by(Post.created_at.desc()).limit(POSTS_PER_USER).all()
+        due = []
+        for post in posts:
+            urn = _linkedin_urn(post)
+            if urn and _is_stale(post, cutoff):
+                due.append((post.id, urn))
+                if len(due) >= limit:
+                    break
+        return due
+    finally:
+        db.close()
+
+
+def _apply(user_id: int, statuses: Dict[int, Optional[bool]]) -> int:
+    """Record verification results in one commit; returns how many posts were found deleted."""
+    db = SessionLocal()
+    try:
+        now = _utcnow().isoformat()
+        removed = 0
+        posts = db.query(Post).filter(Post.id.in_(list(statuses))).all()
+        for post in posts:
+            exists = statuses[post.id]
+            if exists is None or _linkedin_urn(post) is None:
+                continue
+            platforms = dict(post.platforms)
+            if exists:
+                platforms[PLATFORM] = {**platforms[PLATFORM], "verified_at": now}
+            else:
+                # Hide from the LinkedIn tab; the post itself stays
+                del platforms[PLATFORM]
+                removed += 1
+            post.platforms = platforms
+        db.commit()
+        if removed:
+            invalidate_profiles(user_id)
+        return removed
+    finally:
+        db.close()
+
+
+class PostVerifier:
+    """Periodic, rate-limited reconciliation of LinkedIn post existence."""
+
+    def __init__(self):
+        self.service = LinkedInService()
+        self.limiter = RateLimiter(settings.POST_VERIFY_RATE_PER_SECOND)
+        self._task: Optional[asyncio.Task] = None
+        self.passes = 0
+        self.checked = 0
+        self.removed = 0
+        self.unknown = 0
+
+    def start(self) -> None:
+        if self._task is None and settings.POST_VERIFY_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def request(self, db: Session, user_id: int) -> None:
+        """Verify this user's posts in the next pass of any instance (their LinkedIn tab was viewed). Commits."""
+        requested = db.query(SocialConnection).filter(
+            SocialConnection.user_id == user_id,
+            SocialConnection.platform == PLATFORM,
+            SocialConnection.verify_requested_at.is_(None),
+        ).update({SocialConnection.verify_requested_at: datetime.utcnow()}, synchronize_session=False)
+        if requested:
+            db.commit()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.POST_VERIFY_INTERVAL_SECONDS)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"LinkedIn post verification failed: {e}")
+
+    async def run_once(self) -> None:
+        """One pass over the connections this instance claims."""
+        claimed = await run_in_threadpool(_claim_users, settings.POST_VERIFY_USERS_PER_PASS)
+        seen = set()
+        for user_id, encrypted_token in claimed:
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            await self.verify_user(user_id, encrypted_token)
+        self.passes += 1
+
+    async def verify_user(self, user_id: int, encrypted_token: str) -> None:
+        due = await run_in_threadpool(_stale_posts, user_id, settings.POST_VERIFY_POSTS_PER_USER)
+        if not due:
+            return
+        try:
+            token = decrypt_token(encrypted_token)
+        except Exception as e:
+            logger.warning(f"Can't verify LinkedIn posts of user {user_id}: {e}")
+            return
+        statuses = await self.check_posts(token, due)
+        self.removed += await run_in_threadpool(_apply, user_id, statuses)
+
+    async def check_posts(
+        self,
+        token: str,
+        posts: List[Tuple[int, str]],
+    ) -> Dict[int, Optional[bool]]:
+        """
+        Check posts concurrently (bounded, rate limited) under POST_VERIFY_DEADLINE_SECONDS.
+        Returns post id -> exists, None where unknown.
+        """
+        semaphore = asyncio.Semaphore(settings.POST_VERIFY_CONCURRENCY)
+
+        async def check(urn: str) -> Optional[bool]:
+            async with semaphore:
+                await self.limiter.acquire()
+                return await self.service.get_post_status(token, urn)
+
+        tasks = {post_id: asyncio.ensure_future(check(urn)) for post_id, urn in posts}
+        done, pending = await asyncio.wait(
+            tasks.values(), timeout=settings.POST_VERIFY_DEADLINE_SECONDS
+        )
+        for task in pending:
+            task.cancel()
+
+        statuses: Dict[int, Optional[bool]] = {}
+        for post_id, task in tasks.items():
+            exists = None
+            if task in done and not task.cancelled() and task.exception() is None:
+                exists = task.result()
+            statuses[post_id] = exists
+            self.checked += 1
+            if exists is None:
+                self.unknown += 1
+        return statuses
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "passes": self.passes,
+            "checked": self.checked,
+            "removed": self.removed,
+            "unknown": self.unknown,
+        }
+
+
+post_verifier = PostVerifier()
@@ -0,0 +1,90 @@
+"""
+Authenticated-principal cache.
+
+Access tokens carry the user id plus a `ver` claim (users.token_version).
+The auth state needed to accept a token - token version, is_active,
+username - is cached per user in a bounded LRU with TTL, so endpoints that
+only need the caller's id authenticate without touching the database.
+Password changes, deactivation and account deletion bump / drop that state
+on every instance through app.core.events.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.user import User
+
+CHANGED_TOPIC = "auth.changed"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller, without loading the User row."""
+    id: int
+    username: Optional[str]
+    is_active: bool
+    token_version: int
+
+
+_principals = LRUCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+
+def principal_from_user(user: User) -> Principal:
+    return Principal(
+        id=user.id,
+        username=user.username,
+        is_active=bool(user.is_active),
+        token_version=user.token_version or 0,
+    )
+
+
+def remember(user: User) -> Principal:
+    """Cache the auth state of a user that was loaded anyway."""
+    principal = principal_from_user(user)
+    _principals.set(user.id, principal)
+    return principal
+
+
+def get_principal(db: Session, user_id: int) -> Optional[Principal]:
+    """Cached auth state for `user_id`; None if the user no longer exists."""
+    principal = _principals.get(user_id)
+    if principal is not None:
+        return principal
+
+    row = db.query(
+        User.id, User.username, User.is_active, User.token_version
+    ).filter(User.id == user_id).first()
+    if not row:
+        return None
+    principal = Principal(
+        id=row.id,
+        username=row.username,
+        is_active=bool(row.is_active),
+        token_version=row.token_version or 0,
+    )
+    _principals.set(user_id, principal)
+    return principal
+
+
+def _apply_changed(data: Dict) -> None:
+    _principals.delete(data["user_id"])
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drop a user's cached auth state everywhere (password, activation or account changed)."""
+    events.publish(CHANGED_TOPIC, {"user_id": user_id})
+
+
+def stats() -> Dict:
+    return _principals.stats()
+
+
+events.subscribe(CHANGED_TOPIC, _apply_changed)
+events.on_reconnect(_principals.clear)
@@ -0,0 +1,82 @@
+"""
+Public profile read model.
+
+Builds the PublicProfile shown on profile screens and caches full profile
+pages per (viewer, profile user) for a few seconds. Entries are dropped on
+every instance when the profile user's follows, posts or profile change.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.social import PublicProfile
+from app.services.social_graph import social_graph
+
+CHANGED_TOPIC = "profiles.changed"
+VIEW_CHANGED_TOPIC = "profiles.view_changed"
+
+# (viewer_id, user_id) -> {page_size: ProfilePage dict}, so one viewer's
+# pages of a profile are dropped with a single delete
+profile_cache = LRUCache(
+    maxsize=settings.PROFILE_CACHE_MAX_ENTRIES,
+    ttl=settings.PROFILE_CACHE_TTL_SECONDS,
+)
+
+
+def build_public_profile(db: Session, viewer_id: int, user: User) -> PublicProfile:
+    """PublicProfile for `user` as seen by `viewer_id`, flags served by the graph cache."""
+    is_following, is_followed_by = social_graph.relationship(db, viewer_id, user.id)
+    return PublicProfile(
+        id=user.id,
+        username=user.username,
+        full_name=user.full_name,
+        bio=user.bio,
+        profile_picture=user.profile_picture,
+        posts_count=user.posts_count or 0,
+        followers_count=user.followers_count or 0,
+        following_count=user.following_count or 0,
+        is_following=is_following,
+        is_followed_by=is_followed_by
+    )
+
+
+def get_cached_page(viewer_id: int, user_id: int, size: int) -> Optional[Dict[str, Any]]:
+    pages = profile_cache.get((viewer_id, user_id))
+    return pages.get(size) if pages is not None else None
+
+
+def set_cached_page(viewer_id: int, user_id: int, size: int, page: Dict[str, Any]) -> None:
+    pages = profile_cache.peek((viewer_id, user_id))
+    if pages is not None and size not in pages:
+        # Another page size of the same view: share the entry (and its expiry)
+        pages[size] = page
+    else:
+        profile_cache.set((viewer_id, user_id), {size: page})
+
+
+def _apply_changed(data: Dict) -> None:
+    user_ids = set(data.get("user_ids", []))
+    profile_cache.delete_where(lambda key: key[1] in user_ids)
+
+
+def _apply_view_changed(data: Dict) -> None:
+    profile_cache.delete((data["viewer_id"], data["user_id"]))
+
+
+def invalidate_profiles(*user_ids: int) -> None:
+    """Drop every viewer's cached page of these profiles (follows, posts or profile changed)."""
+    events.publish(CHANGED_TOPIC, {"user_ids": list(user_ids)})
+
+
+def invalidate_profile_view(viewer_id: int, user_id: int) -> None:
+    """Drop one viewer's cached page of a profile (their like / save state changed)."""
+    events.publish(VIEW_CHANGED_TOPIC, {"viewer_id": viewer_id, "user_id": user_id})
+
+
+events.subscribe(CHANGED_TOPIC, _apply_changed)
+events.subscribe(VIEW_CHANGED_TOPIC, _apply_view_changed)
+events.on_reconnect(profile_cache.clear)
@@ -0,0 +1,431 @@
+"""
+Background publish jobs.
+
+POST /publish/jobs stores the post plus a PublishJob row and returns at once;
+a pool of async workers (started in the app lifespan) claims due jobs and
+publishes them through app.services.publishing. Per platform:
+
+- success is recorded immediately and never re-published on a later attempt
+- transient failures (throttling, 5xx, connection errors) are retried with
+  exponential backoff up to PUBLISH_JOB_MAX_ATTEMPTS
+- anything else fails that platform for good
+
+Jobs are claimed with a conditional update plus a lease, so each attempt
+runs on one worker across all instances and a crashed worker's job is picked
+up again once its lease expires. Every claim writes a fresh lease token to
+locked_by, and an attempt's outcome is only recorded while its token still
+holds the job. A job that has used up PUBLISH_JOB_MAX_ATTEMPTS claims
+without finishing (its attempts kept crashing) fails when next due. Workers are woken through the event bus on
+enqueue and otherwise poll every PUBLISH_JOB_POLL_SECONDS for due retries.
+Finished jobs are announced on FINISHED_TOPIC (forwarded to the owner's
+presence WebSocket).
+"""
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import events
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.post import Post
+from app.models.publish_job import PublishJob
+from app.models.social_connection import SocialConnection
+from app.services import publishing
+from app.services.profiles import invalidate_profiles
+
+logger = logging.getLogger(__name__)
+
+ENQUEUED_TOPIC = "publish_jobs.enqueued"
+FINISHED_TOPIC = "publish_jobs.finished"
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+PARTIAL = "partial"
+FAILED = "failed"
+
+# Platform statuses (plus SUCCEEDED / FAILED)
+PENDING = "pending"
+RETRYING = "retrying"
+
+# Due jobs looked at per claim attempt
+CLAIM_BATCH = 10
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _backoff(attempt: int) -> float:
+    """Seconds to wait after failed attempt number `attempt`: exponential, capped, jittered."""
+    delay = settings.PUBLISH_JOB_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+    delay = min(delay, settings.PUBLISH_JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _post_platforms(job: PublishJob) -> Dict[str, Dict[str, Any]]:
+    """Successful platforms in the shape Post.platforms has always stored."""
+    platforms = {}
+    for platform, state in job.platforms.items():
+        if state["status"] != SUCCEEDED:
+            continue
+        if platform == publishing.INTERNAL_PLATFORM:
+            platforms[platform] = {
+                "success": True,
+                "post_id": job.post_id,
+                "message": "Published to Inspire feed"
+            }
+        else:
+            platforms[platform] = {
+                "success": True,
+                "post_id": state.get("post_id"),
+                "url": state.get("url"),
+            }
+    return platforms
+
+
+# ---- enqueueing (request path) ----
+
+def find_by_idempotency_key(db: Session, user_id: int, key: Optional[str]) -> Optional[PublishJob]:
+    if not key:
+        return None
+    return db.query(PublishJob).filter(
+        PublishJob.user_id == user_id,
+        PublishJob.idempotency_key == key,
+    ).first()
+
+
+def create_job(
+    db: Session,
+    post: Post,
+    platforms: List[str],
+    idempotency_key: Optional[str] = None,
+) -> PublishJob:
+    """
+    Add a job publishing `post` (already flushed) to `platforms`.
+    The caller commits, then calls `notify_enqueued`.
+    """
+    states = {
+        # The Post row itself is the Inspire publication
+        platform: {"status": SUCCEEDED if platform == publishing.INTERNAL_PLATFORM else PENDING, "attempts": 0}
+        for platform in platforms
+    }
+    done = all(state["status"] == SUCCEEDED for state in states.values())
+    now = _utcnow()
+    job = PublishJob(
+        user_id=post.user_id,
+        post_id=post.id,
+        idempotency_key=idempotency_key,
+        content=post.content or "",
+        media_urls=post.media_urls,
+        platforms=states,
+        status=SUCCEEDED if done else QUEUED,
+        attempts=0,
+        next_attempt_at=now,
+        completed_at=now if done else None,
+    )
+    db.add(job)
+    post.platforms = _post_platforms(job)
+    return job
+
+
+def notify_enqueued(job: PublishJob) -> None:
+    """Wake the workers on every instance."""
+    if job.status == QUEUED:
+        events.publish(ENQUEUED_TOPIC, {"job_id": job.id})
+
+
+# ---- worker steps (run in the threadpool, own sessions) ----
+
+def _due(now: datetime):
+    return or_(
+        and_(PublishJob.status == QUEUED, PublishJob.next_attempt_at <= now),
+        # Lease expired: the worker running it died
+        and_(PublishJob.status == RUNNING, PublishJob.locked_until < now),
+    )
+
+
+def _finish(job: PublishJob, states: Dict[str, Dict[str, Any]], now: datetime) -> None:
+    """Set the final status from the platform outcomes."""
+    succeeded = sum(1 for state in states.values() if state["status"] == SUCCEEDED)
+    if succeeded == len(states):
+        job.status = SUCCEEDED
+    elif succeeded:
+        job.status = PARTIAL
+    else:
+        job.status = FAILED
+    job.completed_at = now
+
+
+def _finished_payload(job: PublishJob) -> Dict[str, Any]:
+    return {
+        "user_id": job.user_id,
+        "job_id": job.id,
+        "post_id": job.post_id,
+        "status": job.status,
+        "platforms": job.platforms,
+    }
+
+
+def _fail_exhausted(db: Session, job_id: int, now: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Give up on a due job whose attempts are used up: the platforms still pending fail.
+    Returns the finished-event payload, or None if another worker took the job first.
+    """
+    taken = db.query(PublishJob).filter(
+        PublishJob.id == job_id,
+        _due(now),
+    ).update({
+        PublishJob.status: FAILED,
+        PublishJob.locked_by: None,
+        PublishJob.locked_until: None,
+    }, synchronize_session=False)
+    if not taken:
+        db.rollback()
+        return None
+    job = db.query(PublishJob).filter(PublishJob.id == job_id).first()
+    states = {platform: dict(state) for platform, state in job.platforms.items()}
+    for state in states.values():
+        if state["status"] in (PENDING, RETRYING):
+            state.update(status=FAILED, error=state.get("error") or "Publishing failed repeatedly")
+    job.platforms = states
+    _finish(job, states, now)
+    db.commit()
+    logger.warning(f"Publish job {job_id} gave up after {job.attempts} attempts: {job.status}")
+    return _finished_payload(job)
+
+
+def _claim_next() -> Optional[Tuple[int, str]]:
+    """
+    Claim the most overdue job; the conditional update makes the claim exclusive.
+    Returns the job id and the lease token the attempt's outcome is recorded with.
+    """
+    db = SessionLocal()
+    try:
+        now = _utcnow()
+        candidates = db.query(PublishJob.id, PublishJob.attempts).filter(_due(now)).order_by(
+            PublishJob.next_attempt_at
+        ).limit(CLAIM_BATCH).all()
+        for job_id, attempts in candidates:
+            if attempts >= settings.PUBLISH_JOB_MAX_ATTEMPTS:
+                finished = _fail_exhausted(db, job_id, now)
+                if finished:
+                    _announce(finished)
+                continue
+            lease = f"{events.NODE_ID[:16]}-{uuid.uuid4().hex}"
+            claimed = db.query(PublishJob).filter(
+                PublishJob.id == job_id,
+                _due(now),
+            ).update({
+                PublishJob.status: RUNNING,
+                PublishJob.locked_by: lease,
+                PublishJob.locked_until: now + timedelta(seconds=settings.PUBLISH_JOB_LEASE_SECONDS),
+                PublishJob.attempts: PublishJob.attempts + 1,
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return job_id, lease
+        return None
+    finally:
+        db.close()
+
+
+def _prepare_attempt(job_id: int) -> Optional[Dict[str, Any]]:
+    """Everything the platform calls need, read up front so no session is held while they run."""
+    db = SessionLocal()
+    try:
+        job = db.query(PublishJob).filter(PublishJob.id == job_id).first()
+        if not job:
+            return None
+        platforms = [
+            platform for platform, state in job.platforms.items()
+            if state["status"] in (PENDING, RETRYING)
+        ]
+        connections = db.query(SocialConnection).filter(
+            SocialConnection.user_id == job.user_id,
+            SocialConnection.platform.in_(platforms),
+        ).all()
+        targets, errors = publishing.resolve_targets(platforms, connections)
+        return {
+            "content": job.content,
+            "media_urls": job.media_urls,
+            "targets": targets,
+            "errors": errors,
+        }
+    finally:
+        db.close()
+
+
+def _record_attempt(
+    job_id: int,
+    lease: str,
+    errors: Dict[str, Dict[str, Any]],
+    published: Dict[str, Dict[str, Any]],
+) -> Optional[Dict[str, Any]]:
+    """
+    Apply an attempt's outcomes, schedule the retry or finish the job, and
+    merge successful platforms into the post, all in one commit.
+    Nothing is written if the lease was lost (another claim runs the job now).
+    Returns the finished-event payload when the job is done.
+    """
+    db = SessionLocal()
+    try:
+        # Still ours? The update also locks the row, so the lease can't be taken until the commit
+        held = db.query(PublishJob).filter(
+            PublishJob.id == job_id,
+            PublishJob.status == RUNNING,
+            PublishJob.locked_by == lease,
+        ).update({PublishJob.locked_until: None}, synchronize_session=False)
+        if not held:
+            db.rollback()
+            logger.warning(f"Publish job {job_id} lease lost, attempt outcome not recorded")
+            return None
+        job = db.query(PublishJob).filter(PublishJob.id == job_id).first()
+        now = _utcnow()
+        states = {platform: dict(state) for platform, state in job.platforms.items()}
+
+        for platform, result in errors.items():
+            states[platform].update(status=FAILED, error=result["error"])
+
+        for platform, result in published.items():
+            state = states[platform]
+            state["attempts"] = state.get("attempts", 0) + 1
+            state["latency_ms"] = result["latency_ms"]
+            if result["success"]:
+                state.update(status=SUCCEEDED, post_id=result.get("post_id"), url=result.get("url"))
+                state.pop("error", None)
+            elif result.get("retryable") and state["attempts"] < settings.PUBLISH_JOB_MAX_ATTEMPTS:
+                state.update(status=RETRYING, error=result["error"])
+            else:
+                state.update(status=FAILED, error=result["error"])
+
+        job.platforms = states
+        job.locked_by = None
+        job.locked_until = None
+        retrying = any(state["status"] in (PENDING, RETRYING) for state in states.values())
+        if retrying:
+            job.status = QUEUED
+            job.next_attempt_at = now + timedelta(seconds=_backoff(job.attempts))
+        else:
+            _finish(job, states, now)
+
+        post = db.query(Post).filter(Post.id == job.post_id).first() if job.post_id else None
+        if post is not None:
+            post.platforms = _post_platforms(job)
+        db.commit()
+
+        if post is not None and any(r["success"] for r in published.values()):
+            invalidate_profiles(job.user_id)
+        if retrying:
+            logger.info(f"Publish job {job.id} attempt {job.attempts} incomplete, retrying at {job.next_attempt_at}")
+            return None
+        logger.info(f"Publish job {job.id} finished: {job.status}")
+        return _finished_payload(job)
+    finally:
+        db.close()
+
+
+def _announce(payload: Dict[str, Any]) -> None:
+    events.publish(FINISHED_TOPIC, payload)
+
+
+class PublishJobWorker:
+    """Pool of async workers draining the publish_jobs table."""
+
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.busy = 0
+        self.attempts = 0
+        self.finished: Dict[str, int] = {SUCCEEDED: 0, PARTIAL: 0, FAILED: 0}
+        self.errors = 0
+
+    def start(self) -> None:
+        """Start the workers (app startup, on the running loop)."""
+        if self._tasks or self.workers <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = None
+
+    def wake(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """Event-bus handler; may run on any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before claiming, so a wake-up during the claim isn't lost
+            self._wake.clear()
+            try:
+                claim = await run_in_threadpool(_claim_next)
+            except Exception as e:
+                logger.error(f"Claiming publish job failed: {e}")
+                claim = None
+            if claim is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(*claim)
+
+    async def _process(self, job_id: int, lease: str) -> None:
+        self.busy += 1
+        self.attempts += 1
+        try:
+            attempt = await run_in_threadpool(_prepare_attempt, job_id)
+            if attempt is None:
+                return
+            published = await publishing.publish_to_platforms(
+                attempt["targets"], attempt["content"], attempt["media_urls"]
+            )
+            finished = await run_in_threadpool(
+                _record_attempt, job_id, lease, attempt["errors"], published
+            )
+            if finished:
+                self.finished[finished["status"]] += 1
+                await run_in_threadpool(_announce, finished)
+        except Exception as e:
+            # The lease expires and the job is retried
+            self.errors += 1
+            logger.error(f"Publish job {job_id} attempt failed: {e}")
+        finally:
+            self.busy -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "busy": self.busy,
+            "attempts": self.attempts,
+            "finished": dict(self.finished),
+            "errors": self.errors,
+        }
+
+
+publish_worker = PublishJobWorker(
+    workers=settings.PUBLISH_JOB_WORKERS,
+    poll_seconds=settings.PUBLISH_JOB_POLL_SECONDS,
+)
+
+events.subscribe(ENQUEUED_TOPIC, publish_worker.wake)
+events.on_reconnect(publish_worker.wake)
@@ -0,0 +1,175 @@
+"""
+Publishing to external social platforms.
+
+Platforms are published concurrently, each under its own timeout, so a post
+to Instagram + Facebook + LinkedIn + Twitter takes as long as the slowest
+platform rather than the sum of all four. A failure or timeout on one
+platform never affects the others; every result carries its latency.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.encryption import decrypt_token
+from app.models.social_connection import SocialConnection
+from app.services.social import (
+    PlatformUnavailable,
+    InstagramService,
+    TwitterService,
+    LinkedInService,
+    FacebookService,
+)
+
+logger = logging.getLogger(__name__)
+
+# Service instances by platform (also used by the OAuth endpoints and the token refresher)
+SERVICES = {
+    "instagram": InstagramService(),
+    "twitter": TwitterService(),
+    "linkedin": LinkedInService(),
+    "facebook": FacebookService(),
+}
+
+# Internal feed; the Post row itself is the publication
+INTERNAL_PLATFORM = "inspire"
+
+# Failures where the platform certainly didn't publish, so a retry can't duplicate the post
+TRANSIENT_ERRORS = (
+    PlatformUnavailable,
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+
+
+@dataclass(frozen=True)
+class PlatformTarget:
+    """What a platform publish needs, detached from the DB session."""
+    platform: str
+    access_token: str
+
+
+def resolve_targets(
+    platforms: List[str],
+    connections: List[SocialConnection],
+) -> tuple:
+    """
+    Split requested platforms into publishable targets and immediate errors
+    (unknown platform, not connected, expired or undecryptable token).
+    Returns (targets, errors) where errors maps platform -> result dict.
+    """
+    connections_by_platform = {c.platform: c for c in connections}
+    targets: List[PlatformTarget] = []
+    errors: Dict[str, Dict[str, Any]] = {}
+
+    for platform in platforms:
+        if platform == INTERNAL_PLATFORM:
+            continue
+
+        if platform not in SERVICES:
+            errors[platform] = {
+                "success": False,
+                "error": f"Unknown platform: {platform}"
+            }
+            continue
+
+        connection = connections_by_platform.get(platform)
+        if not connection:
+            errors[platform] = {
+                "success": False,
+                "error": f"Not connected to {platform}. Please connect your {platform} account first."
+            }
+            continue
+
+        # Check token expiry
+        if connection.token_expires_at and datetime.utcnow() >= connection.token_expires_at:
+            errors[platform] = {
+                "success": False,
+                "error": "Token expired. Please reconnect your account."
+            }
+            continue
+
+        try:
+            access_token = decrypt_token(connection.access_token)
+        except Exception as e:
+            errors[platform] = {"success": False, "error": str(e)}
+            continue
+        targets.append(PlatformTarget(platform=platform, access_token=access_token))
+
+    return targets, errors
+
+
+async def publish_to_platform(
+    target: PlatformTarget,
+    content: str,
+    media_urls: Optional[List[str]],
+    timeout: float,
+) -> Dict[str, Any]:
+    """
+    Publish to one platform; never raises, the outcome is in the result dict.
+    Failed results carry `retryable` (see TRANSIENT_ERRORS).
+    """
+    started = time.monotonic()
+    try:
+        result = await asyncio.wait_for(
+            SERVICES[target.platform].publish_post(
+                access_token=target.access_token,
+                content=content,
+                media_urls=media_urls,
+            ),
+            timeout=timeout,
+        )
+        outcome = {
+            "success": True,
+            "post_id": result.get("post_id"),
+            "url": result.get("url"),
+        }
+    except asyncio.TimeoutError:
+        # The post may or may not have gone out; not retried
+        outcome = {
+            "success": False,
+            "error": f"Timed out after {timeout:g}s publishing to {target.platform}",
+            "retryable": False,
+        }
+    except Exception as e:
+        outcome = {
+            "success": False,
+            "error": str(e),
+            "retryable": isinstance(e, TRANSIENT_ERRORS),
+        }
+    outcome["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+    logger.info(
+        f"Published to {target.platform}: success={outcome['success']} "
+        f"in {outcome['latency_ms']}ms"
+    )
+    return outcome
+
+
+async def publish_to_platforms(
+    targets: List[PlatformTarget],
+    content: str,
+    media_urls: Optional[List[str]],
+    timeout: Optional[float] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Publish to all targets concurrently; returns platform -> result."""
+    timeout = timeout or settings.PUBLISH_PLATFORM_TIMEOUT_SECONDS
+    outcomes = await asyncio.gather(*(
+        publish_to_platform(target, content, media_urls, timeout)
+        for target in targets
+    ))
+    return {target.platform: outcome for target, outcome in zip(targets, outcomes)}
+
+
+def server_timing(results: Dict[str, Dict[str, Any]]) -> str:
+    """Server-Timing header value with each platform's publish latency."""
+    return ", ".join(
+        f"{platform};dur={result['latency_ms']}"
+        for platform, result in results.items()
+        if "latency_ms" in result
+    )
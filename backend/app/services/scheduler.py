@@ -0,0 +1,237 @@
+"""
+Scheduled publishing of drafts.
+
+A draft with `scheduled_at` is published at that time: it becomes a feed
+post (like POST /posts/drafts/{id}/publish) and its external platforms are
+handed to the background publish-job queue.
+
+Rather than polling, the scheduler sleeps until the earliest scheduled draft
+(one indexed MIN query on idx_post_scheduled), capped at
+SCHEDULER_MAX_SLEEP_SECONDS, and is woken through the event bus whenever a
+draft is scheduled or rescheduled on any instance. Due drafts are fetched in
+batches from the same index. Every instance runs a scheduler; a draft is
+claimed with a conditional update (is_draft still true) in the same
+transaction that creates its publish job, so it is published exactly once.
+A draft whose publish fails is skipped until `schedule_retry_at` (exponential
+backoff), so it can't hold up the drafts behind it, and is unscheduled after
+SCHEDULER_MAX_ATTEMPTS failures.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import events
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.post import Post
+from app.models.user import User
+from app.services import publish_jobs, publishing
+from app.services.hashtags import index_post_hashtags, trending_hashtags
+from app.services.profiles import invalidate_profiles
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED_TOPIC = "posts.scheduled"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def normalize_schedule(value: Optional[datetime]) -> Optional[datetime]:
+    """Schedule time as aware UTC (naive values are taken as UTC)."""
+    return _aware(value).astimezone(timezone.utc) if value else None
+
+
+def notify_scheduled(post: Post) -> None:
+    """Let every instance's scheduler re-check its next wake-up."""
+    if post.scheduled_at:
+        events.publish(SCHEDULED_TOPIC, {"post_id": post.id})
+
+
+def _retry_delay(attempts: int) -> float:
+    delay = settings.SCHEDULER_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return min(delay, settings.SCHEDULER_RETRY_MAX_SECONDS)
+
+
+def _record_failure(db: Session, post_id: int, now: datetime) -> None:
+    """Back off a draft whose publish failed, or unschedule it after the last attempt. Commits."""
+    post = db.query(Post).filter(Post.id == post_id, Post.is_draft == True).first()
+    if post is None:
+        return
+    post.schedule_attempts = (post.schedule_attempts or 0) + 1
+    if post.schedule_attempts >= settings.SCHEDULER_MAX_ATTEMPTS:
+        logger.error(f"Giving up on scheduled post {post_id} after {post.schedule_attempts} attempts")
+        post.scheduled_at = None
+        post.schedule_retry_at = None
+    else:
+        post.schedule_retry_at = now + timedelta(seconds=_retry_delay(post.schedule_attempts))
+    db.commit()
+
+
+def _publish_scheduled(db: Session, post_id: int, now: datetime) -> Optional[Tuple[Post, List[str], Any]]:
+    """Claim and publish one due draft. Commits; returns None if another instance got it."""
+    claimed = db.query(Post).filter(
+        Post.id == post_id,
+        Post.is_draft == True,
+        Post.scheduled_at <= now,
+    ).update({
+        Post.is_draft: False,
+        Post.published_at: now,
+    }, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        return None
+
+    post = db.query(Post).filter(Post.id == post_id).first()
+    tags = index_post_hashtags(db, post)
+    db.query(User).filter(User.id == post.user_id).update({
+        User.posts_count: func.coalesce(User.posts_count, 0) + 1,
+    }, synchronize_session=False)
+
+    requested = post.platforms if isinstance(post.platforms, list) else []
+    external = [p for p in requested if p != publishing.INTERNAL_PLATFORM]
+    job = None
+    if external:
+        job = publish_jobs.create_job(db, post, [publishing.INTERNAL_PLATFORM] + external)
+    db.commit()
+    return post, tags, job
+
+
+def publish_due(batch_size: int) -> Tuple[int, bool, Optional[datetime]]:
+    """
+    Publish up to `batch_size` due drafts.
+    Returns (published here, whether more may be due, next scheduled time or None).
+    """
+    db = SessionLocal()
+    try:
+        now = _utcnow()
+        due = db.query(Post.id).filter(
+            Post.is_draft == True,
+            Post.scheduled_at <= now,
+            or_(Post.schedule_retry_at.is_(None), Post.schedule_retry_at <= now),
+        ).order_by(Post.scheduled_at).limit(batch_size).all()
+
+        count = 0
+        stuck = 0
+        for (post_id,) in due:
+            try:
+                published = _publish_scheduled(db, post_id, now)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Scheduled publish of post {post_id} failed: {e}")
+                try:
+                    _record_failure(db, post_id, now)
+                except Exception as e:
+                    db.rollback()
+                    stuck += 1
+                    logger.error(f"Recording the failure of scheduled post {post_id} failed: {e}")
+                continue
+            if published is None:
+                continue
+            post, tags, job = published
+            trending_hashtags.record(tags)
+            invalidate_profiles(post.user_id)
+            if job is not None:
+                publish_jobs.notify_enqueued(job)
+            count += 1
+            logger.info(f"Published scheduled post {post_id}")
+
+        next_due = db.query(func.min(Post.scheduled_at)).filter(
+            Post.is_draft == True,
+            Post.scheduled_at > now,
+        ).scalar()
+        next_retry = db.query(func.min(Post.schedule_retry_at)).filter(
+            Post.is_draft == True,
+            Post.schedule_retry_at > now,
+        ).scalar()
+        upcoming = [_aware(value) for value in (next_due, next_retry) if value]
+        # A full batch means more may be due; unless every row is stuck (failures are
+        # backed off, drafts taken by another instance are no longer due), run again at once
+        more = len(due) == batch_size and stuck < len(due)
+        return count, more, min(upcoming) if upcoming else None
+    finally:
+        db.close()
+
+
+class DraftScheduler:
+    """Sleeps until the next scheduled draft is due, then publishes the due batch."""
+
+    def __init__(self, max_sleep_seconds: float, batch_size: int):
+        self.max_sleep_seconds = max_sleep_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.next_due: Optional[datetime] = None
+        self.runs = 0
+        self.published = 0
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._loop = None
+
+    def wake(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """Event-bus handler; may run on any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                published, more, self.next_due = await run_in_threadpool(
+                    publish_due, self.batch_size
+                )
+                self.runs += 1
+                self.published += published
+            except Exception as e:
+                logger.error(f"Scheduler run failed: {e}")
+                more, self.next_due = False, None
+            if more:
+                continue
+
+            delay = self.max_sleep_seconds
+            if self.next_due is not None:
+                delay = min(delay, max((self.next_due - _utcnow()).total_seconds(), 0))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "next_due": self.next_due.isoformat() if self.next_due else None,
+            "runs": self.runs,
+            "published": self.published,
+        }
+
+
+draft_scheduler = DraftScheduler(
+    max_sleep_seconds=settings.SCHEDULER_MAX_SLEEP_SECONDS,
+    batch_size=settings.SCHEDULER_BATCH_SIZE,
+)
+
+events.subscribe(SCHEDULED_TOPIC, draft_scheduler.wake)
+events.on_reconnect(draft_scheduler.wake)
@@ -0,0 +1,252 @@
+"""
+Login sessions: short-lived access tokens plus rotating refresh tokens.
+
+Each login starts a refresh-token family (the session id, `sid` in the access
+token). Refreshing exchanges the refresh token for a new one in the same
+family; presenting an already-exchanged token means it leaked, so the whole
+family is revoked. Refresh tokens are stored only as SHA-256 hashes.
+
+Verifying an access token stays pure CPU: revoked session ids are kept in a
+Bloom filter, synced across instances through app.core.events, and only a
+filter hit (a revoked session or a rare false positive) is confirmed against
+the database. Filters rotate every access-token lifetime, since a revoked
+session's access tokens are expired by then anyway.
+
+Clients that don't refresh yet log in with a client_id listed in
+LEGACY_ACCESS_TOKEN_CLIENTS and get LEGACY_ACCESS_TOKEN_EXPIRE_MINUTES tokens,
+marked with a `legacy` claim. The filter only covers the short lifetime, so
+those tokens are checked against the database on every request.
+"""
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import events, security
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+REVOKED_TOPIC = "sessions.revoked"
+
+SWEEP_INTERVAL_SECONDS = 3600
+
+
+class InvalidRefreshToken(Exception):
+    """Unknown, expired, revoked or reused refresh token."""
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class RevocationFilter:
+    """Revoked session ids from the last one to two access-token lifetimes."""
+
+    def __init__(self, lifetime_seconds: float, num_bits: int, num_hashes: int):
+        self.lifetime_seconds = lifetime_seconds
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._lock = threading.Lock()
+        self._current = BloomFilter(num_bits, num_hashes)
+        self._previous = BloomFilter(num_bits, num_hashes)
+        self._rotated_at = time.monotonic()
+        self.confirmed = 0
+        self.false_positives = 0
+
+    def _rotate_if_due(self) -> None:
+        if time.monotonic() - self._rotated_at >= self.lifetime_seconds:
+            with self._lock:
+                if time.monotonic() - self._rotated_at >= self.lifetime_seconds:
+                    self._previous = self._current
+                    self._current = BloomFilter(self.num_bits, self.num_hashes)
+                    self._rotated_at = time.monotonic()
+
+    def add(self, sid: str) -> None:
+        self._rotate_if_due()
+        self._current.add(sid)
+
+    def might_contain(self, sid: str) -> bool:
+        self._rotate_if_due()
+        return sid in self._current or sid in self._previous
+
+    def stats(self) -> Dict:
+        return {
+            "current_entries": self._current.count,
+            "previous_entries": self._previous.count,
+            "bits": self.num_bits,
+            "confirmed": self.confirmed,
+            "false_positives": self.false_positives,
+        }
+
+
+revocation_filter = RevocationFilter(
+    lifetime_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    num_bits=settings.REVOCATION_FILTER_BITS,
+    num_hashes=settings.REVOCATION_FILTER_HASHES,
+)
+
+
+def _apply_revoked(data: Dict) -> None:
+    for sid in data.get("sids", []):
+        revocation_filter.add(sid)
+
+
+# ---- issuing ----
+
+def issue_tokens(db: Session, user: User, family_id: Optional[str] = None, legacy: bool = False) -> Dict:
+    """
+    Access + refresh token pair; starts a new session unless `family_id` is given.
+    `legacy` issues a long-lived access token for clients that don't refresh. Commits.
+    """
+    family_id = family_id or secrets.token_hex(16)
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user.id,
+        token_hash=_hash_token(refresh_token),
+        family_id=family_id,
+        expires_at=_utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+
+    minutes = settings.LEGACY_ACCESS_TOKEN_EXPIRE_MINUTES if legacy else settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    claims = {
+        "ver": user.token_version or 0,
+        "username": user.username,
+        "active": user.is_active,
+        "sid": family_id,
+    }
+    if legacy:
+        claims["legacy"] = True
+    access_token = security.create_access_token(
+        user.id,
+        expires_delta=timedelta(minutes=minutes),
+        claims=claims,
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": minutes * 60,
+    }
+
+
+def rotate(db: Session, refresh_token: str) -> Dict:
+    """Exchange a refresh token for a new pair in the same session."""
+    row = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_token(refresh_token)
+    ).first()
+    if not row or row.revoked_at or _aware(row.expires_at) <= _utcnow():
+        raise InvalidRefreshToken()
+
+    # Conditional update so two concurrent refreshes can't both win
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == row.id,
+        RefreshToken.rotated_at.is_(None),
+    ).update({RefreshToken.rotated_at: _utcnow()}, synchronize_session=False)
+    if not claimed:
+        logger.warning(f"Refresh token reuse for user {row.user_id}, revoking session")
+        db.rollback()
+        revoke_sessions(db, [row.family_id])
+        raise InvalidRefreshToken()
+
+    user = db.query(User).filter(User.id == row.user_id).first()
+    if not user or not user.is_active:
+        db.rollback()
+        raise InvalidRefreshToken()
+    return issue_tokens(db, user, family_id=row.family_id)
+
+
+# ---- revocation ----
+
+def revoke_sessions(db: Session, family_ids: List[str]) -> None:
+    """Revoke sessions: their refresh tokens stop working and access tokens are rejected. Commits."""
+    if not family_ids:
+        return
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id.in_(family_ids),
+        RefreshToken.revoked_at.is_(None),
+    ).update({RefreshToken.revoked_at: _utcnow()}, synchronize_session=False)
+    db.commit()
+    events.publish(REVOKED_TOPIC, {"sids": list(family_ids)})
+
+
+def revoke_session(db: Session, refresh_token: str) -> None:
+    """Log out the session a refresh token belongs to; unknown tokens are ignored."""
+    row = db.query(RefreshToken.family_id).filter(
+        RefreshToken.token_hash == _hash_token(refresh_token)
+    ).first()
+    if row:
+        revoke_sessions(db, [row.family_id])
+
+
+def revoke_user_sessions(db: Session, user_id: int) -> None:
+    """Revoke every live session of a user (password change / reset)."""
+    rows = db.query(RefreshToken.family_id).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > _utcnow(),
+    ).distinct().all()
+    revoke_sessions(db, [family_id for (family_id,) in rows])
+
+
+def is_session_revoked(db: Session, sid: str, legacy: bool = False) -> bool:
+    """
+    O(1) filter check; the database is only consulted on a filter hit, or
+    always for legacy tokens, which outlive the filter's window.
+    """
+    if legacy:
+        return db.query(RefreshToken.id).filter(
+            RefreshToken.family_id == sid,
+            RefreshToken.revoked_at.isnot(None),
+        ).first() is not None
+    if not revocation_filter.might_contain(sid):
+        return False
+    revoked = db.query(RefreshToken.id).filter(
+        RefreshToken.family_id == sid,
+        RefreshToken.revoked_at.isnot(None),
+    ).first() is not None
+    if revoked:
+        revocation_filter.confirmed += 1
+    else:
+        revocation_filter.false_positives += 1
+    return revoked
+
+
+def load_revocations(db: Session) -> None:
+    """Seed the filter with sessions revoked recently enough to have live access tokens."""
+    since = _utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    rows = db.query(RefreshToken.family_id).filter(
+        RefreshToken.revoked_at >= since
+    ).distinct().all()
+    for (family_id,) in rows:
+        revocation_filter.add(family_id)
+    logger.info(f"Revocation filter seeded with {len(rows)} sessions")
+
+
+def sweep_expired(db: Session) -> int:
+    """Delete refresh tokens past their expiry."""
+    deleted = db.query(RefreshToken).filter(
+        RefreshToken.expires_at < _utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+events.subscribe(REVOKED_TOPIC, _apply_revoked)
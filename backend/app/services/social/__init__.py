@@ -1,7 +1,7 @@
 """
 Social platform services for OAuth and content publishing.
 """
-from .base import BaseSocialService
+from .base import BaseSocialService, PlatformOutcomeUnknown, PlatformUnavailable
 from .instagram import InstagramService
 from .twitter import TwitterService
 from .linkedin import LinkedInService
@@ -9,6 +9,8 @@ from .facebook import FacebookService
 
 __all__ = [
     "BaseSocialService",
+    "PlatformOutcomeUnknown",
+    "PlatformUnavailable",
     "InstagramService",
     "TwitterService",
     "LinkedInService",
@@ -6,9 +6,60 @@ from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+import httpx
+
+from .http import RETRY_STATUSES, social_http
+
+
+class PlatformUnavailable(Exception):
+    """Transient platform failure (throttled, gateway error); the call can be retried later."""
+
+
+class PlatformOutcomeUnknown(Exception):
+    """A call that creates the post failed in a way that doesn't tell whether it went out; not retried."""
+
 
 class BaseSocialService(ABC):
     """Abstract base class for social platform integrations"""
+
+    # Token refresh: False where the platform can't refresh (the user must reconnect);
+    # Meta platforms "refresh" by exchanging the current access token
+    supports_refresh = True
+    refresh_with_access_token = False
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        # Injected client (e.g. backed by httpx.MockTransport in tests); otherwise
+        # the platform's shared pooled client from the registry
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or social_http.get(self.platform_name)
+
+    def _raise_if_transient(self, response: httpx.Response, committing: bool = False) -> None:
+        """
+        Raise PlatformUnavailable for throttling / 5xx responses (Graph API flags these is_transient).
+        `committing` marks the call that creates the post: a gateway or transient error there may
+        come after the post went out, so only a 429 stays retryable and the rest raise
+        PlatformOutcomeUnknown.
+        """
+        status = response.status_code
+        if status in RETRY_STATUSES or (committing and status >= 500):
+            message = f"{self.platform_name} temporarily unavailable (HTTP {status})"
+        elif status >= 400 and "json" in response.headers.get("content-type", ""):
+            try:
+                error = response.json().get("error")
+            except ValueError:
+                return
+            if not (isinstance(error, dict) and error.get("is_transient")):
+                return
+            message = f"{self.platform_name}: {error.get('message', 'temporary error')}"
+        else:
+            return
+
+        if committing and status != 429:
+            raise PlatformOutcomeUnknown(f"{message}; the post may have been published")
+        raise PlatformUnavailable(message)
     
     @property
     @abstractmethod
@@ -0,0 +1,141 @@
+"""
+Shared HTTP clients for the social platform services.
+
+One pooled httpx.AsyncClient per platform, created at app startup and
+closed at shutdown, so publishing and token calls reuse keep-alive (and
+HTTP/2 where the platform supports it) connections instead of paying TCP
+and TLS setup on every call. All clients share the same timeouts and retry
+policy:
+
+- connection failures are retried for any method (nothing was sent yet)
+- idempotent requests (GET / HEAD) are also retried on 429 and 502-504,
+  with exponential backoff that honours Retry-After
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-platform pool sizes and protocol; platforms not listed use DEFAULT_LIMITS
+PLATFORM_LIMITS = {
+    "instagram": {"max_connections": 20, "http2": True},
+    "facebook": {"max_connections": 20, "http2": True},
+    "linkedin": {"max_connections": 20, "http2": True},
+    "twitter": {"max_connections": 10, "http2": True},
+}
+DEFAULT_LIMITS = {"max_connections": 10, "http2": False}
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+MAX_BACKOFF_SECONDS = 10.0
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """Retries idempotent requests on throttling / gateway errors with exponential backoff."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, retries: int, backoff: float):
+        self._transport = transport
+        self.retries = retries
+        self.backoff = backoff
+        self.retried = 0
+
+    def _delay(self, response: httpx.Response, attempt: int) -> float:
+        retry_after = response.headers.get("retry-after")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        return min(self.backoff * (2 ** attempt), MAX_BACKOFF_SECONDS)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = await self._transport.handle_async_request(request)
+            if (
+                request.method not in IDEMPOTENT_METHODS
+                or response.status_code not in RETRY_STATUSES
+                or attempt >= self.retries
+            ):
+                return response
+            delay = self._delay(response, attempt)
+            await response.aclose()
+            logger.info(
+                f"Retrying {request.method} {request.url.host} after {response.status_code} "
+                f"in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            self.retried += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def build_client(
+    platform: str,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """
+    Client with the shared timeouts and retry policy.
+    Pass `transport` (e.g. httpx.MockTransport) to stub the network in tests.
+    """
+    limits = PLATFORM_LIMITS.get(platform, DEFAULT_LIMITS)
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            http2=limits["http2"],
+            retries=settings.SOCIAL_HTTP_RETRIES,  # connection failures only
+            limits=httpx.Limits(
+                max_connections=limits["max_connections"],
+                max_keepalive_connections=limits["max_connections"],
+                keepalive_expiry=settings.SOCIAL_HTTP_KEEPALIVE_SECONDS,
+            ),
+        )
+    return httpx.AsyncClient(
+        transport=RetryTransport(
+            transport,
+            retries=settings.SOCIAL_HTTP_RETRIES,
+            backoff=settings.SOCIAL_HTTP_BACKOFF_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            settings.SOCIAL_HTTP_READ_TIMEOUT,
+            connect=settings.SOCIAL_HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+class SocialHttpClients:
+    """Registry of per-platform clients, opened at startup and closed at shutdown."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def start(self) -> None:
+        for platform in PLATFORM_LIMITS:
+            self.get(platform)
+
+    def get(self, platform: str) -> httpx.AsyncClient:
+        """The platform's shared client (created on first use outside the app lifespan)."""
+        client = self._clients.get(platform)
+        if client is None or client.is_closed:
+            client = self._clients[platform] = build_client(platform)
+        return client
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            platform: {
+                "open": not client.is_closed,
+                "retried": getattr(client._transport, "retried", 0),
+            }
+            for platform, client in self._clients.items()
+        }
+
+
+social_http = SocialHttpClients()
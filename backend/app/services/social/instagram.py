@@ -2,13 +2,33 @@
 Instagram Graph API integration for OAuth and content publishing.
 Works with Business and Creator accounts only via Meta's Graph API.
 """
+import asyncio
+import hashlib
 import httpx
 from typing import Optional, Dict, Any, List
 from urllib.parse import urlencode
 from datetime import datetime, timedelta
 
+from app.core.cache import LRUCache
 from app.core.config import settings
-from .base import BaseSocialService
+from .base import BaseSocialService, PlatformUnavailable
+
+VIDEO_EXTENSIONS = (".mp4", ".mov")
+
+# Container status polling: 1s, 2s, 4s, 8s, 8s, ...
+CONTAINER_POLL_INITIAL_SECONDS = 1.0
+CONTAINER_POLL_MAX_SECONDS = 8.0
+
+# Token -> Instagram account; the page / account link rarely changes
+_accounts = LRUCache(
+    maxsize=settings.INSTAGRAM_ACCOUNT_CACHE_MAX_ENTRIES,
+    ttl=settings.INSTAGRAM_ACCOUNT_CACHE_TTL_SECONDS,
+)
+
+
+def _token_key(access_token: str) -> str:
+    # Keep token hashes, not tokens, in memory
+    return hashlib.sha256(access_token.encode()).hexdigest()
 
 
 class InstagramService(BaseSocialService):
@@ -25,6 +45,8 @@ class InstagramService(BaseSocialService):
         "pages_read_engagement",
     ]
 
+    refresh_with_access_token = True
+
     @property
     def platform_name(self) -> str:
         return "instagram"
@@ -46,57 +68,70 @@ class InstagramService(BaseSocialService):
         state: str
     ) -> Dict[str, Any]:
         """Exchange code for access token and get Instagram account info"""
-        async with httpx.AsyncClient() as client:
-            # Step 1: Exchange code for short-lived token
-            token_response = await client.get(
-                f"{self.GRAPH_API_BASE}/oauth/access_token",
-                params={
-                    "client_id": settings.META_APP_ID,
-                    "client_secret": settings.META_APP_SECRET,
-                    "redirect_uri": settings.META_REDIRECT_URI,
-                    "code": code,
-                }
-            )
-            token_data = token_response.json()
-            
-            if "error" in token_data:
-                raise Exception(f"Token exchange failed: {token_data['error']['message']}")
-            
-            short_lived_token = token_data["access_token"]
-            
-            # Step 2: Exchange for long-lived token
-            long_token_response = await client.get(
-                f"{self.GRAPH_API_BASE}/oauth/access_token",
-                params={
-                    "grant_type": "fb_exchange_token",
-                    "client_id": settings.META_APP_ID,
-                    "client_secret": settings.META_APP_SECRET,
-                    "fb_exchange_token": short_lived_token,
-                }
-            )
-            long_token_data = long_token_response.json()
-            access_token = long_token_data.get("access_token", short_lived_token)
-            expires_in = long_token_data.get("expires_in", 5184000)  # Default 60 days
-            
-            # Step 3: Get user's Instagram Business Account
-            ig_account = await self._get_instagram_account(client, access_token)
-            
-            return {
-                "access_token": access_token,
-                "refresh_token": None,  # Meta doesn't provide refresh tokens
-                "expires_at": datetime.utcnow() + timedelta(seconds=expires_in),
-                "user_id": ig_account["id"],
-                "username": ig_account.get("username", ""),
-                "display_name": ig_account.get("name", ""),
-                "profile_picture": ig_account.get("profile_picture_url", ""),
+        client = self.client
+        # Step 1: Exchange code for short-lived token
+        token_response = await client.get(
+            f"{self.GRAPH_API_BASE}/oauth/access_token",
+            params={
+                "client_id": settings.META_APP_ID,
+                "client_secret": settings.META_APP_SECRET,
+                "redirect_uri": settings.META_REDIRECT_URI,
+                "code": code,
+            }
+        )
+        token_data = token_response.json()
+        
+        if "error" in token_data:
+            raise Exception(f"Token exchange failed: {token_data['error']['message']}")
+        
+        short_lived_token = token_data["access_token"]
+        
+        # Step 2: Exchange for long-lived token
+        long_token_response = await client.get(
+            f"{self.GRAPH_API_BASE}/oauth/access_token",
+            params={
+                "grant_type": "fb_exchange_token",
+                "client_id": settings.META_APP_ID,
+                "client_secret": settings.META_APP_SECRET,
+                "fb_exchange_token": short_lived_token,
             }
+        )
+        long_token_data = long_token_response.json()
+        access_token = long_token_data.get("access_token", short_lived_token)
+        expires_in = long_token_data.get("expires_in", 5184000)  # Default 60 days
+        
+        # Step 3: Get user's Instagram Business Account
+        ig_account = await self._get_instagram_account(client, access_token)
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": None,  # Meta doesn't provide refresh tokens
+            "expires_at": datetime.utcnow() + timedelta(seconds=expires_in),
+            "user_id": ig_account["id"],
+            "username": ig_account.get("username", ""),
+            "display_name": ig_account.get("name", ""),
+            "profile_picture": ig_account.get("profile_picture_url", ""),
+        }
 
     async def _get_instagram_account(
         self, 
         client: httpx.AsyncClient, 
         access_token: str
     ) -> Dict[str, Any]:
-        """Get the user's Instagram Business/Creator account"""
+        """Get the user's Instagram Business/Creator account (cached per token)"""
+        key = _token_key(access_token)
+        account = _accounts.get(key)
+        if account is None:
+            account = await self._fetch_instagram_account(client, access_token)
+            _accounts.set(key, account)
+        return account
+
+    async def _fetch_instagram_account(
+        self, 
+        client: httpx.AsyncClient, 
+        access_token: str
+    ) -> Dict[str, Any]:
+        """Look up the Instagram account linked to the token's first Facebook Page"""
         # Get user's pages
         pages_response = await client.get(
             f"{self.GRAPH_API_BASE}/me/accounts",
@@ -129,36 +164,36 @@ class InstagramService(BaseSocialService):
         """Meta tokens can be refreshed by exchanging the current token"""
         # Meta doesn't use refresh tokens - you exchange the current access token
         # This should be called before the token expires
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.GRAPH_API_BASE}/oauth/access_token",
-                params={
-                    "grant_type": "fb_exchange_token",
-                    "client_id": settings.META_APP_ID,
-                    "client_secret": settings.META_APP_SECRET,
-                    "fb_exchange_token": refresh_token,  # Current access token
-                }
-            )
-            data = response.json()
-            
-            if "error" in data:
-                raise Exception(f"Token refresh failed: {data['error']['message']}")
-            
-            return {
-                "access_token": data["access_token"],
-                "expires_at": datetime.utcnow() + timedelta(seconds=data.get("expires_in", 5184000)),
+        client = self.client
+        response = await client.get(
+            f"{self.GRAPH_API_BASE}/oauth/access_token",
+            params={
+                "grant_type": "fb_exchange_token",
+                "client_id": settings.META_APP_ID,
+                "client_secret": settings.META_APP_SECRET,
+                "fb_exchange_token": refresh_token,  # Current access token
             }
+        )
+        data = response.json()
+        
+        if "error" in data:
+            raise Exception(f"Token refresh failed: {data['error']['message']}")
+        
+        return {
+            "access_token": data["access_token"],
+            "expires_at": datetime.utcnow() + timedelta(seconds=data.get("expires_in", 5184000)),
+        }
 
     async def get_user_info(self, access_token: str) -> Dict[str, Any]:
         """Get Instagram account info"""
-        async with httpx.AsyncClient() as client:
-            ig_account = await self._get_instagram_account(client, access_token)
-            return {
-                "user_id": ig_account["id"],
-                "username": ig_account.get("username", ""),
-                "display_name": ig_account.get("name", ""),
-                "profile_picture": ig_account.get("profile_picture_url", ""),
-            }
+        client = self.client
+        ig_account = await self._get_instagram_account(client, access_token)
+        return {
+            "user_id": ig_account["id"],
+            "username": ig_account.get("username", ""),
+            "display_name": ig_account.get("name", ""),
+            "profile_picture": ig_account.get("profile_picture_url", ""),
+        }
 
     async def publish_post(
         self,
@@ -174,48 +209,98 @@ class InstagramService(BaseSocialService):
         if not media_urls:
             raise Exception("Instagram requires at least one image to post.")
         
-        async with httpx.AsyncClient() as client:
-            # Get Instagram account ID
-            ig_account = await self._get_instagram_account(client, access_token)
-            ig_user_id = ig_account["id"]
-            
-            if len(media_urls) == 1:
-                # Single image post
-                return await self._publish_single_media(
-                    client, ig_user_id, access_token, media_urls[0], content
-                )
-            else:
-                # Carousel post
-                return await self._publish_carousel(
-                    client, ig_user_id, access_token, media_urls, content
-                )
+        client = self.client
+        # Get Instagram account ID
+        ig_account = await self._get_instagram_account(client, access_token)
+        ig_user_id = ig_account["id"]
+        
+        if len(media_urls) == 1:
+            # Single image post
+            return await self._publish_single_media(
+                client, ig_user_id, access_token, media_urls[0], content
+            )
+        else:
+            # Carousel post
+            return await self._publish_carousel(
+                client, ig_user_id, access_token, media_urls, content
+            )
 
-    async def _publish_single_media(
+    def _media_params(self, media_url: str, is_carousel_item: bool = False) -> Dict[str, str]:
+        """Container parameters for an image or a video URL."""
+        if media_url.lower().split("?")[0].endswith(VIDEO_EXTENSIONS):
+            # Single videos are published as Reels; carousel videos as VIDEO items
+            return {
+                "media_type": "VIDEO" if is_carousel_item else "REELS",
+                "video_url": media_url,
+            }
+        return {"image_url": media_url}
+
+    async def _create_container(
         self,
         client: httpx.AsyncClient,
         ig_user_id: str,
         access_token: str,
-        image_url: str,
-        caption: str
-    ) -> Dict[str, Any]:
-        """Publish a single image post"""
-        # Step 1: Create media container
+        params: Dict[str, str],
+        error_prefix: str,
+    ) -> str:
+        """Create a media container and return its id"""
         container_response = await client.post(
             f"{self.GRAPH_API_BASE}/{ig_user_id}/media",
-            params={
-                "image_url": image_url,
-                "caption": caption,
-                "access_token": access_token,
-            }
+            params={**params, "access_token": access_token},
         )
+        self._raise_if_transient(container_response)
         container_data = container_response.json()
         
         if "error" in container_data:
-            raise Exception(f"Failed to create media container: {container_data['error']['message']}")
+            raise Exception(f"{error_prefix}: {container_data['error']['message']}")
         
-        creation_id = container_data["id"]
+        return container_data["id"]
+
+    async def _wait_until_ready(
+        self,
+        client: httpx.AsyncClient,
+        container_id: str,
+        access_token: str,
+    ) -> None:
+        """
+        Poll a container's status_code until FINISHED, backing off exponentially.
+        Videos take a while to process; publishing an unfinished container fails.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.INSTAGRAM_CONTAINER_READY_TIMEOUT_SECONDS
+        delay = CONTAINER_POLL_INITIAL_SECONDS
+        while True:
+            response = await client.get(
+                f"{self.GRAPH_API_BASE}/{container_id}",
+                params={"fields": "status_code,status", "access_token": access_token},
+            )
+            self._raise_if_transient(response)
+            data = response.json()
+            if "error" in data:
+                raise Exception(f"Failed to check media status: {data['error']['message']}")
+            
+            status_code = data.get("status_code")
+            if status_code in (None, "FINISHED", "PUBLISHED"):
+                return
+            if status_code in ("ERROR", "EXPIRED"):
+                raise Exception(f"Media processing failed: {data.get('status') or status_code}")
+            
+            # IN_PROGRESS; nothing has been published yet, so running out of time is retryable
+            if loop.time() + delay > deadline:
+                raise PlatformUnavailable(f"Instagram media {container_id} still processing")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CONTAINER_POLL_MAX_SECONDS)
+
+    async def _publish_container(
+        self,
+        client: httpx.AsyncClient,
+        ig_user_id: str,
+        access_token: str,
+        creation_id: str,
+    ) -> Dict[str, Any]:
+        """Wait for a container to be ready, then publish it"""
+        await self._wait_until_ready(client, creation_id, access_token)
         
-        # Step 2: Publish the container
         publish_response = await client.post(
             f"{self.GRAPH_API_BASE}/{ig_user_id}/media_publish",
             params={
@@ -223,6 +308,7 @@ class InstagramService(BaseSocialService):
                 "access_token": access_token,
             }
         )
+        self._raise_if_transient(publish_response, committing=True)
         publish_data = publish_response.json()
         
         if "error" in publish_data:
@@ -233,6 +319,22 @@ class InstagramService(BaseSocialService):
             "url": f"https://www.instagram.com/p/{publish_data['id']}/",
         }
 
+    async def _publish_single_media(
+        self,
+        client: httpx.AsyncClient,
+        ig_user_id: str,
+        access_token: str,
+        image_url: str,
+        caption: str
+    ) -> Dict[str, Any]:
+        """Publish a single image (or Reel) post"""
+        creation_id = await self._create_container(
+            client, ig_user_id, access_token,
+            {**self._media_params(image_url), "caption": caption},
+            "Failed to create media container",
+        )
+        return await self._publish_container(client, ig_user_id, access_token, creation_id)
+
     async def _publish_carousel(
         self,
         client: httpx.AsyncClient,
@@ -241,58 +343,41 @@ class InstagramService(BaseSocialService):
         image_urls: List[str],
         caption: str
     ) -> Dict[str, Any]:
-        """Publish a carousel post with multiple images"""
-        # Create containers for each image
-        container_ids = []
-        for image_url in image_urls[:10]:  # Max 10 items in carousel
-            container_response = await client.post(
-                f"{self.GRAPH_API_BASE}/{ig_user_id}/media",
-                params={
-                    "image_url": image_url,
-                    "is_carousel_item": "true",
-                    "access_token": access_token,
-                }
-            )
-            container_data = container_response.json()
-            if "error" in container_data:
-                raise Exception(f"Failed to create carousel item: {container_data['error']['message']}")
-            container_ids.append(container_data["id"])
+        """Publish a carousel post with multiple images / videos"""
+        semaphore = asyncio.Semaphore(settings.INSTAGRAM_CONTAINER_CONCURRENCY)
+
+        async def create_item(media_url: str) -> str:
+            async with semaphore:
+                container_id = await self._create_container(
+                    client, ig_user_id, access_token,
+                    {**self._media_params(media_url, is_carousel_item=True), "is_carousel_item": "true"},
+                    "Failed to create carousel item",
+                )
+                await self._wait_until_ready(client, container_id, access_token)
+                return container_id
+
+        # Create (and wait for) the item containers concurrently; gather keeps their order
+        container_ids = await asyncio.gather(
+            *(create_item(url) for url in image_urls[:10])  # Max 10 items in carousel
+        )
         
-        # Create carousel container
-        carousel_response = await client.post(
-            f"{self.GRAPH_API_BASE}/{ig_user_id}/media",
-            params={
+        carousel_id = await self._create_container(
+            client, ig_user_id, access_token,
+            {
                 "media_type": "CAROUSEL",
                 "children": ",".join(container_ids),
                 "caption": caption,
-                "access_token": access_token,
-            }
-        )
-        carousel_data = carousel_response.json()
-        
-        if "error" in carousel_data:
-            raise Exception(f"Failed to create carousel: {carousel_data['error']['message']}")
-        
-        # Publish
-        publish_response = await client.post(
-            f"{self.GRAPH_API_BASE}/{ig_user_id}/media_publish",
-            params={
-                "creation_id": carousel_data["id"],
-                "access_token": access_token,
-            }
+            },
+            "Failed to create carousel",
         )
-        publish_data = publish_response.json()
-        
-        return {
-            "post_id": publish_data["id"],
-            "url": f"https://www.instagram.com/p/{publish_data['id']}/",
-        }
+        return await self._publish_container(client, ig_user_id, access_token, carousel_id)
 
     async def revoke_access(self, access_token: str) -> bool:
         """Revoke access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{self.GRAPH_API_BASE}/me/permissions",
-                params={"access_token": access_token}
-            )
-            return response.status_code == 200
+        _accounts.delete(_token_key(access_token))
+        client = self.client
+        response = await client.delete(
+            f"{self.GRAPH_API_BASE}/me/permissions",
+            params={"access_token": access_token}
+        )
+        return response.status_code == 200
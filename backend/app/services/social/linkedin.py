@@ -26,6 +26,8 @@ class LinkedInService(BaseSocialService):
         "w_member_social",
     ]
 
+    supports_refresh = False
+
     @property
     def platform_name(self) -> str:
         return "linkedin"
@@ -47,39 +49,39 @@ class LinkedInService(BaseSocialService):
         state: str
     ) -> Dict[str, Any]:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.OAUTH_BASE}/accessToken",
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "redirect_uri": settings.LINKEDIN_REDIRECT_URI,
-                    "client_id": settings.LINKEDIN_CLIENT_ID,
-                    "client_secret": settings.LINKEDIN_CLIENT_SECRET,
-                }
-            )
-            
-            data = response.json()
-            
-            if "error" in data:
-                raise Exception(f"Token exchange failed: {data.get('error_description', data['error'])}")
-            
-            access_token = data["access_token"]
-            expires_in = data.get("expires_in", 5184000)  # Default 60 days
-            
-            # Get user info
-            user_info = await self._get_user_info(client, access_token)
-            
-            return {
-                "access_token": access_token,
-                "refresh_token": data.get("refresh_token"),  # Usually not provided
-                "expires_at": datetime.utcnow() + timedelta(seconds=expires_in),
-                "user_id": user_info["sub"],
-                "username": user_info.get("name", user_info.get("email", "")),  # Prefer name over email
-                "display_name": user_info.get("name", ""),
-                "profile_picture": user_info.get("picture", ""),
+        client = self.client
+        response = await client.post(
+            f"{self.OAUTH_BASE}/accessToken",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": settings.LINKEDIN_REDIRECT_URI,
+                "client_id": settings.LINKEDIN_CLIENT_ID,
+                "client_secret": settings.LINKEDIN_CLIENT_SECRET,
             }
+        )
+        
+        data = response.json()
+        
+        if "error" in data:
+            raise Exception(f"Token exchange failed: {data.get('error_description', data['error'])}")
+        
+        access_token = data["access_token"]
+        expires_in = data.get("expires_in", 5184000)  # Default 60 days
+        
+        # Get user info
+        user_info = await self._get_user_info(client, access_token)
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": data.get("refresh_token"),  # Usually not provided
+            "expires_at": datetime.utcnow() + timedelta(seconds=expires_in),
+            "user_id": user_info["sub"],
+            "username": user_info.get("name", user_info.get("email", "")),  # Prefer name over email
+            "display_name": user_info.get("name", ""),
+            "profile_picture": user_info.get("picture", ""),
+        }
 
     async def _get_user_info(
         self, 
@@ -107,14 +109,14 @@ class LinkedInService(BaseSocialService):
 
     async def get_user_info(self, access_token: str) -> Dict[str, Any]:
         """Get user info"""
-        async with httpx.AsyncClient() as client:
-            user = await self._get_user_info(client, access_token)
-            return {
-                "user_id": user["sub"],
-                "username": user.get("email", ""),
-                "display_name": user.get("name", ""),
-                "profile_picture": user.get("picture", ""),
-            }
+        client = self.client
+        user = await self._get_user_info(client, access_token)
+        return {
+            "user_id": user["sub"],
+            "username": user.get("email", ""),
+            "display_name": user.get("name", ""),
+            "profile_picture": user.get("picture", ""),
+        }
 
     async def publish_post(
         self,
@@ -126,80 +128,81 @@ class LinkedInService(BaseSocialService):
         """Publish a post to LinkedIn using the REST API with image support"""
         import logging
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # Get user's URN
-            user_info = await self._get_user_info(client, access_token)
-            author_urn = f"urn:li:person:{user_info['sub']}"
-            
-            logging.info(f"Publishing to LinkedIn for author: {author_urn}")
-            logging.info(f"Using LinkedIn API version: {self.API_VERSION}")
-            
-            # Upload images if provided
-            image_urns = []
-            if media_urls and len(media_urls) > 0:
-                for media_url in media_urls[:1]:  # LinkedIn allows 1 image per post for basic API
-                    try:
-                        image_urn = await self._upload_image(client, access_token, author_urn, media_url)
-                        if image_urn:
-                            image_urns.append(image_urn)
-                            logging.info(f"Uploaded image: {image_urn}")
-                    except Exception as e:
-                        logging.error(f"Failed to upload image {media_url}: {e}")
-            
-            # Build post payload for REST API
-            payload = {
-                "author": author_urn,
-                "commentary": content,
-                "visibility": "PUBLIC",
-                "distribution": {
-                    "feedDistribution": "MAIN_FEED",
-                    "targetEntities": [],
-                    "thirdPartyDistributionChannels": []
-                },
-                "lifecycleState": "PUBLISHED",
-                "isReshareDisabledByAuthor": False,
-            }
-            
-            # Add image content if we have uploaded images
-            if image_urns:
-                payload["content"] = {
-                    "media": {
-                        "id": image_urns[0]
-                    }
-                }
-                logging.info(f"Post includes image: {image_urns[0]}")
-            
-            # Use the REST API endpoint (not v2)
-            response = await client.post(
-                "https://api.linkedin.com/rest/posts",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json",
-                    "LinkedIn-Version": self.API_VERSION,
-                    "X-Restli-Protocol-Version": "2.0.0",
-                },
-                json=payload
-            )
-            
-            logging.info(f"LinkedIn API response status: {response.status_code}")
-            
-            if response.status_code not in (200, 201):
-                error_text = response.text if response.content else "No response body"
-                logging.error(f"LinkedIn post failed: {error_text}")
+        client = self.client
+        # Get user's URN
+        user_info = await self._get_user_info(client, access_token)
+        author_urn = f"urn:li:person:{user_info['sub']}"
+        
+        logging.info(f"Publishing to LinkedIn for author: {author_urn}")
+        logging.info(f"Using LinkedIn API version: {self.API_VERSION}")
+        
+        # Upload images if provided
+        image_urns = []
+        if media_urls and len(media_urls) > 0:
+            for media_url in media_urls[:1]:  # LinkedIn allows 1 image per post for basic API
                 try:
-                    error_data = response.json()
-                except:
-                    error_data = {"message": error_text}
-                raise Exception(f"LinkedIn API error: {error_data.get('message', error_text)}")
-            
-            # LinkedIn returns the post URN in the header
-            post_urn = response.headers.get("x-restli-id", "")
-            logging.info(f"LinkedIn post created successfully: {post_urn}")
-            
-            return {
-                "post_id": post_urn,
-                "url": f"https://www.linkedin.com/feed/update/{post_urn}/",
+                    image_urn = await self._upload_image(client, access_token, author_urn, media_url)
+                    if image_urn:
+                        image_urns.append(image_urn)
+                        logging.info(f"Uploaded image: {image_urn}")
+                except Exception as e:
+                    logging.error(f"Failed to upload image {media_url}: {e}")
+        
+        # Build post payload for REST API
+        payload = {
+            "author": author_urn,
+            "commentary": content,
+            "visibility": "PUBLIC",
+            "distribution": {
+                "feedDistribution": "MAIN_FEED",
+                "targetEntities": [],
+                "thirdPartyDistributionChannels": []
+            },
+            "lifecycleState": "PUBLISHED",
+            "isReshareDisabledByAuthor": False,
+        }
+        
+        # Add image content if we have uploaded images
+        if image_urns:
+            payload["content"] = {
+                "media": {
+                    "id": image_urns[0]
+                }
             }
+            logging.info(f"Post includes image: {image_urns[0]}")
+        
+        # Use the REST API endpoint (not v2)
+        response = await client.post(
+            "https://api.linkedin.com/rest/posts",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/json",
+                "LinkedIn-Version": self.API_VERSION,
+                "X-Restli-Protocol-Version": "2.0.0",
+            },
+            json=payload
+        )
+        
+        logging.info(f"LinkedIn API response status: {response.status_code}")
+        self._raise_if_transient(response, committing=True)
+        
+        if response.status_code not in (200, 201):
+            error_text = response.text if response.content else "No response body"
+            logging.error(f"LinkedIn post failed: {error_text}")
+            try:
+                error_data = response.json()
+            except:
+                error_data = {"message": error_text}
+            raise Exception(f"LinkedIn API error: {error_data.get('message', error_text)}")
+        
+        # LinkedIn returns the post URN in the header
+        post_urn = response.headers.get("x-restli-id", "")
+        logging.info(f"LinkedIn post created successfully: {post_urn}")
+        
+        return {
+            "post_id": post_urn,
+            "url": f"https://www.linkedin.com/feed/update/{post_urn}/",
+        }
 
     async def _upload_image(
         self, 
@@ -269,38 +272,39 @@ class LinkedInService(BaseSocialService):
         """LinkedIn doesn't have a revocation endpoint - just delete from our DB"""
         return True
 
-    async def check_post_exists(self, access_token: str, post_urn: str) -> bool:
+    async def get_post_status(self, access_token: str, post_urn: str) -> Optional[bool]:
         """
-        Check if a post still exists on LinkedIn.
+        Whether a post still exists on LinkedIn: True / False, or None when
+        it can't be told (auth or server error, network failure).
         GET https://api.linkedin.com/rest/posts/{urn}
         """
-        import httpx
         from urllib.parse import quote
         
         encoded_urn = quote(post_urn)
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(
-                    f"https://api.linkedin.com/rest/posts/{encoded_urn}",
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "LinkedIn-Version": self.API_VERSION,
-                        "X-Restli-Protocol-Version": "2.0.0",
-                    }
-                )
-                
-                # If 200, it exists. If 404, it's deleted.
-                if response.status_code == 200:
-                    # Also check lifecycleState if available, but existence is usually enough
-                    return True
-                elif response.status_code == 404:
-                    return False
-                else:
-                    # Other errors (auth, server), assume exists to avoid accidental hiding?
-                    # Or act safe and assume exists.
-                    # Logging would be good here.
-                    return True
-            except Exception:
-                # Network error, assume exists
-                return True
+        client = self.client
+        try:
+            response = await client.get(
+                f"https://api.linkedin.com/rest/posts/{encoded_urn}",
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "LinkedIn-Version": self.API_VERSION,
+                    "X-Restli-Protocol-Version": "2.0.0",
+                }
+            )
+        except httpx.HTTPError:
+            return None
+        
+        # If 200, it exists. If 404 (or 410), it's deleted.
+        if response.status_code == 200:
+            return True
+        if response.status_code in (404, 410):
+            return False
+        return None
+
+    async def check_post_exists(self, access_token: str, post_urn: str) -> bool:
+        """
+        Check if a post still exists on LinkedIn.
+        Errors count as existing, to avoid hiding posts by accident.
+        """
+        return await self.get_post_status(access_token, post_urn) is not False
@@ -105,38 +105,38 @@ class TwitterService(BaseSocialService):
             "Authorization": f"Basic {basic_auth}",
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.OAUTH_TOKEN,
-                data=data,
-                headers=headers,
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Token exchange failed: {response.text}")
-            
-            token_data = response.json()
-            
-            # Get user info
-            user_info = await self._get_user_info(
-                client, 
-                token_data["access_token"]
-            )
-            
-            # Calculate expiry
-            expires_at = None
-            if "expires_in" in token_data:
-                expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
-            
-            return {
-                "access_token": token_data["access_token"],
-                "refresh_token": token_data.get("refresh_token", ""),
-                "expires_at": expires_at,
-                "user_id": user_info["id"],
-                "username": user_info["username"],
-                "display_name": user_info.get("name", ""),
-                "profile_picture": user_info.get("profile_image_url", ""),
-            }
+        client = self.client
+        response = await client.post(
+            self.OAUTH_TOKEN,
+            data=data,
+            headers=headers,
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Token exchange failed: {response.text}")
+        
+        token_data = response.json()
+        
+        # Get user info
+        user_info = await self._get_user_info(
+            client, 
+            token_data["access_token"]
+        )
+        
+        # Calculate expiry
+        expires_at = None
+        if "expires_in" in token_data:
+            expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
+        
+        return {
+            "access_token": token_data["access_token"],
+            "refresh_token": token_data.get("refresh_token", ""),
+            "expires_at": expires_at,
+            "user_id": user_info["id"],
+            "username": user_info["username"],
+            "display_name": user_info.get("name", ""),
+            "profile_picture": user_info.get("profile_image_url", ""),
+        }
 
     async def _get_user_info(
         self, 
@@ -159,14 +159,14 @@ class TwitterService(BaseSocialService):
 
     async def get_user_info(self, access_token: str) -> Dict[str, Any]:
         """Get user info (public method)"""
-        async with httpx.AsyncClient() as client:
-            user = await self._get_user_info(client, access_token)
-            return {
-                "user_id": user["id"],
-                "username": user["username"],
-                "display_name": user.get("name", ""),
-                "profile_picture": user.get("profile_image_url", ""),
-            }
+        client = self.client
+        user = await self._get_user_info(client, access_token)
+        return {
+            "user_id": user["id"],
+            "username": user["username"],
+            "display_name": user.get("name", ""),
+            "profile_picture": user.get("profile_image_url", ""),
+        }
 
     async def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh the access token"""
@@ -187,27 +187,27 @@ class TwitterService(BaseSocialService):
             "Authorization": f"Basic {basic_auth}",
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.OAUTH_TOKEN,
-                data=data,
-                headers=headers,
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Token refresh failed: {response.text}")
-            
-            token_data = response.json()
-            
-            expires_at = None
-            if "expires_in" in token_data:
-                expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
-            
-            return {
-                "access_token": token_data["access_token"],
-                "refresh_token": token_data.get("refresh_token", refresh_token),
-                "expires_at": expires_at,
-            }
+        client = self.client
+        response = await client.post(
+            self.OAUTH_TOKEN,
+            data=data,
+            headers=headers,
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Token refresh failed: {response.text}")
+        
+        token_data = response.json()
+        
+        expires_at = None
+        if "expires_in" in token_data:
+            expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
+        
+        return {
+            "access_token": token_data["access_token"],
+            "refresh_token": token_data.get("refresh_token", refresh_token),
+            "expires_at": expires_at,
+        }
 
     async def publish_post(
         self,
@@ -237,20 +237,21 @@ class TwitterService(BaseSocialService):
             "Content-Type": "application/json",
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            data = response.json()
-            
-            if response.status_code != 201:
-                error_msg = data.get("detail", data.get("errors", str(data)))
-                raise Exception(f"Failed to post tweet: {error_msg}")
-            
-            tweet_id = data["data"]["id"]
-            
-            return {
-                "post_id": tweet_id,
-                "url": f"https://twitter.com/i/web/status/{tweet_id}",
-            }
+        client = self.client
+        response = await client.post(url, json=payload, headers=headers)
+        self._raise_if_transient(response, committing=True)
+        data = response.json()
+        
+        if response.status_code != 201:
+            error_msg = data.get("detail", data.get("errors", str(data)))
+            raise Exception(f"Failed to post tweet: {error_msg}")
+        
+        tweet_id = data["data"]["id"]
+        
+        return {
+            "post_id": tweet_id,
+            "url": f"https://twitter.com/i/web/status/{tweet_id}",
+        }
 
     async def revoke_access(self, access_token: str) -> bool:
         """Revoke access token"""
@@ -270,11 +271,11 @@ class TwitterService(BaseSocialService):
             "token_type_hint": "access_token",
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.twitter.com/2/oauth2/revoke",
-                data=data,
-                headers=headers,
-            )
-            
-            return response.status_code == 200
+        client = self.client
+        response = await client.post(
+            "https://api.twitter.com/2/oauth2/revoke",
+            data=data,
+            headers=headers,
+        )
+        
+        return response.status_code == 200
@@ -0,0 +1,194 @@
+"""
+In-memory social graph cache.
+
+Keeps the following / followers lists of recently active users as sorted
+int arrays (8 bytes per edge) in an LRU cache, so follow checks, mutual
+follows and intersections are answered with binary searches instead of a
+query each. Entries are dropped on follow / unfollow on every instance via
+app.core.events, and reloaded on the next read. Invalidation bumps a
+version, so a list loaded concurrently from rows read before it isn't
+cached; entries also expire after GRAPH_CACHE_TTL_SECONDS as a backstop.
+
+Lists that can be huge (a popular user's followers) are never loaded just to
+answer one question: mutual followers are probed from the viewer's side, and
+suggestions are counted by the database.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.follow import Follow
+
+CHANGED_TOPIC = "graph.changed"
+
+# Friends-of-friends looks at the user's most recent followings, no more than this many
+SUGGESTION_FANOUT = 200
+
+# Ids per IN (...) probe of the follows table
+PROBE_BATCH_SIZE = 1000
+
+# Users share invalidation versions by id modulo this, keeping them bounded
+VERSION_STRIPES = 1024
+
+# Ids per invalidation event, keeping NOTIFY payloads small
+INVALIDATE_BATCH_SIZE = 500
+
+
+def _contains(ids: array, user_id: int) -> bool:
+    pos = bisect_left(ids, user_id)
+    return pos < len(ids) and ids[pos] == user_id
+
+
+def _intersect(a: array, b: array) -> List[int]:
+    """Ids present in both sorted arrays, probing the larger with the smaller."""
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    return [user_id for user_id in small if _contains(large, user_id)]
+
+
+class SocialGraph:
+    """LRU cache of adjacency arrays keyed by ("following" | "followers", user_id)."""
+
+    def __init__(self, max_lists: int, ttl: float):
+        self._lists = LRUCache(maxsize=max_lists, ttl=ttl)
+        self._lock = threading.Lock()
+        self._versions = [0] * VERSION_STRIPES
+
+    # ---- loading ----
+
+    def _load(self, db: Session, direction: str, user_ids: Iterable[int]) -> Dict[int, array]:
+        """Batch-load adjacency lists for the given users in one query."""
+        user_ids = list(user_ids)
+        if direction == "following":
+            key_col, value_col = Follow.follower_id, Follow.following_id
+        else:
+            key_col, value_col = Follow.following_id, Follow.follower_id
+
+        versions = {user_id: self._versions[user_id % VERSION_STRIPES] for user_id in user_ids}
+        lists: Dict[int, List[int]] = {user_id: [] for user_id in user_ids}
+        rows = db.query(key_col, value_col).filter(key_col.in_(user_ids)).all()
+        for owner_id, other_id in rows:
+            lists[owner_id].append(other_id)
+
+        loaded = {}
+        with self._lock:
+            for user_id, ids in lists.items():
+                loaded[user_id] = array("q", sorted(ids))
+                # Invalidated while loading: the rows may predate the change
+                if self._versions[user_id % VERSION_STRIPES] == versions[user_id]:
+                    self._lists.set((direction, user_id), loaded[user_id])
+        return loaded
+
+    def _get_many(self, db: Session, direction: str, user_ids: Iterable[int]) -> Dict[int, array]:
+        result = {}
+        missing = []
+        for user_id in user_ids:
+            ids = self._lists.get((direction, user_id))
+            if ids is None:
+                missing.append(user_id)
+            else:
+                result[user_id] = ids
+        if missing:
+            result.update(self._load(db, direction, missing))
+        return result
+
+    def following(self, db: Session, user_id: int) -> array:
+        """Sorted ids of the users `user_id` follows."""
+        return self._get_many(db, "following", [user_id])[user_id]
+
+    def followers(self, db: Session, user_id: int) -> array:
+        """Sorted ids of the users following `user_id`."""
+        return self._get_many(db, "followers", [user_id])[user_id]
+
+    # ---- queries ----
+
+    def is_following(self, db: Session, follower_id: int, following_id: int) -> bool:
+        """Whether `follower_id` follows `following_id`."""
+        # Either side's cached list answers the question; prefer one already in memory
+        followers = self._lists.peek(("followers", following_id))
+        if followers is not None and ("following", follower_id) not in self._lists:
+            return _contains(followers, follower_id)
+        return _contains(self.following(db, follower_id), following_id)
+
+    def relationship(self, db: Session, viewer_id: int, user_id: int) -> Tuple[bool, bool]:
+        """(viewer follows user, user follows viewer)."""
+        return (
+            self.is_following(db, viewer_id, user_id),
+            self.is_following(db, user_id, viewer_id),
+        )
+
+    def mutual_followers(self, db: Session, viewer_id: int, user_id: int) -> List[int]:
+        """People the viewer follows who also follow `user_id` ("Followed by ...")."""
+        following = self.following(db, viewer_id)
+        followers = self._lists.peek(("followers", user_id))
+        if followers is not None:
+            return _intersect(following, followers)
+        # Probed from the viewer's side rather than loading every follower of `user_id`
+        mutual = []
+        for start in range(0, len(following), PROBE_BATCH_SIZE):
+            batch = following[start:start + PROBE_BATCH_SIZE].tolist()
+            mutual.extend(
+                follower_id for (follower_id,) in db.query(Follow.follower_id).filter(
+                    Follow.follower_id.in_(batch),
+                    Follow.following_id == user_id,
+                )
+            )
+        return sorted(mutual)
+
+    def suggestions(self, db: Session, user_id: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """
+        People you may know: users followed by the people `user_id` most
+        recently followed, ranked by how many of them follow each candidate.
+        Returns (candidate_id, mutual_count) pairs.
+        """
+        # Counted in one query, so the friends' lists don't cycle through the cache
+        friends = db.query(Follow.following_id).filter(
+            Follow.follower_id == user_id
+        ).order_by(Follow.created_at.desc(), Follow.id.desc()).limit(SUGGESTION_FANOUT).subquery()
+        followed = db.query(Follow.following_id).filter(Follow.follower_id == user_id)
+        mutual_count = func.count(Follow.follower_id)
+        rows = db.query(Follow.following_id, mutual_count).filter(
+            Follow.follower_id.in_(db.query(friends.c.following_id)),
+            Follow.following_id != user_id,
+            ~Follow.following_id.in_(followed),
+        ).group_by(Follow.following_id).order_by(
+            mutual_count.desc(), Follow.following_id
+        ).limit(limit).all()
+        return [(candidate_id, count) for candidate_id, count in rows]
+
+    # ---- invalidation ----
+
+    def _apply_changed(self, data: Dict) -> None:
+        with self._lock:
+            for user_id in data.get("user_ids", []):
+                self._versions[user_id % VERSION_STRIPES] += 1
+                self._lists.delete(("following", user_id))
+                self._lists.delete(("followers", user_id))
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._versions = [version + 1 for version in self._versions]
+            self._lists.clear()
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Drop the cached lists of these users on every instance."""
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), INVALIDATE_BATCH_SIZE):
+            events.publish(CHANGED_TOPIC, {"user_ids": user_ids[start:start + INVALIDATE_BATCH_SIZE]})
+
+    def stats(self) -> Dict:
+        return self._lists.stats()
+
+
+social_graph = SocialGraph(
+    max_lists=settings.GRAPH_CACHE_MAX_LISTS,
+    ttl=settings.GRAPH_CACHE_TTL_SECONDS,
+)
+events.subscribe(CHANGED_TOPIC, social_graph._apply_changed)
+events.on_reconnect(social_graph._clear)
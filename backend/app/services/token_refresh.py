@@ -0,0 +1,224 @@
+"""
+Proactive refresh of social connection tokens.
+
+Publishing used to find out about an expiring token only when a post failed
+("Token expired. Please reconnect"). Instead, a background refresher walks
+idx_social_connection_expires for connections whose token expires within the
+platform's TOKEN_REFRESH_AHEAD_SECONDS and refreshes them in batches, at most
+TOKEN_REFRESH_CONCURRENCY_PER_PLATFORM calls at a time per platform, storing
+the re-encrypted tokens. The publish path only reads the stored token, so it
+never waits on a refresh.
+
+Each connection is claimed with a conditional update of
+`token_refresh_attempted_at`, so one instance refreshes it (Twitter rotates
+refresh tokens; two concurrent refreshes would invalidate one another). A
+failed refresh keeps the claim, records `token_refresh_error` and is retried
+after TOKEN_REFRESH_RETRY_SECONDS. Platforms that can't refresh (LinkedIn)
+are skipped, as are Meta tokens that already expired, which can no longer be
+exchanged.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.encryption import decrypt_token, encrypt_token
+from app.db.session import SessionLocal
+from app.models.social_connection import SocialConnection
+from app.services.publishing import SERVICES
+from app.services.social.base import BaseSocialService
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_input(service: BaseSocialService, access_token: str, refresh_token: Optional[str]) -> str:
+    """
+    The decrypted token `service.refresh_access_token` takes, from a
+    connection's encrypted tokens. Raises ValueError when there is none.
+    """
+    encrypted = access_token if service.refresh_with_access_token else refresh_token
+    token = decrypt_token(encrypted) if encrypted else ""
+    if not token:
+        raise ValueError("No refresh token available. Please reconnect.")
+    return token
+
+
+def apply_tokens(connection: SocialConnection, new_tokens: Dict[str, Any]) -> None:
+    """Store refreshed tokens on the connection (encrypted); the caller commits."""
+    connection.access_token = encrypt_token(new_tokens["access_token"])
+    if new_tokens.get("refresh_token"):
+        connection.refresh_token = encrypt_token(new_tokens["refresh_token"])
+    connection.token_expires_at = new_tokens.get("expires_at")
+    connection.token_refresh_attempted_at = None
+    connection.token_refresh_error = None
+    connection.updated_at = datetime.utcnow()
+
+
+# ---- DB steps (run in the threadpool, own sessions) ----
+
+def _due(now: datetime):
+    """Connections whose token should be refreshed now (token_expires_at is naive UTC)."""
+    windows = []
+    for platform, ahead in settings.TOKEN_REFRESH_AHEAD_SECONDS.items():
+        service = SERVICES.get(platform)
+        if service is None or not service.supports_refresh:
+            continue
+        window = and_(
+            SocialConnection.platform == platform,
+            SocialConnection.token_expires_at <= now + timedelta(seconds=ahead),
+        )
+        if service.refresh_with_access_token:
+            # An expired token can't be exchanged any more
+            window = and_(window, SocialConnection.token_expires_at > now)
+        windows.append(window)
+    if not windows:
+        return None
+    retry_before = now - timedelta(seconds=settings.TOKEN_REFRESH_RETRY_SECONDS)
+    return and_(
+        or_(*windows),
+        or_(
+            SocialConnection.token_refresh_attempted_at.is_(None),
+            SocialConnection.token_refresh_attempted_at < retry_before,
+        ),
+    )
+
+
+def _claim_due(batch_size: int) -> Tuple[datetime, List[Tuple]]:
+    """
+    Claim up to `batch_size` due connections, soonest expiry first.
+    Returns (claim time, [(id, platform, encrypted access token, encrypted refresh token)]).
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        due = _due(now)
+        if due is None:
+            return now, []
+        candidates = db.query(
+            SocialConnection.id,
+            SocialConnection.platform,
+            SocialConnection.access_token,
+            SocialConnection.refresh_token,
+        ).filter(due).order_by(SocialConnection.token_expires_at).limit(batch_size).all()
+
+        claimed = []
+        for row in candidates:
+            updated = db.query(SocialConnection).filter(
+                SocialConnection.id == row.id,
+                due,
+            ).update({
+                SocialConnection.token_refresh_attempted_at: now,
+            }, synchronize_session=False)
+            if updated:
+                claimed.append(tuple(row))
+        db.commit()
+        return now, claimed
+    finally:
+        db.close()
+
+
+def _record(claimed_at: datetime, outcomes: Dict[int, Dict[str, Any]]) -> None:
+    """
+    Store a batch's refreshed tokens and errors in one commit. Connections
+    reconnected meanwhile (claim cleared by the OAuth callback) are left alone.
+    """
+    db = SessionLocal()
+    try:
+        connections = db.query(SocialConnection).filter(
+            SocialConnection.id.in_(list(outcomes)),
+            SocialConnection.token_refresh_attempted_at == claimed_at,
+        ).all()
+        for connection in connections:
+            outcome = outcomes[connection.id]
+            if "tokens" in outcome:
+                apply_tokens(connection, outcome["tokens"])
+            else:
+                connection.token_refresh_error = outcome["error"]
+        db.commit()
+    finally:
+        db.close()
+
+
+class TokenRefresher:
+    """Periodic, per-platform bounded refresh of tokens nearing expiry."""
+
+    def __init__(self, interval_seconds: float, batch_size: int, concurrency: int):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+        self.passes = 0
+        self.refreshed: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+
+    def start(self) -> None:
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Token refresh pass failed: {e}")
+
+    async def run_once(self) -> int:
+        """Refresh every due connection, batch by batch; returns how many were refreshed."""
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        refreshed = 0
+        while True:
+            claimed_at, claimed = await run_in_threadpool(_claim_due, self.batch_size)
+            if not claimed:
+                break
+            outcomes = await asyncio.gather(*(
+                self._refresh(row, semaphores) for row in claimed
+            ))
+            await run_in_threadpool(
+                _record, claimed_at, {row[0]: outcome for row, outcome in zip(claimed, outcomes)}
+            )
+            refreshed += sum(1 for outcome in outcomes if "tokens" in outcome)
+            if len(claimed) < self.batch_size:
+                break
+        self.passes += 1
+        return refreshed
+
+    async def _refresh(self, row: Tuple, semaphores: Dict[str, asyncio.Semaphore]) -> Dict[str, Any]:
+        connection_id, platform, access_token, refresh_token = row
+        service = SERVICES[platform]
+        semaphore = semaphores.setdefault(platform, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            try:
+                token = refresh_input(service, access_token, refresh_token)
+                tokens = await service.refresh_access_token(token)
+            except Exception as e:
+                self.failed[platform] = self.failed.get(platform, 0) + 1
+                logger.warning(f"Refreshing {platform} token of connection {connection_id} failed: {e}")
+                return {"error": str(e) or type(e).__name__}
+        self.refreshed[platform] = self.refreshed.get(platform, 0) + 1
+        return {"tokens": tokens}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "passes": self.passes,
+            "refreshed": dict(self.refreshed),
+            "failed": dict(self.failed),
+        }
+
+
+token_refresher = TokenRefresher(
+    interval_seconds=settings.TOKEN_REFRESH_INTERVAL_SECONDS,
+    batch_size=settings.TOKEN_REFRESH_BATCH_SIZE,
+    concurrency=settings.TOKEN_REFRESH_CONCURRENCY_PER_PLATFORM,
+)
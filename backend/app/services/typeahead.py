@@ -0,0 +1,234 @@
+"""
+In-process typeahead index for username / display-name autocomplete.
+
+Keeps a sorted array of (prefix_key, user_id) pairs so a lookup is a binary
+search plus a scan of the matching range, ranked by followers_count. One or
+two letters match a large share of all users, so for those prefixes the top
+TOP_K users are kept precomputed and patched along with the index. The
+index is loaded at startup, patched incrementally on signup / profile
+update / deletion, and kept consistent across instances through the event
+bus in app.core.events. Changes arriving while it is being rebuilt are
+replayed onto the new arrays.
+"""
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.models.user import User
+from app.services.media import avatar_url
+
+logger = logging.getLogger(__name__)
+
+UPSERT_TOPIC = "typeahead.upsert"
+REMOVE_TOPIC = "typeahead.remove"
+
+# Fields kept per user; everything the suggest endpoint returns
+ENTRY_FIELDS = ("id", "username", "full_name", "profile_picture", "followers_count")
+
+# Prefixes up to this long get precomputed top lists of TOP_K users
+SHORT_PREFIX_LEN = 2
+TOP_K = 32
+
+
+def _keys_for(entry: Dict[str, Any]) -> List[str]:
+    """Searchable keys: the username, the full name and each word in it."""
+    keys = set()
+    if entry.get("username"):
+        keys.add(entry["username"].lower())
+    full_name = (entry.get("full_name") or "").lower().strip()
+    if full_name:
+        keys.add(full_name)
+        keys.update(part for part in full_name.split() if part)
+    return sorted(keys)
+
+
+def _short_prefixes(entry: Optional[Dict[str, Any]]) -> Set[str]:
+    if not entry:
+        return set()
+    return {key[:n] for key in _keys_for(entry) for n in range(1, SHORT_PREFIX_LEN + 1) if len(key) >= n}
+
+
+def _rank(entry: Dict[str, Any]) -> tuple:
+    """Sort key: most followers first, then username, then id."""
+    return (-entry["followers_count"], (entry["username"] or "").lower(), entry["id"])
+
+
+def _top(user_ids: Iterable[int], entries: Dict[int, Dict[str, Any]], limit: int) -> List[int]:
+    return heapq.nsmallest(limit, set(user_ids), key=lambda user_id: _rank(entries[user_id]))
+
+
+class TypeaheadIndex:
+    """Sorted-array prefix index with popularity ranking."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys: List[tuple] = []  # sorted (key, user_id)
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._tops: Dict[str, List[int]] = {}  # short prefix -> top user ids, best first
+        self._load_lock = threading.Lock()
+        # Changes applied while a load runs, replayed onto its result
+        self._pending: Optional[List[Tuple[Callable[[Dict[str, Any]], None], Dict[str, Any]]]] = None
+        self.loaded = False
+
+    def load(self, db: Session) -> None:
+        """(Re)build the whole index from the active users table."""
+        with self._load_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                self._load(db)
+            finally:
+                with self._lock:
+                    self._pending = None
+
+    def _load(self, db: Session) -> None:
+        rows = db.query(
+            User.id,
+            User.username,
+            User.full_name,
+            User.profile_picture,
+            User.profile_picture_variants,
+            User.followers_count,
+        ).filter(User.is_active == True).all()
+
+        entries = {}
+        keys = []
+        for row in rows:
+            entry = {
+                "id": row.id,
+                "username": row.username,
+                "full_name": row.full_name,
+                "profile_picture": avatar_url(row),
+                "followers_count": row.followers_count or 0,
+            }
+            entries[row.id] = entry
+            keys.extend((key, row.id) for key in _keys_for(entry))
+        keys.sort()
+
+        matches: Dict[str, Set[int]] = {}
+        for key, user_id in keys:
+            for n in range(1, min(len(key), SHORT_PREFIX_LEN) + 1):
+                matches.setdefault(key[:n], set()).add(user_id)
+        tops = {prefix: _top(user_ids, entries, TOP_K) for prefix, user_ids in matches.items()}
+
+        with self._lock:
+            pending, self._pending = self._pending or [], None
+            self._entries = entries
+            self._keys = keys
+            self._tops = tops
+            # Published after the query may or may not have seen them: apply again
+            for apply, data in pending:
+                apply(data)
+            self.loaded = True
+        logger.info(f"Typeahead index loaded with {len(entries)} users")
+
+    def _remove_local(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if not entry:
+            return
+        for key in _keys_for(entry):
+            pos = bisect_left(self._keys, (key, user_id))
+            if pos < len(self._keys) and self._keys[pos] == (key, user_id):
+                del self._keys[pos]
+
+    def _update_tops(self, user_id: int, old_prefixes: Set[str], entry: Optional[Dict[str, Any]]) -> None:
+        """Patch the short-prefix top lists for a user that changed (`entry` None: removed)."""
+        new_prefixes = _short_prefixes(entry)
+        for prefix in old_prefixes | new_prefixes:
+            top = self._tops.get(prefix)
+            if top is None:
+                continue
+            # A list shorter than TOP_K holds every user with the prefix
+            complete = len(top) < TOP_K
+            removed = user_id in top
+            if removed:
+                top.remove(user_id)
+            if prefix in new_prefixes and (complete or _rank(entry) < _rank(self._entries[top[-1]])):
+                ranks = [_rank(self._entries[other]) for other in top]
+                top.insert(bisect_left(ranks, _rank(entry)), user_id)
+                del top[TOP_K:]
+            elif removed and not complete:
+                # Who ranks next isn't known: rebuilt on next use
+                del self._tops[prefix]
+
+    def _apply_upsert(self, data: Dict[str, Any]) -> None:
+        entry = {field: data.get(field) for field in ENTRY_FIELDS}
+        entry["followers_count"] = entry["followers_count"] or 0
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self._apply_upsert, data))
+            old_prefixes = _short_prefixes(self._entries.get(entry["id"]))
+            self._remove_local(entry["id"])
+            self._entries[entry["id"]] = entry
+            for key in _keys_for(entry):
+                insort(self._keys, (key, entry["id"]))
+            self._update_tops(entry["id"], old_prefixes, entry)
+
+    def _apply_remove(self, data: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self._apply_remove, data))
+            old_prefixes = _short_prefixes(self._entries.get(data["id"]))
+            self._remove_local(data["id"])
+            self._update_tops(data["id"], old_prefixes, None)
+
+    def upsert_user(self, user: User) -> None:
+        """Index (or re-index) a user on every instance; inactive users are dropped."""
+        if not user.is_active:
+            self.remove_user(user.id)
+            return
+        events.publish(UPSERT_TOPIC, {
+            "id": user.id,
+            "username": user.username,
+            "full_name": user.full_name,
+            "profile_picture": avatar_url(user),
+            "followers_count": user.followers_count or 0,
+        })
+
+    def remove_user(self, user_id: int) -> None:
+        """Drop a user from the index on every instance."""
+        events.publish(REMOVE_TOPIC, {"id": user_id})
+
+    def suggest(
+        self, prefix: str, limit: int = 10, exclude_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-`limit` users whose username or name starts with `prefix`."""
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) <= SHORT_PREFIX_LEN and limit < TOP_K:
+                top = self._tops.get(prefix)
+                if top is None:
+                    top = self._tops[prefix] = _top(self._matching(prefix), self._entries, TOP_K)
+                return [dict(self._entries[user_id]) for user_id in top if user_id != exclude_id][:limit]
+            matched = [user_id for user_id in self._matching(prefix) if user_id != exclude_id]
+            return [dict(self._entries[user_id]) for user_id in _top(matched, self._entries, limit)]
+
+    def _matching(self, prefix: str) -> List[int]:
+        """Ids with a key starting with `prefix` (possibly repeated); call under the lock."""
+        # Every key starting with `prefix` sorts in [prefix, upper)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        start = bisect_left(self._keys, (prefix,))
+        end = bisect_left(self._keys, (upper,), lo=start)
+        return [user_id for _, user_id in self._keys[start:end]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "users": len(self._entries),
+                "keys": len(self._keys),
+                "top_lists": len(self._tops),
+            }
+
+
+typeahead_index = TypeaheadIndex()
+events.subscribe(UPSERT_TOPIC, typeahead_index._apply_upsert)
+events.subscribe(REMOVE_TOPIC, typeahead_index._apply_remove)
@@ -0,0 +1,86 @@
+import os
+import requests
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = "http://localhost:8000/api/v1"
+EMAIL = "test@example.com"
+PASSWORD = "password123"
+
+CONCURRENCY = [1, 4, 16, 64]
+LOGINS_PER_LEVEL = 64
+
+
+def login(in_flight: threading.Event = None) -> tuple:
+    if in_flight is not None:
+        in_flight.set()
+    started = time.perf_counter()
+    response = requests.post(
+        f"{BASE_URL}/auth/login/access-token",
+        data={"username": EMAIL, "password": PASSWORD},
+    )
+    return response.status_code, time.perf_counter() - started, response
+
+
+def probe(token: str) -> float:
+    """Latency of a cheap authenticated request while logins are in flight."""
+    started = time.perf_counter()
+    response = requests.get(
+        f"{BASE_URL}/posts/hashtags/trending",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    latency = time.perf_counter() - started
+    if response.status_code != 200:
+        print(f"❌ Probe returned {response.status_code}; its latency means nothing")
+        sys.exit(1)
+    return latency
+
+
+def run_level(concurrency: int, token: str) -> None:
+    in_flight = threading.Event()
+    # The probe gets its own thread so it doesn't queue behind the logins
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, ThreadPoolExecutor(max_workers=1) as prober:
+        started = time.perf_counter()
+        futures = [pool.submit(login, in_flight) for _ in range(LOGINS_PER_LEVEL)]
+        in_flight.wait()
+        probe_latency = prober.submit(probe, token).result()
+        results = [f.result()[:2] for f in futures]
+        elapsed = time.perf_counter() - started
+
+    ok = [latency for status, latency in results if status == 200]
+    busy = sum(1 for status, _ in results if status == 503)
+    latencies = sorted(ok) or [0.0]
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(
+        f"concurrency={concurrency:3d}  logins/s={len(ok) / elapsed:6.1f}  "
+        f"p50={statistics.median(latencies) * 1000:6.0f}ms  p95={p95 * 1000:6.0f}ms  "
+        f"503s={busy:3d}  probe={probe_latency * 1000:5.0f}ms"
+    )
+
+
+def benchmark_login():
+    print("Benchmarking login throughput...")
+    # Make sure the benchmark user exists (see test_auth_flow.py)
+    status, _, response = login()
+    if status != 200:
+        print("❌ Login failed; run test_auth_flow.py first to create the user")
+        sys.exit(1)
+    token = response.json()["access_token"]
+
+    for concurrency in CONCURRENCY:
+        run_level(concurrency, token)
+
+    # Needs the server's METRICS_TOKEN
+    response = requests.get(
+        f"{BASE_URL}/debug/metrics",
+        headers={"X-Metrics-Token": os.environ.get("METRICS_TOKEN", "")},
+    )
+    if response.status_code == 200:
+        print("\nPassword hasher:", response.json()["password_hasher"])
+
+
+if __name__ == "__main__":
+    benchmark_login()
@@ -0,0 +1,60 @@
+"""
+Shared setup for the backend tests.
+
+The tests run against a throwaway SQLite database (TEST_DATABASE_URL to use
+another one), never the DATABASE_URL of the environment: every table is
+emptied after each test. Media goes to local storage in the same temporary
+directory.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_tmp_dir = tempfile.mkdtemp(prefix="vextra-tests-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LOCAL_ROOT"] = os.path.join(_tmp_dir, "media")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest  # noqa: E402
+
+from app.backend_pre_start import create_tables  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _tables():
+    create_tables()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _empty_tables():
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="tester@example.com", hashed_password="x", username="tester")
+    db.add(user)
+    db.commit()
+    return user
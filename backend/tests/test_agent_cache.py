@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.services import agent_cache
+from app.services.agent_cache import ResponseCache
+
+REQUEST = {"model": "test", "messages": [{"role": "user", "content": "hi"}]}
+
+
+@pytest.fixture(autouse=True)
+def _no_database(monkeypatch):
+    monkeypatch.setattr(agent_cache, "_load", lambda key: None)
+    monkeypatch.setattr(agent_cache, "_store", lambda key, kind, response, ttl: None)
+
+
+def _cache():
+    return ResponseCache(maxsize=100, ttl=60)
+
+
+def test_concurrent_misses_generate_once():
+    cache = _cache()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(
+            cache.get_or_generate("content", REQUEST, generate) for _ in range(5)
+        ))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert cache.coalesced == 4
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_waiters_regenerate_once_when_the_first_call_fails():
+    cache = _cache()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        if len(calls) == 1:
+            raise RuntimeError("rate limited")
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(
+            cache.get_or_generate("content", REQUEST, generate) for _ in range(5)
+        ), return_exceptions=True)
+
+    results = asyncio.run(main())
+    # Only the failed call's own caller sees its error
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == ["answer"] * 4
+    assert len(calls) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    cache = _cache()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_generate("content", REQUEST, generate))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_generate("content", REQUEST, generate))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await first
+
+    assert asyncio.run(main()) == "answer"
+    assert len(calls) == 1
+
+
+def test_cancelled_first_call_hands_over_to_a_waiter():
+    cache = _cache()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_generate("content", REQUEST, generate))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_generate("content", REQUEST, generate))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == "answer"
+    assert len(calls) == 2
+
+
+def test_hit_after_generation_and_empty_responses_not_cached():
+    cache = _cache()
+    responses = iter(["", "answer"])
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return next(responses)
+
+    async def main():
+        return [await cache.get_or_generate("content", REQUEST, generate) for _ in range(3)]
+
+    assert asyncio.run(main()) == ["", "answer", "answer"]
+    assert len(calls) == 2
@@ -1,3 +1,4 @@
+import pytest
 import requests
 import sys
 
@@ -5,6 +6,15 @@ BASE_URL = "http://localhost:8000/api/v1"
 EMAIL = "test@example.com"
 PASSWORD = "password123"
 
+def _server_running() -> bool:
+    try:
+        requests.get(BASE_URL, timeout=2)
+    except requests.ConnectionError:
+        return False
+    return True
+
+# Runs against a live API (uvicorn app.main:app --port 8000)
+@pytest.mark.skipif(not _server_running(), reason="needs the API running on localhost:8000")
 def test_auth_flow():
     print("Testing Authentication Flow...")
 
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.llm_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    AgentBusyError,
+    AgentRateLimitError,
+    LLMScheduler,
+)
+
+
+def _scheduler(max_concurrency=1, queue_timeout=1.0, tokens_per_minute=6000, burst=1000):
+    return LLMScheduler(
+        max_concurrency=max_concurrency,
+        queue_timeout=queue_timeout,
+        user_tokens_per_minute=tokens_per_minute,
+        user_token_burst=burst,
+    )
+
+
+def test_interactive_waiters_go_before_batch():
+    scheduler = _scheduler()
+    order = []
+
+    async def call(lane, name, hold=0.0):
+        async with scheduler.slot(None, lane, 10):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def main():
+        holder = asyncio.create_task(call(INTERACTIVE, "holder", hold=0.05))
+        await asyncio.sleep(0.01)
+        batch = asyncio.create_task(call(BATCH, "batch"))
+        await asyncio.sleep(0.01)
+        chat = asyncio.create_task(call(INTERACTIVE, "chat"))
+        await asyncio.gather(holder, batch, chat)
+
+    asyncio.run(main())
+    assert order == ["holder", "chat", "batch"]
+    assert scheduler.stats()["active"] == 0
+
+
+def test_no_slot_in_time_is_busy():
+    scheduler = _scheduler(queue_timeout=0.05)
+
+    async def main():
+        async with scheduler.slot(None, INTERACTIVE, 10):
+            with pytest.raises(AgentBusyError):
+                async with scheduler.slot(None, INTERACTIVE, 10):
+                    pass
+
+    asyncio.run(main())
+    assert scheduler.busy == 1
+    assert scheduler.stats()["active"] == 0
+
+
+def test_token_wait_counts_against_the_queue_timeout():
+    # 5 tokens/s: the second call waits 0.2s for its token, then for its slot
+    scheduler = _scheduler(queue_timeout=0.3, tokens_per_minute=300, burst=1)
+
+    async def main():
+        async with scheduler.slot(1, INTERACTIVE, 1):
+            started = time.monotonic()
+            with pytest.raises(AgentBusyError):
+                async with scheduler.slot(1, INTERACTIVE, 1):
+                    pass
+            return time.monotonic() - started
+
+    # Not 0.2s plus a full queue timeout
+    assert asyncio.run(main()) < 0.45
+
+
+def test_spent_bucket_is_refused_with_retry_after():
+    scheduler = _scheduler(queue_timeout=1.0, tokens_per_minute=60, burst=100)
+
+    async def main():
+        async with scheduler.slot(1, INTERACTIVE, 100):
+            pass
+        with pytest.raises(AgentRateLimitError) as refused:
+            async with scheduler.slot(1, INTERACTIVE, 100):
+                pass
+        return refused.value
+
+    error = asyncio.run(main())
+    assert error.retry_after >= 90
+    assert scheduler.rate_limited == 1
+
+
+def test_reported_usage_settles_the_reservation(monkeypatch):
+    scheduler = _scheduler(tokens_per_minute=60, burst=100)
+    monkeypatch.setattr("app.services.llm_scheduler._record_usage", lambda *args: None)
+
+    async def main():
+        async with scheduler.slot(1, INTERACTIVE, 100) as usage:
+            usage.record(prompt_tokens=10, completion_tokens=10)
+
+    asyncio.run(main())
+    # 100 reserved, 20 used: the rest is back in the bucket
+    assert scheduler._bucket(1).tokens == pytest.approx(80, abs=1)
+    assert scheduler.tokens_used == 20
+
+
+def test_busy_call_gives_its_tokens_back():
+    scheduler = _scheduler(queue_timeout=0.05, tokens_per_minute=60, burst=100)
+
+    async def main():
+        async with scheduler.slot(None, INTERACTIVE, 10):
+            with pytest.raises(AgentBusyError):
+                async with scheduler.slot(1, INTERACTIVE, 50):
+                    pass
+
+    asyncio.run(main())
+    assert scheduler._bucket(1).tokens == pytest.approx(100, abs=1)
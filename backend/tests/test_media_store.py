@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.media_asset import MediaAsset
+from app.services import media_store
+from app.services.media import DELETING, READY
+
+URL = "http://localhost:8080/media/uploads/abc.jpg"
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def asset(db):
+    asset = MediaAsset(
+        url=URL,
+        path="uploads/abc.jpg",
+        status=READY,
+        ref_count=0,
+        variants={"thumb": "http://localhost:8080/media/uploads/abc_thumb.webp"},
+    )
+    db.add(asset)
+    db.commit()
+    return asset
+
+
+def _reload(db, asset_id):
+    db.expire_all()
+    return db.query(MediaAsset).filter(MediaAsset.id == asset_id).first()
+
+
+def _release(db, asset, ago):
+    asset.ref_count = 0
+    asset.orphaned_at = _utcnow() - timedelta(seconds=ago)
+    db.commit()
+
+
+def test_references_count_up_and_release_sets_orphaned_at(db, asset):
+    media_store.track_references(db, None, [URL, URL])
+    db.commit()
+    used = _reload(db, asset.id)
+    assert used.ref_count == 2
+    assert used.orphaned_at is None
+
+    media_store.track_references(db, [URL, URL], [URL])
+    db.commit()
+    assert _reload(db, asset.id).orphaned_at is None
+
+    media_store.track_references(db, [URL], [])
+    db.commit()
+    released = _reload(db, asset.id)
+    assert released.ref_count == 0
+    assert released.orphaned_at is not None
+
+
+def test_asset_being_deleted_is_not_counted(db, asset):
+    asset.status = DELETING
+    db.commit()
+
+    media_store.track_references(db, None, [URL])
+    db.commit()
+    assert _reload(db, asset.id).ref_count == 0
+
+
+def test_never_attached_upload_is_not_collected(db, asset):
+    cutoff = _utcnow() + timedelta(hours=1)
+    assert media_store._orphans(cutoff, limit=10) == []
+
+
+def test_orphan_within_grace_is_not_collected(db, asset):
+    _release(db, asset, ago=10)
+    cutoff = _utcnow() - timedelta(seconds=60)
+    assert media_store._orphans(cutoff, limit=10) == []
+    assert media_store._claim(asset.id, cutoff) is None
+
+
+def test_recount_keeps_an_asset_still_in_use(db, asset, user):
+    _release(db, asset, ago=120)
+    # The counter drifted: a profile still uses the URL
+    user.profile_picture = URL
+    db.commit()
+    cutoff = _utcnow() - timedelta(seconds=60)
+
+    assert media_store._orphans(cutoff, limit=10) == [asset.id]
+    assert media_store._claim(asset.id, cutoff) is None
+    kept = _reload(db, asset.id)
+    assert kept.ref_count == 1
+    assert kept.orphaned_at is None
+    assert kept.status == READY
+
+
+def test_expired_orphan_is_claimed_then_forgotten(db, asset):
+    _release(db, asset, ago=120)
+    cutoff = _utcnow() - timedelta(seconds=60)
+
+    paths = media_store._claim(asset.id, cutoff)
+    assert paths == ["uploads/abc.jpg", "uploads/abc_thumb.webp"]
+    assert _reload(db, asset.id).status == DELETING
+
+    # Uses arriving meanwhile leave the row alone
+    media_store.track_references(db, None, [URL])
+    db.commit()
+    assert _reload(db, asset.id).ref_count == 0
+
+    media_store._forget(asset.id)
+    assert _reload(db, asset.id) is None
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models.publish_job import PublishJob
+from app.services import publish_jobs
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def job(db, user):
+    job = PublishJob(
+        user_id=user.id,
+        content="hello",
+        platforms={"twitter": {"status": publish_jobs.PENDING, "attempts": 0}},
+        status=publish_jobs.QUEUED,
+        attempts=0,
+        next_attempt_at=_utcnow() - timedelta(seconds=1),
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def _expire_lease(db, job_id):
+    db.query(PublishJob).filter(PublishJob.id == job_id).update({
+        PublishJob.locked_until: _utcnow() - timedelta(seconds=1),
+    })
+    db.commit()
+
+
+def _reload(db, job_id):
+    db.expire_all()
+    return db.query(PublishJob).filter(PublishJob.id == job_id).first()
+
+
+def _published(success=True, retryable=False):
+    result = {"success": success, "latency_ms": 5}
+    if success:
+        result.update(post_id="123", url="https://example.com/123")
+    else:
+        result.update(error="boom", retryable=retryable)
+    return {"twitter": result}
+
+
+def test_claim_is_exclusive_while_leased(db, job):
+    claim = publish_jobs._claim_next()
+    assert claim is not None
+    job_id, lease = claim
+    assert job_id == job.id
+
+    claimed = _reload(db, job.id)
+    assert claimed.status == publish_jobs.RUNNING
+    assert claimed.locked_by == lease
+    assert claimed.attempts == 1
+    # Leased: no other worker gets it
+    assert publish_jobs._claim_next() is None
+
+
+def test_expired_lease_is_reclaimed_with_a_new_token(db, job):
+    _, first = publish_jobs._claim_next()
+    _expire_lease(db, job.id)
+
+    claim = publish_jobs._claim_next()
+    assert claim is not None
+    _, second = claim
+    assert second != first
+    assert _reload(db, job.id).attempts == 2
+
+
+def test_lost_lease_records_nothing(db, job):
+    _, stale = publish_jobs._claim_next()
+    _expire_lease(db, job.id)
+    _, current = publish_jobs._claim_next()
+
+    assert publish_jobs._record_attempt(job.id, stale, {}, _published()) is None
+    unchanged = _reload(db, job.id)
+    assert unchanged.status == publish_jobs.RUNNING
+    assert unchanged.locked_by == current
+    assert unchanged.platforms["twitter"]["status"] == publish_jobs.PENDING
+
+    finished = publish_jobs._record_attempt(job.id, current, {}, _published())
+    assert finished["status"] == publish_jobs.SUCCEEDED
+    done = _reload(db, job.id)
+    assert done.status == publish_jobs.SUCCEEDED
+    assert done.locked_by is None
+    assert done.platforms["twitter"]["url"] == "https://example.com/123"
+
+
+def test_retryable_failure_requeues_with_backoff(db, job):
+    _, lease = publish_jobs._claim_next()
+    assert publish_jobs._record_attempt(job.id, lease, {}, _published(success=False, retryable=True)) is None
+
+    queued = _reload(db, job.id)
+    assert queued.status == publish_jobs.QUEUED
+    assert queued.locked_by is None
+    assert queued.platforms["twitter"]["status"] == publish_jobs.RETRYING
+    # Backed off: not due yet
+    assert publish_jobs._claim_next() is None
+
+
+def test_job_failing_every_claim_gives_up(db, job, monkeypatch):
+    announced = []
+    monkeypatch.setattr(publish_jobs, "_announce", announced.append)
+
+    for _ in range(settings.PUBLISH_JOB_MAX_ATTEMPTS):
+        assert publish_jobs._claim_next() is not None
+        # The worker died mid-attempt
+        _expire_lease(db, job.id)
+
+    assert publish_jobs._claim_next() is None
+    failed = _reload(db, job.id)
+    assert failed.status == publish_jobs.FAILED
+    assert failed.attempts == settings.PUBLISH_JOB_MAX_ATTEMPTS
+    assert failed.locked_by is None
+    assert failed.platforms["twitter"] == {
+        "status": publish_jobs.FAILED,
+        "attempts": 0,
+        "error": "Publishing failed repeatedly",
+    }
+    assert [payload["job_id"] for payload in announced] == [job.id]
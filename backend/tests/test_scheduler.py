@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models.post import Post
+from app.models.publish_job import PublishJob
+from app.services import scheduler
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def draft(db, user):
+    def make(scheduled_at=None, platforms=None):
+        post = Post(
+            user_id=user.id,
+            content="scheduled #launch",
+            is_draft=True,
+            scheduled_at=scheduled_at or _utcnow() - timedelta(seconds=1),
+            platforms=platforms or ["inspire"],
+        )
+        db.add(post)
+        db.commit()
+        return post
+    return make
+
+
+def _reload(db, post_id):
+    db.expire_all()
+    return db.query(Post).filter(Post.id == post_id).first()
+
+
+def test_draft_is_claimed_once(db, draft):
+    post = draft(platforms=["inspire", "twitter"])
+    now = _utcnow()
+
+    published = scheduler._publish_scheduled(db, post.id, now)
+    assert published is not None
+    # Another instance that saw the same due draft gets nothing
+    assert scheduler._publish_scheduled(db, post.id, now) is None
+
+    assert not _reload(db, post.id).is_draft
+    jobs = db.query(PublishJob).filter(PublishJob.post_id == post.id).all()
+    assert len(jobs) == 1
+    assert set(jobs[0].platforms) == {"inspire", "twitter"}
+
+
+def test_publish_due_skips_drafts_not_due(db, draft):
+    due = draft()
+    later = draft(scheduled_at=_utcnow() + timedelta(hours=1))
+
+    count, more, next_due = scheduler.publish_due(batch_size=10)
+
+    assert count == 1
+    assert not more
+    assert not _reload(db, due.id).is_draft
+    assert _reload(db, later.id).is_draft
+    assert next_due is not None
+
+
+def test_failed_publish_is_backed_off(db, draft, monkeypatch):
+    post = draft()
+
+    def fail(db, post_id, now):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scheduler, "_publish_scheduled", fail)
+    count, more, next_due = scheduler.publish_due(batch_size=1)
+
+    assert count == 0
+    # A full batch runs again at once, and finds the backed-off draft no longer due
+    assert more
+    backed_off = _reload(db, post.id)
+    assert backed_off.is_draft
+    assert backed_off.schedule_attempts == 1
+    assert backed_off.schedule_retry_at is not None
+    assert scheduler.publish_due(batch_size=1)[:2] == (0, False)
+
+
+def test_stuck_batch_does_not_spin(db, draft, monkeypatch):
+    draft()
+
+    def fail(db, post_id, now):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scheduler, "_publish_scheduled", fail)
+    monkeypatch.setattr(scheduler, "_record_failure", fail)
+    count, more, _ = scheduler.publish_due(batch_size=1)
+
+    assert count == 0
+    assert not more
+
+
+def test_draft_is_unscheduled_after_the_last_attempt(db, draft):
+    post = draft()
+    post.schedule_attempts = settings.SCHEDULER_MAX_ATTEMPTS - 1
+    db.commit()
+
+    scheduler._record_failure(db, post.id, _utcnow())
+
+    given_up = _reload(db, post.id)
+    assert given_up.is_draft
+    assert given_up.scheduled_at is None
+    assert given_up.schedule_retry_at is None